@@ -0,0 +1,571 @@
+"""
+Audio Capture Module
+====================
+Streaming microphone capture with a lightweight voice-activity detector.
+
+Features:
+- Energy / zero-crossing-rate voice-activity detection (VAD)
+- Adaptive noise floor, no model or extra dependency required
+- Early stop once enough speech and trailing silence have been captured
+- Hard maximum recording duration as a safety net
+- Pre-roll: the microphone opens at the start of the countdown, so speech
+  that begins early is kept and the countdown is purely cosmetic
+- Callback-driven capture into a preallocated ring buffer with zero-copy views
+- File-backed fake input device for tests and offline runs
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def frame_signal(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Split audio into non-overlapping frames (trailing partial frame is dropped)
+
+    Args:
+        audio: 1D audio waveform
+        frame_length: Samples per frame
+
+    Returns:
+        Array of shape (n_frames, frame_length) sharing memory with `audio`
+    """
+    n_frames = len(audio) // frame_length
+    return audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+
+
+def frame_energy_db(frames: np.ndarray) -> np.ndarray:
+    """Per-frame mean energy in dBFS"""
+    return 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=-1) + 1e-10)
+
+
+def zero_crossing_rate(frames: np.ndarray) -> np.ndarray:
+    """Per-frame fraction of adjacent samples that change sign"""
+    signs = np.signbit(frames)
+    return np.mean(signs[..., 1:] != signs[..., :-1], axis=-1)
+
+
+class VoiceActivityDetector:
+    """
+    Frame-level voice-activity detector based on energy and zero-crossing rate
+
+    A frame is voiced when its energy is well above an adaptive noise floor
+    (and an absolute minimum level) and its zero-crossing rate is speech-like.
+    Blocks of any size can be fed in; partial frames are carried over.
+    """
+
+    def __init__(self,
+                 sample_rate: int = 16000,
+                 frame_duration: float = 0.03,
+                 energy_margin_db: float = 10.0,
+                 min_energy_db: float = -45.0,
+                 max_zcr: float = 0.4,
+                 min_speech_duration: float = 1.0,
+                 trailing_silence: float = 0.7,
+                 noise_rise_db: float = 1.0):
+        """
+        Initialize the detector
+
+        Args:
+            sample_rate: Audio sample rate in Hz
+            frame_duration: Analysis frame length in seconds
+            energy_margin_db: How far above the noise floor a frame must be to count as speech
+            min_energy_db: Absolute energy below which a frame is never speech
+            max_zcr: Zero-crossing rate above which a frame is treated as noise/hiss
+            min_speech_duration: Seconds of voiced frames required before stopping
+            trailing_silence: Seconds of silence after speech that end the utterance
+            noise_rise_db: How fast (dB/s) the noise floor may rise during loud frames
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_duration))
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.min_speech_frames = int(np.ceil(min_speech_duration / frame_duration))
+        self.trailing_silence_frames = int(np.ceil(trailing_silence / frame_duration))
+        self.noise_rise_per_frame = noise_rise_db * frame_duration
+        self.reset()
+
+    def reset(self):
+        """Forget all state so the detector can be reused for a new recording"""
+        self.noise_floor_db = None
+        self.frames_seen = 0
+        self.voiced_frames = 0
+        self.silent_run = 0
+        self.first_voiced_frame = None
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Feed a block of audio and classify every complete frame it finishes
+
+        Args:
+            block: 1D audio samples (any length)
+
+        Returns:
+            Boolean array with one voiced/unvoiced flag per completed frame
+        """
+        if len(self._pending):
+            block = np.concatenate((self._pending, block))
+        frames = frame_signal(block, self.frame_length)
+        self._pending = block[len(frames) * self.frame_length:].copy()
+        if not len(frames):
+            return np.zeros(0, dtype=bool)
+
+        energies = frame_energy_db(frames)
+        zcrs = zero_crossing_rate(frames)
+        voiced = np.zeros(len(frames), dtype=bool)
+
+        for i, (energy, zcr) in enumerate(zip(energies, zcrs)):
+            if self.noise_floor_db is None:
+                self.noise_floor_db = max(energy, -80.0)
+
+            threshold = max(self.noise_floor_db + self.energy_margin_db, self.min_energy_db)
+            voiced[i] = energy > threshold and zcr < self.max_zcr
+
+            # Noise floor: drop immediately, rise slowly so speech cannot drag it up
+            if energy < self.noise_floor_db:
+                self.noise_floor_db = max(energy, -80.0)
+            elif voiced[i]:
+                self.noise_floor_db += self.noise_rise_per_frame
+            else:
+                self.noise_floor_db += 0.1 * (energy - self.noise_floor_db)
+
+            if voiced[i]:
+                if self.first_voiced_frame is None:
+                    self.first_voiced_frame = self.frames_seen
+                self.voiced_frames += 1
+                self.silent_run = 0
+            else:
+                self.silent_run += 1
+            self.frames_seen += 1
+
+        return voiced
+
+    @property
+    def speech_duration(self) -> float:
+        """Seconds of voiced audio seen so far"""
+        return self.voiced_frames * self.frame_length / self.sample_rate
+
+    @property
+    def speech_start(self) -> Optional[int]:
+        """Sample offset of the first voiced frame, or None if no speech yet"""
+        if self.first_voiced_frame is None:
+            return None
+        return self.first_voiced_frame * self.frame_length
+
+    @property
+    def is_complete(self) -> bool:
+        """True once enough speech has been heard and it has been followed by silence"""
+        return (self.voiced_frames >= self.min_speech_frames
+                and self.silent_run >= self.trailing_silence_frames)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity float32 ring buffer addressed by absolute sample index
+
+    Every sample is stored twice (at i and i + capacity), so any range that
+    is still held can be returned as a contiguous view without copying.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self.total_written = 0
+
+    @property
+    def oldest(self) -> int:
+        """Absolute index of the oldest sample still held"""
+        return max(0, self.total_written - self.capacity)
+
+    def write(self, block: np.ndarray):
+        """Append samples, overwriting the oldest ones when full"""
+        n = len(block)
+        if n > self.capacity:
+            self.total_written += n - self.capacity
+            block = block[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        start = self.total_written % cap
+        first = min(n, cap - start)
+        self._data[start:start + first] = block[:first]
+        self._data[start + cap:start + cap + first] = block[:first]
+        if first < n:
+            rest = n - first
+            self._data[:rest] = block[first:]
+            self._data[cap:cap + rest] = block[first:]
+        self.total_written += n
+
+    def view(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """
+        Contiguous, zero-copy view of the absolute sample range [start, end)
+
+        The range is clamped to the samples still held by the buffer.
+        """
+        end = self.total_written if end is None else min(end, self.total_written)
+        start = self.oldest if start is None else max(start, self.oldest)
+        if start >= end:
+            return self._data[:0]
+        offset = start % self.capacity
+        return self._data[offset:offset + (end - start)]
+
+
+class UtteranceCapture:
+    """
+    Tracks a single utterance in a live audio stream
+
+    Audio is buffered from the moment the stream opens (including the
+    countdown). Once the VAD finds speech the utterance is taken from just
+    before the speech onset, so talking during the countdown loses nothing.
+    """
+
+    def __init__(self,
+                 sample_rate: int = 16000,
+                 max_duration: float = 5.0,
+                 countdown: float = 0.0,
+                 pre_roll: float = 0.3,
+                 vad: Optional[VoiceActivityDetector] = None,
+                 progress_callback: Optional[Callable[[float, float], None]] = None,
+                 countdown_callback: Optional[Callable[[int], None]] = None,
+                 ring: Optional[RingBuffer] = None):
+        """
+        Args:
+            sample_rate: Audio sample rate in Hz
+            max_duration: Maximum utterance length in seconds
+            countdown: Cosmetic countdown in seconds (audio is captured during it)
+            pre_roll: Seconds of audio kept before the detected speech onset
+            vad: Detector to use (a default one is created if None)
+            progress_callback: Called as callback(elapsed_seconds, max_duration) per block
+            countdown_callback: Called with the remaining whole seconds (…, 2, 1, 0) during the countdown
+            ring: Buffer the blocks are already being written to (e.g. AudioCapture.ring);
+                  if None, a private buffer is allocated and fed blocks are copied into it
+        """
+        self.sample_rate = sample_rate
+        self.max_duration = max_duration
+        self.countdown_samples = int(countdown * sample_rate)
+        self.max_samples = int(max_duration * sample_rate)
+        self.pre_roll_samples = int(pre_roll * sample_rate)
+        self.vad = vad or VoiceActivityDetector(sample_rate)
+        self.vad.reset()
+        self.progress_callback = progress_callback
+        self.countdown_callback = countdown_callback
+        self._owns_ring = ring is None
+        self.ring = RingBuffer(self.pre_roll_samples + self.max_samples) if ring is None else ring
+        self.captured = 0
+        self._last_tick = None
+        self.finished = False
+
+    @property
+    def start(self) -> int:
+        """Absolute sample index where the utterance window starts"""
+        onset = self.vad.speech_start
+        if onset is None:
+            return self.countdown_samples
+        return min(onset, self.countdown_samples)
+
+    @property
+    def speech_samples(self) -> int:
+        """Samples captured since speech onset (0 if no speech yet)"""
+        onset = self.vad.speech_start
+        return 0 if onset is None else self.captured - onset
+
+    def feed(self, block: np.ndarray, end: Optional[int] = None) -> bool:
+        """
+        Add a block from the stream
+
+        Args:
+            block: New audio samples
+            end: Absolute ring index just past `block` when the ring is shared
+                 (e.g. AudioCapture.position); defaults to counting fed samples
+
+        Returns:
+            True once the utterance is complete and capture should stop
+        """
+        if self._owns_ring:
+            self.ring.write(block)
+        self.captured = self.captured + len(block) if end is None else end
+        self.vad.process(block)
+        captured = self.captured
+
+        if self.countdown_callback is not None and self._last_tick != 0:
+            remaining = max(0, math.ceil((self.countdown_samples - captured) / self.sample_rate))
+            if remaining != self._last_tick:
+                self._last_tick = remaining
+                self.countdown_callback(remaining)
+
+        elapsed = captured - self.start
+        if self.progress_callback is not None and elapsed > 0:
+            self.progress_callback(min(elapsed, self.max_samples) / self.sample_rate, self.max_duration)
+
+        self.finished = self.vad.is_complete or elapsed >= self.max_samples
+        return self.finished
+
+    @property
+    def audio(self) -> np.ndarray:
+        """Zero-copy view of the utterance so far (from just before speech onset)"""
+        onset = self.vad.speech_start
+        if onset is None:
+            return self.ring.view(self.countdown_samples, self.captured)
+        return self.ring.view(onset - self.pre_roll_samples, self.captured)
+
+    @property
+    def leading_audio(self) -> np.ndarray:
+        """Zero-copy view of the background audio before the utterance (empty until speech is found)"""
+        onset = self.vad.speech_start
+        if onset is None:
+            return self.ring.view(0, 0)
+        return self.ring.view(None, onset - self.pre_roll_samples)
+
+
+class AudioCapture:
+    """
+    Callback-driven audio capture into a preallocated float32 ring buffer
+
+    The input stream's callback copies each block straight into the ring
+    buffer (no per-recording allocations) and wakes up consumers, which get
+    zero-copy views of new audio from `blocks()`. Level events are emitted
+    from the audio callback, so nothing has to poll.
+    """
+
+    def __init__(self,
+                 sample_rate: int = 16000,
+                 capacity: float = 10.0,
+                 block_duration: float = 0.03,
+                 stream_factory: Optional[Callable] = None,
+                 level_callback: Optional[Callable[[float], None]] = None):
+        """
+        Args:
+            sample_rate: Audio sample rate in Hz
+            capacity: Ring buffer size in seconds
+            block_duration: Seconds of audio per callback block
+            stream_factory: Callable with the sounddevice.InputStream signature
+                            (defaults to sd.InputStream; see file_stream_factory)
+            level_callback: Called with the block level in dBFS from the audio thread
+        """
+        self.sample_rate = sample_rate
+        self.block_size = max(1, int(sample_rate * block_duration))
+        self.ring = RingBuffer(int(capacity * sample_rate))
+        if stream_factory is None:
+            import sounddevice as sd  # Deferred: loading PortAudio is slow and needs a device
+            stream_factory = sd.InputStream
+        self.stream_factory = stream_factory
+        self.level_callback = level_callback
+        self._cond = threading.Condition()
+        self._stream = None
+        self._active = False
+        self.position = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        """Audio-thread callback: copy the block into the ring and notify readers"""
+        if status:
+            logger.warning(f"Audio input status: {status}")
+        block = indata[:, 0]
+        with self._cond:
+            self.ring.write(block)
+            self._cond.notify_all()
+        if self.level_callback is not None:
+            self.level_callback(float(frame_energy_db(block)))
+
+    def _finished(self):
+        with self._cond:
+            self._active = False
+            self._cond.notify_all()
+
+    def start(self):
+        """Open the input stream and start filling the ring buffer"""
+        self._active = True
+        self._stream = self.stream_factory(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype='float32',
+            blocksize=self.block_size,
+            callback=self._callback,
+            finished_callback=self._finished
+        )
+        self._stream.start()
+
+    def stop(self):
+        """Stop and close the input stream"""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._finished()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def blocks(self, timeout: float = 2.0) -> Iterator[np.ndarray]:
+        """
+        Yield zero-copy views of audio as it arrives, until the stream stops
+
+        Iteration starts at the oldest sample still held, so audio captured
+        before the consumer got going is not lost. After each yield,
+        `position` is the absolute ring index just past the yielded block.
+
+        Args:
+            timeout: Seconds without any new audio before giving up
+
+        Raises:
+            RuntimeError: If the device stops delivering audio
+        """
+        self.position = self.ring.oldest
+        while True:
+            with self._cond:
+                has_data = self._cond.wait_for(
+                    lambda: self.ring.total_written > self.position or not self._active, timeout
+                )
+                available = self.ring.total_written
+            if available == self.position:
+                if not has_data:
+                    raise RuntimeError("No audio received from the input device")
+                return
+            if self.position < self.ring.oldest:
+                logger.warning("Audio consumer fell behind - oldest samples were overwritten")
+                self.position = self.ring.oldest
+            # Hand out at most one block at a time so stop decisions stay block-accurate
+            end = min(available, self.position + self.block_size)
+            view = self.ring.view(self.position, end)
+            self.position = end
+            yield view
+
+
+class FileInputStream:
+    """
+    File-backed stand-in for sounddevice.InputStream
+
+    Plays a WAV file (or array) through the stream callback in blocks,
+    followed by `tail` seconds of silence, at `speed` x real time. Used to
+    drive the capture pipeline in tests and offline runs without a microphone.
+    """
+
+    def __init__(self,
+                 source: Union[str, Path, np.ndarray],
+                 samplerate: int = 16000,
+                 channels: int = 1,
+                 dtype: str = 'float32',
+                 blocksize: int = 480,
+                 callback: Optional[Callable] = None,
+                 finished_callback: Optional[Callable] = None,
+                 speed: float = 1.0,
+                 tail: float = 2.0):
+        if isinstance(source, np.ndarray):
+            audio = source.astype(np.float32, copy=False)
+        else:
+            import soundfile as sf
+            audio, file_sr = sf.read(str(source), dtype='float32', always_2d=True)
+            audio = audio.mean(axis=1)
+            if file_sr != samplerate:
+                raise ValueError(f"{source} is {file_sr}Hz, expected {samplerate}Hz")
+
+        silence = np.zeros(int(tail * samplerate), dtype=np.float32)
+        self.audio = np.concatenate((audio.reshape(-1), silence))
+        self.samplerate = samplerate
+        self.blocksize = blocksize or 480
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.speed = speed
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        block_time = self.blocksize / self.samplerate / self.speed if self.speed else 0.0
+        for start in range(0, len(self.audio), self.blocksize):
+            if self._stop_event.is_set():
+                break
+            block = self.audio[start:start + self.blocksize]
+            self.callback(block[:, None], len(block), None, None)
+            if block_time:
+                time.sleep(block_time)
+        if self.finished_callback is not None:
+            self.finished_callback()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+
+def file_stream_factory(source: Union[str, Path, np.ndarray],
+                        speed: float = 1.0,
+                        tail: float = 2.0) -> Callable:
+    """
+    Build a stream factory that replays `source` instead of opening the microphone
+
+    Example:
+        auth.stream_factory = file_stream_factory("voice_profiles/alice/sample_1.wav", speed=10)
+    """
+    return functools.partial(FileInputStream, source, speed=speed, tail=tail)
+
+
+def record_until_silence(sample_rate: int = 16000,
+                         max_duration: float = 5.0,
+                         vad: Optional[VoiceActivityDetector] = None,
+                         progress_callback: Optional[Callable[[float, float], None]] = None,
+                         countdown: float = 0.0,
+                         countdown_callback: Optional[Callable[[int], None]] = None,
+                         stream_factory: Optional[Callable] = None,
+                         level_callback: Optional[Callable[[float], None]] = None,
+                         noise_callback: Optional[Callable[[np.ndarray], None]] = None) -> np.ndarray:
+    """
+    Record from the microphone until the speaker has finished talking
+
+    The stream opens immediately, so a countdown only affects what the user
+    sees. Recording stops as soon as the VAD has seen enough speech followed
+    by trailing silence, or after `max_duration` seconds of utterance,
+    whichever comes first.
+
+    Args:
+        sample_rate: Audio sample rate in Hz
+        max_duration: Hard maximum utterance duration in seconds
+        vad: Detector to use (a default one is created if None)
+        progress_callback: Called as callback(elapsed_seconds, max_duration) per block
+        countdown: Cosmetic countdown in seconds
+        countdown_callback: Called with the remaining whole seconds during the countdown
+        stream_factory: Input stream factory (defaults to the microphone)
+        level_callback: Called with each block's level in dBFS
+        noise_callback: Called with the background audio captured before the
+                        speaker started (e.g. during the countdown), if any
+
+    Returns:
+        Recorded utterance as a contiguous float32 view into the capture buffer
+    """
+    with AudioCapture(sample_rate, countdown + max_duration + 1.0,
+                      stream_factory=stream_factory, level_callback=level_callback) as mic:
+        utterance = UtteranceCapture(sample_rate, max_duration, countdown=countdown, vad=vad,
+                                     progress_callback=progress_callback,
+                                     countdown_callback=countdown_callback,
+                                     ring=mic.ring)
+        for block in mic.blocks():
+            if utterance.feed(block, mic.position):
+                break
+
+    noise = utterance.leading_audio
+    if noise_callback is not None and len(noise):
+        noise_callback(noise)
+
+    audio = utterance.audio
+    logger.debug(f"Captured {len(audio)/sample_rate:.2f}s "
+                 f"({utterance.vad.speech_duration:.2f}s voiced, early stop: {utterance.vad.is_complete})")
+    return audio
@@ -0,0 +1,313 @@
+"""
+Audio Processing Module
+=======================
+NumPy/SciPy implementations of the preprocessing steps previously taken from
+librosa, so the authentication path does not import librosa (and numba).
+
+Features:
+- Silence trimming on framed RMS (matches librosa.effects.trim)
+- Peak normalisation (matches librosa.util.normalize)
+- Pre-emphasis with scipy.signal.lfilter (matches librosa.effects.preemphasis)
+- Polyphase resampling with cached anti-aliasing filters
+- Spectral-gating noise reduction against a noise profile learned from
+  non-speech audio (e.g. the countdown before the user speaks)
+"""
+
+import copy
+import functools
+import logging
+import threading
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+# scipy.signal takes longer to import than everything else here together, so
+# it is imported inside the functions that need it
+
+logger = logging.getLogger(__name__)
+
+
+def frame_rms(audio: np.ndarray, frame_length: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """
+    Per-frame RMS of centred, zero-padded frames (as librosa.feature.rms)
+
+    Args:
+        audio: 1D audio waveform
+        frame_length: Samples per frame
+        hop_length: Samples between frame starts
+
+    Returns:
+        RMS value of every frame
+    """
+    padded = np.pad(audio, frame_length // 2)
+    frames = np.lib.stride_tricks.sliding_window_view(padded, frame_length)[::hop_length]
+    return np.sqrt(np.mean(np.abs(frames) ** 2, axis=-1))
+
+
+def trim_silence(audio: np.ndarray,
+                 top_db: float = 20,
+                 frame_length: int = 2048,
+                 hop_length: int = 512) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Trim leading and trailing frames quieter than the loudest frame by top_db
+
+    Args:
+        audio: 1D audio waveform
+        top_db: Threshold below the peak frame (in dB) treated as silence
+        frame_length: Analysis frame length in samples
+        hop_length: Hop between frames in samples
+
+    Returns:
+        (trimmed audio, (start, end) sample indices into the input)
+    """
+    if len(audio) == 0:
+        return audio, (0, 0)
+
+    rms = frame_rms(audio, frame_length, hop_length)
+    # 20*log10 relative to the loudest frame, amplitude floor 1e-5 as in librosa
+    db = 20.0 * np.log10(np.maximum(rms, 1e-5)) - 20.0 * np.log10(max(float(rms.max()), 1e-5))
+    voiced = np.flatnonzero(db > -top_db)
+
+    if voiced.size == 0:
+        return audio[0:0], (0, 0)
+    start = int(voiced[0] * hop_length)
+    end = min(len(audio), int((voiced[-1] + 1) * hop_length))
+    return audio[start:end], (start, end)
+
+
+def normalize_peak(audio: np.ndarray) -> np.ndarray:
+    """Scale audio so its largest absolute sample is 1 (silence is left as is)"""
+    peak = np.max(np.abs(audio)) if len(audio) else 0.0
+    if peak < np.finfo(audio.dtype if audio.dtype.kind == 'f' else np.float32).tiny:
+        return audio
+    return audio / peak
+
+
+def preemphasis(audio: np.ndarray, coef: float = 0.97) -> np.ndarray:
+    """
+    Apply a first-order pre-emphasis filter y[n] = x[n] - coef * x[n-1]
+
+    The filter state is initialised by linear extrapolation of the first two
+    samples, as librosa does, so the first output sample has no step.
+    """
+    from scipy.signal import lfilter
+
+    if len(audio) < 2:
+        return audio.copy()
+    b = np.asarray([1.0, -coef], dtype=audio.dtype)
+    a = np.asarray([1.0], dtype=audio.dtype)
+    zi = np.asarray(2 * audio[0:1] - audio[1:2], dtype=audio.dtype)
+    emphasized, _ = lfilter(b, a, audio, zi=zi)
+    return emphasized
+
+
+@functools.lru_cache(maxsize=16)
+def _resample_filter(up: int, down: int) -> np.ndarray:
+    """Anti-aliasing FIR for an up/down ratio (the design resample_poly uses internally)"""
+    from scipy.signal import firwin
+
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    taps.setflags(write=False)
+    return taps
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resample along the first axis with a polyphase filter
+
+    The filter for each rate pair is designed once and cached, which removes
+    most of the per-call cost for repeated conversions (e.g. 44.1/48 kHz to 16 kHz).
+
+    Args:
+        audio: Waveform of shape (n,) or (n, channels)
+        orig_sr: Input sample rate in Hz
+        target_sr: Output sample rate in Hz
+
+    Returns:
+        Resampled waveform (same dtype family as the input)
+    """
+    from scipy.signal import resample_poly
+
+    if orig_sr == target_sr:
+        return audio
+    divisor = gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // divisor, int(orig_sr) // divisor
+    # resample_poly scales and may modify the window array, so hand it a copy
+    taps = np.array(_resample_filter(up, down))
+    return resample_poly(audio, up, down, axis=0, window=taps)
+
+
+def _stft(audio: np.ndarray, n_fft: int, hop_length: int) -> np.ndarray:
+    """Complex Hann-window STFT of shape (n_fft // 2 + 1, n_frames)"""
+    from scipy.signal import stft
+
+    _, _, spectrum = stft(audio, nperseg=n_fft, noverlap=n_fft - hop_length, window='hann')
+    return spectrum
+
+
+def _magnitude_db(spectrum: np.ndarray) -> np.ndarray:
+    return 20.0 * np.log10(np.maximum(np.abs(spectrum), 1e-10))
+
+
+class NoiseProfile:
+    """
+    Per-frequency noise level (mean and spread in dB) learned from non-speech audio
+
+    Repeated updates blend into the existing estimate, with the history
+    capped at `max_frames` STFT frames so the profile follows a changing room.
+    Updates are locked; readers on other threads take a snapshot() so the
+    mean and spread they use always come from the same update.
+    """
+
+    def __init__(self, n_fft: int = 512, hop_length: int = 128,
+                 min_frames: int = 16, max_frames: int = 500):
+        """
+        Args:
+            n_fft: STFT size (must match the spectral_gate call)
+            hop_length: STFT hop (must match the spectral_gate call)
+            min_frames: Fewest frames an update needs to be used
+            max_frames: Frames of history weighed against a new update
+        """
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.frames = 0
+        self.mean_db = None
+        self._mean_sq_db = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.frames > 0
+
+    @property
+    def std_db(self) -> np.ndarray:
+        return np.sqrt(np.maximum(self._mean_sq_db - self.mean_db ** 2, 0.0))
+
+    def update(self, noise: np.ndarray) -> bool:
+        """
+        Fold a stretch of non-speech audio into the profile
+
+        Args:
+            noise: Audio containing background noise only
+
+        Returns:
+            True if the audio was long enough to be used
+        """
+        db = _magnitude_db(_stft(np.asarray(noise, dtype=np.float32), self.n_fft, self.hop_length))
+        n = db.shape[1]
+        if n < self.min_frames:
+            return False
+
+        mean, mean_sq = db.mean(axis=1), np.mean(db ** 2, axis=1)
+        with self._lock:
+            if self.ready:
+                weight = n / (min(self.frames, self.max_frames) + n)
+                mean = (1 - weight) * self.mean_db + weight * mean
+                mean_sq = (1 - weight) * self._mean_sq_db + weight * mean_sq
+            self.mean_db, self._mean_sq_db = mean, mean_sq
+            self.frames = min(self.frames + n, self.max_frames)
+        logger.debug(f"Noise profile updated from {n} frames "
+                     f"(median level {np.median(self.mean_db):.1f} dB)")
+        return True
+
+    def snapshot(self) -> 'NoiseProfile':
+        """
+        Copy of the current estimate that later updates do not change
+
+        Updates replace the statistics rather than modifying them in place,
+        so the copy shares the arrays.
+        """
+        with self._lock:
+            snapshot = copy.copy(self)
+        snapshot._lock = threading.Lock()
+        return snapshot
+
+
+@functools.lru_cache(maxsize=4)
+def _smoothing_kernel(freq_bins: int, time_frames: int) -> np.ndarray:
+    """Normalised triangular kernel that smooths the gate mask across neighbours"""
+    kernel = np.outer(np.bartlett(2 * freq_bins + 3)[1:-1], np.bartlett(2 * time_frames + 3)[1:-1])
+    kernel /= kernel.sum()
+    kernel.setflags(write=False)
+    return kernel
+
+
+def spectral_gate(audio: np.ndarray,
+                  profile: NoiseProfile,
+                  n_std: float = 1.0,
+                  prop_decrease: float = 0.8,
+                  smooth_freq: int = 2,
+                  smooth_time: int = 4) -> np.ndarray:
+    """
+    Attenuate time-frequency bins that do not rise above the noise profile
+
+    A bin is kept when its level exceeds the profile's mean by `n_std`
+    standard deviations for that frequency; the binary mask is smoothed over
+    neighbouring bins and frames to avoid musical-noise artefacts.
+
+    Args:
+        audio: 1D audio waveform
+        profile: Background noise profile (see NoiseProfile)
+        n_std: Standard deviations above the noise mean a bin must reach
+        prop_decrease: Fraction of a gated bin's level removed (1.0 = silence it)
+        smooth_freq: Mask smoothing half-width in frequency bins
+        smooth_time: Mask smoothing half-width in frames
+
+    Returns:
+        Denoised audio with the input's length and dtype
+    """
+    from scipy.signal import fftconvolve, istft
+
+    # Another thread may update the profile while this one gates
+    profile = profile.snapshot()
+    if not profile.ready or len(audio) < profile.n_fft:
+        return audio
+
+    spectrum = _stft(audio, profile.n_fft, profile.hop_length)
+    threshold = profile.mean_db + n_std * profile.std_db
+    mask = (_magnitude_db(spectrum) > threshold[:, np.newaxis]).astype(np.float32)
+    mask = np.clip(fftconvolve(mask, _smoothing_kernel(smooth_freq, smooth_time), mode='same'), 0.0, 1.0)
+
+    gain = 1.0 - prop_decrease * (1.0 - mask)
+    _, denoised = istft(spectrum * gain, nperseg=profile.n_fft,
+                        noverlap=profile.n_fft - profile.hop_length, window='hann')
+    return denoised[:len(audio)].astype(audio.dtype, copy=False)
+
+
+def preprocess(audio: np.ndarray,
+               sample_rate: int = 16000,
+               top_db: float = 20,
+               coef: float = 0.97,
+               noise_profile: Optional[NoiseProfile] = None) -> np.ndarray:
+    """
+    Denoise, trim silence, peak-normalise and pre-emphasise a recording
+
+    Args:
+        audio: Raw audio waveform
+        sample_rate: Audio sample rate in Hz
+        top_db: Silence threshold for trimming
+        coef: Pre-emphasis coefficient
+        noise_profile: Background noise to gate out (skipped if None or not yet learned)
+
+    Returns:
+        Preprocessed audio
+    """
+    # 0. Gate out the background noise, before trimming judges what is silence
+    if noise_profile is not None:
+        audio = spectral_gate(audio, noise_profile)
+
+    # 1. Trim silence from beginning and end
+    trimmed, _ = trim_silence(audio, top_db=top_db, frame_length=2048, hop_length=512)
+
+    # Ensure minimum length (1 second)
+    if len(trimmed) < sample_rate:
+        logger.warning(f"Audio too short after trimming: {len(trimmed)/sample_rate:.2f}s")
+        trimmed = audio  # Use original
+
+    # 2. Normalize amplitude, 3. boost high frequencies
+    return preemphasis(normalize_peak(trimmed), coef=coef)
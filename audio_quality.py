@@ -0,0 +1,162 @@
+"""
+Audio Quality Module
+====================
+Cheap checks that reject unusable recordings before the speaker encoder runs.
+
+Features:
+- Duration, silence, clipping, voiced-frame and SNR checks on the raw buffer
+- Fully vectorised over frames (reuses the VAD frame features)
+- Structured reason codes plus user-facing retry messages
+"""
+
+import logging
+from typing import List
+
+import numpy as np
+
+from audio_capture import frame_energy_db, frame_signal, zero_crossing_rate
+
+logger = logging.getLogger(__name__)
+
+# User-facing retry prompts for each reason code
+REASON_MESSAGES = {
+    'too_short': "Recording is too short - please say your full passphrase",
+    'silent': "No sound detected - check that your microphone is connected and unmuted",
+    'clipped': "Recording is distorted - speak a little further from the microphone",
+    'no_speech': "No speech detected - please speak clearly after the countdown",
+    'noisy': "Too much background noise - move somewhere quieter",
+}
+
+
+class QualityReport:
+    """Result of a quality check: pass/fail, reason codes and the measured metrics"""
+
+    def __init__(self, reasons: List[str], metrics: dict):
+        self.reasons = reasons
+        self.metrics = metrics
+
+    @property
+    def ok(self) -> bool:
+        return not self.reasons
+
+    @property
+    def message(self) -> str:
+        """Retry prompt for the most important problem ('' if the audio is fine)"""
+        return REASON_MESSAGES[self.reasons[0]] if self.reasons else ""
+
+    def __repr__(self) -> str:
+        metrics = ", ".join(f"{key}={value:.3g}" for key, value in self.metrics.items())
+        return f"QualityReport(reasons={self.reasons}, {metrics})"
+
+
+class AudioQualityError(Exception):
+    """Raised when a recording is rejected by the quality gate"""
+
+    def __init__(self, report: QualityReport):
+        super().__init__(report.message)
+        self.report = report
+
+
+class QualityAnalyzer:
+    """
+    Vectorised quality gate for raw recordings
+
+    Frames are classified as voiced with the same energy/ZCR features as the
+    VoiceActivityDetector; the noise floor and speech level are the 10th and
+    90th energy percentiles, and their gap is the SNR estimate.
+    """
+
+    def __init__(self,
+                 sample_rate: int = 16000,
+                 frame_duration: float = 0.03,
+                 min_duration: float = 1.0,
+                 min_speech_duration: float = 0.5,
+                 min_peak: float = 0.01,
+                 clip_level: float = 0.99,
+                 max_clipping_ratio: float = 0.01,
+                 min_snr_db: float = 10.0,
+                 energy_margin_db: float = 10.0,
+                 min_energy_db: float = -45.0,
+                 max_zcr: float = 0.4):
+        """
+        Args:
+            sample_rate: Audio sample rate in Hz
+            frame_duration: Analysis frame length in seconds
+            min_duration: Shortest acceptable recording in seconds
+            min_speech_duration: Seconds of voiced frames required
+            min_peak: Peak amplitude below which the recording counts as silent
+            clip_level: Absolute amplitude treated as clipped
+            max_clipping_ratio: Largest acceptable fraction of clipped samples
+            min_snr_db: Smallest acceptable speech-to-noise level gap
+            energy_margin_db: How far above the noise floor a voiced frame must be
+            min_energy_db: Absolute energy below which a frame is never voiced
+            max_zcr: Zero-crossing rate above which a frame is treated as noise
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_duration))
+        self.frame_duration = frame_duration
+        self.min_duration = min_duration
+        self.min_speech_duration = min_speech_duration
+        self.min_peak = min_peak
+        self.clip_level = clip_level
+        self.max_clipping_ratio = max_clipping_ratio
+        self.min_snr_db = min_snr_db
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+
+    def analyze(self, audio: np.ndarray) -> QualityReport:
+        """
+        Measure a raw recording and decide whether it is worth embedding
+
+        Args:
+            audio: Raw (unnormalised) audio waveform
+
+        Returns:
+            QualityReport with reason codes from REASON_MESSAGES, most severe first
+        """
+        audio = np.asarray(audio, dtype=np.float32).ravel()
+        duration = len(audio) / self.sample_rate
+        magnitude = np.abs(audio)
+        peak = float(magnitude.max()) if len(audio) else 0.0
+        clipping_ratio = float(np.count_nonzero(magnitude >= self.clip_level)) / max(1, len(audio))
+
+        frames = frame_signal(audio, self.frame_length)
+        if len(frames):
+            energy = frame_energy_db(frames)
+            noise_db, speech_db = np.percentile(energy, [10, 90])
+            voiced = ((energy > noise_db + self.energy_margin_db)
+                      & (energy > self.min_energy_db)
+                      & (zero_crossing_rate(frames) < self.max_zcr))
+            voiced_ratio = float(voiced.mean())
+            snr_db = float(speech_db - noise_db)
+        else:
+            voiced_ratio = 0.0
+            snr_db = 0.0
+        speech_duration = voiced_ratio * len(frames) * self.frame_duration
+
+        metrics = {
+            'duration': duration,
+            'peak': peak,
+            'clipping_ratio': clipping_ratio,
+            'voiced_ratio': voiced_ratio,
+            'speech_duration': speech_duration,
+            'snr_db': snr_db,
+        }
+
+        reasons = []
+        if duration < self.min_duration:
+            reasons.append('too_short')
+        if peak < self.min_peak:
+            reasons.append('silent')
+        else:
+            if clipping_ratio > self.max_clipping_ratio:
+                reasons.append('clipped')
+            if speech_duration < self.min_speech_duration:
+                reasons.append('no_speech')
+            if snr_db < self.min_snr_db:
+                reasons.append('noisy')
+
+        report = QualityReport(reasons, metrics)
+        logger.debug(f"Audio quality: {report}")
+        return report
@@ -0,0 +1,554 @@
+"""
+Authentication History Module
+=============================
+Append-only log of authentication attempts with running per-user statistics.
+
+Features:
+- One SQLite row appended per attempt (no full-file rewrites)
+- Welford running mean/variance of successful distances, updated in O(1)
+- P² streaming quantile sketches of success and failure distances for
+  percentile-based threshold suggestions and FRR/FAR estimates
+- Recent attempts read back with an indexed query
+- Log of automatic voice profile adaptations
+- Automatic import of the legacy auth_history.json
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 3
+RECENT_ATTEMPTS = 100
+
+# Quantiles tracked per user for success and failure distances
+SKETCH_QUANTILES = (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+# Suggested threshold accepts this fraction of the user's genuine attempts
+SUGGESTED_PERCENTILE = 0.95
+
+
+class RunningStats:
+    """Welford's online mean/variance"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (matches np.std)"""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+class P2Quantile:
+    """
+    P² streaming estimate of one quantile (Jain & Chlamtac, 1985)
+
+    Keeps five markers (min, p/2, p, (1+p)/2, max) whose heights are adjusted
+    with piecewise-parabolic interpolation, so memory and update cost are
+    constant regardless of how many values are seen.
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    @property
+    def count(self) -> int:
+        return len(self.heights) if len(self.heights) < 5 else self.positions[4] + 1
+
+    def update(self, value: float):
+        q = self.heights
+        if len(q) < 5:
+            q.append(value)
+            q.sort()
+            return
+
+        # Find the cell containing the value, extending the extremes if needed
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    @property
+    def value(self) -> Optional[float]:
+        """Current quantile estimate (exact while fewer than 5 values were seen)"""
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            return float(np.quantile(self.heights, self.p))
+        return self.heights[2]
+
+    def to_dict(self) -> dict:
+        return {'p': self.p, 'heights': self.heights, 'positions': self.positions, 'desired': self.desired}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'P2Quantile':
+        estimator = cls(data['p'])
+        estimator.heights = list(data['heights'])
+        estimator.positions = list(data['positions'])
+        estimator.desired = list(data['desired'])
+        return estimator
+
+
+class QuantileSketch:
+    """A fixed set of P² estimators describing one distance distribution"""
+
+    def __init__(self, quantiles: Sequence[float] = SKETCH_QUANTILES):
+        self.estimators = [P2Quantile(p) for p in quantiles]
+
+    @property
+    def count(self) -> int:
+        return self.estimators[0].count
+
+    def update(self, value: float):
+        for estimator in self.estimators:
+            estimator.update(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        """Estimated quantiles, keyed by probability"""
+        if self.count == 0:
+            return {}
+        probs, values = self._curve()
+        return {p: float(v) for p, v in zip(probs[1:-1], values[1:-1])}
+
+    def quantile(self, p: float) -> Optional[float]:
+        """Estimate an arbitrary quantile by interpolating the tracked ones"""
+        if self.count == 0:
+            return None
+        probs, values = self._curve()
+        return float(np.interp(p, probs, values))
+
+    def cdf(self, value: float) -> Optional[float]:
+        """Estimated fraction of values at or below `value`"""
+        if self.count == 0:
+            return None
+        probs, values = self._curve()
+        return float(np.interp(value, values, probs))
+
+    def _curve(self):
+        """Monotone (probability, value) points including the observed min/max"""
+        first, last = self.estimators[0], self.estimators[-1]
+        probs = [0.0] + [e.p for e in self.estimators] + [1.0]
+        values = [first.heights[0]] + [e.value for e in self.estimators] + [last.heights[-1]]
+        # Independent estimators can cross slightly; force monotonicity
+        return probs, np.maximum.accumulate(values)
+
+    def to_json(self) -> str:
+        return json.dumps([estimator.to_dict() for estimator in self.estimators])
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> 'QuantileSketch':
+        sketch = cls()
+        if text:
+            sketch.estimators = [P2Quantile.from_dict(data) for data in json.loads(text)]
+        return sketch
+
+
+class AuthHistory:
+    """
+    Per-user authentication attempt log backed by SQLite
+
+    Safe to share between the GUI thread and worker threads.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = 'voice_profiles/auth_history.db'):
+        """
+        Args:
+            db_path: SQLite database file (created if missing)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        # WAL keeps each appended attempt to a cheap sequential write
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._users = self._load_user_stats()
+
+    def _create_schema(self):
+        with self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS attempts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    distance REAL NOT NULL,
+                    success INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS attempts_by_user ON attempts (username, id)"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_stats (
+                    username TEXT PRIMARY KEY,
+                    total_attempts INTEGER NOT NULL,
+                    successful INTEGER NOT NULL,
+                    failed INTEGER NOT NULL,
+                    success_mean REAL NOT NULL,
+                    success_m2 REAL NOT NULL,
+                    success_sketch TEXT,
+                    failure_sketch TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS adaptations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    distance REAL NOT NULL,
+                    method TEXT NOT NULL,
+                    drift REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS adaptations_by_user ON adaptations (username, id)"
+            )
+            if version == 1:
+                self._conn.execute("ALTER TABLE user_stats ADD COLUMN success_sketch TEXT")
+                self._conn.execute("ALTER TABLE user_stats ADD COLUMN failure_sketch TEXT")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        if version == 1:
+            self._rebuild_sketches()
+
+    def _rebuild_sketches(self):
+        """Build quantile sketches from the attempt log (one-off schema upgrade)"""
+        sketches = {}
+        for username, distance, success in self._conn.execute(
+                "SELECT username, distance, success FROM attempts ORDER BY id"):
+            pair = sketches.setdefault(username, (QuantileSketch(), QuantileSketch()))
+            pair[0 if success else 1].update(distance)
+        with self._conn:
+            for username, (success_sketch, failure_sketch) in sketches.items():
+                self._conn.execute(
+                    "UPDATE user_stats SET success_sketch = ?, failure_sketch = ? WHERE username = ?",
+                    (success_sketch.to_json(), failure_sketch.to_json(), username)
+                )
+        logger.info(f"Built distance quantile sketches for {len(sketches)} users")
+
+    def _load_user_stats(self) -> dict:
+        rows = self._conn.execute(
+            "SELECT username, total_attempts, successful, failed, success_mean, success_m2, "
+            "success_sketch, failure_sketch FROM user_stats"
+        ).fetchall()
+        return {
+            username: {
+                'total_attempts': total,
+                'successful': successful,
+                'failed': failed,
+                'success_distance': RunningStats(successful, mean, m2),
+                'success_sketch': QuantileSketch.from_json(success_sketch),
+                'failure_sketch': QuantileSketch.from_json(failure_sketch),
+            }
+            for username, total, successful, failed, mean, m2, success_sketch, failure_sketch in rows
+        }
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _user(self, username: str) -> dict:
+        if username not in self._users:
+            self._users[username] = {
+                'total_attempts': 0,
+                'successful': 0,
+                'failed': 0,
+                'success_distance': RunningStats(),
+                'success_sketch': QuantileSketch(),
+                'failure_sketch': QuantileSketch(),
+            }
+        return self._users[username]
+
+    def _write_user(self, username: str, user: Optional[dict] = None):
+        user = self._users[username] if user is None else user
+        running = user['success_distance']
+        self._conn.execute(
+            "INSERT OR REPLACE INTO user_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (username, user['total_attempts'], user['successful'], user['failed'],
+             running.mean, running.m2,
+             user['success_sketch'].to_json(), user['failure_sketch'].to_json())
+        )
+
+    def record(self, username: str, distance: float, success: bool, timestamp: Optional[str] = None):
+        """
+        Append one attempt and update the user's running statistics
+
+        Args:
+            username: User who attempted to authenticate
+            distance: Cosine distance of the attempt
+            success: Whether the attempt was accepted
+            timestamp: ISO timestamp (defaults to now)
+        """
+        distance = float(distance)
+        timestamp = timestamp or datetime.now().isoformat()
+        with self._lock:
+            user = self._user(username)
+            user['total_attempts'] += 1
+            user['successful' if success else 'failed'] += 1
+            if success:
+                user['success_distance'].update(distance)
+                user['success_sketch'].update(distance)
+            else:
+                user['failure_sketch'].update(distance)
+
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO attempts (username, timestamp, distance, success) VALUES (?, ?, ?, ?)",
+                    (username, timestamp, distance, int(success))
+                )
+                self._write_user(username)
+        logger.debug(f"Recorded attempt for '{username}' (distance {distance:.4f})")
+
+    def record_adaptation(self, username: str, distance: float, method: str, drift: float):
+        """
+        Log an automatic update of a user's voice profile
+
+        Args:
+            username: User whose profile was updated
+            distance: Distance of the attempt that triggered the update
+            method: Update method ('ema' or 'reservoir')
+            drift: Cosine distance between the profile before and after
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO adaptations (username, timestamp, distance, method, drift) VALUES (?, ?, ?, ?, ?)",
+                (username, datetime.now().isoformat(), float(distance), method, float(drift))
+            )
+        logger.debug(f"Recorded profile adaptation for '{username}' ({method}, drift {drift:.4f})")
+
+    def adaptations(self, username: str, limit: int = RECENT_ATTEMPTS) -> list:
+        """
+        Most recent profile adaptations for a user, oldest first
+
+        Returns:
+            List of (timestamp, distance, method, drift) tuples
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, distance, method, drift FROM adaptations "
+                "WHERE username = ? ORDER BY id DESC LIMIT ?",
+                (username, limit)
+            ).fetchall()
+        return list(reversed(rows))
+
+    def recent(self, username: str, limit: int = RECENT_ATTEMPTS) -> list:
+        """
+        Most recent attempts for a user, oldest first
+
+        Returns:
+            List of (timestamp, distance, success) tuples
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, distance, success FROM attempts "
+                "WHERE username = ? ORDER BY id DESC LIMIT ?",
+                (username, limit)
+            ).fetchall()
+        return [(timestamp, distance, bool(success)) for timestamp, distance, success in reversed(rows)]
+
+    def error_rates(self, username: str, threshold: float) -> dict:
+        """
+        Estimate false-reject and false-accept rates at a threshold
+
+        Accepted attempts stand in for genuine speakers and rejected ones for
+        impostors. Both were cut off by the threshold in force at the time, so
+        FRR is informative for stricter thresholds and FAR for looser ones.
+
+        Returns:
+            Dict with 'frr' and 'far' (None when there is no data)
+        """
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                return {'frr': None, 'far': None}
+            genuine = user['success_sketch'].cdf(threshold)
+            impostor = user['failure_sketch'].cdf(threshold)
+        return {
+            'frr': None if genuine is None else 1.0 - genuine,
+            'far': impostor,
+        }
+
+    def stats(self, username: str) -> dict:
+        """
+        Authentication statistics for a user
+
+        Returns:
+            Dict with total_attempts, successful, failed, success_rate and, once
+            there is a successful attempt, avg/std_success_distance,
+            success/failure distance quantiles, suggested_threshold and the
+            estimated FRR/FAR at it; the number of profile_adaptations; plus
+            the recent 'distances' and 'timestamps'
+        """
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                return {
+                    'total_attempts': 0,
+                    'successful': 0,
+                    'failed': 0,
+                    'success_rate': 0.0
+                }
+            stats = {
+                'total_attempts': user['total_attempts'],
+                'successful': user['successful'],
+                'failed': user['failed'],
+                'success_rate': user['successful'] / max(1, user['total_attempts']),
+                'success_quantiles': user['success_sketch'].quantiles(),
+                'failure_quantiles': user['failure_sketch'].quantiles(),
+            }
+            running = user['success_distance']
+            # Sketches are empty for users imported from the legacy JSON file
+            # without recent attempts; fall back to mean + 2 std there
+            genuine_percentile = user['success_sketch'].quantile(SUGGESTED_PERCENTILE)
+
+        if running.count > 0:
+            stats['avg_success_distance'] = running.mean
+            stats['std_success_distance'] = running.std
+
+            # Suggest the threshold that accepts SUGGESTED_PERCENTILE of genuine attempts
+            if genuine_percentile is None:
+                genuine_percentile = running.mean + 2 * running.std
+            suggested = min(0.35, max(0.20, genuine_percentile))
+            stats['suggested_threshold'] = suggested
+            rates = self.error_rates(username, suggested)
+            stats['estimated_frr'] = rates['frr']
+            stats['estimated_far'] = rates['far']
+
+        with self._lock:
+            stats['profile_adaptations'] = self._conn.execute(
+                "SELECT COUNT(*) FROM adaptations WHERE username = ?", (username,)
+            ).fetchone()[0]
+
+        recent = self.recent(username)
+        stats['distances'] = [distance for _, distance, _ in recent]
+        stats['timestamps'] = [timestamp for timestamp, _, _ in recent]
+        return stats
+
+    def migrate_json(self, json_path: Union[str, Path]) -> int:
+        """
+        Import a legacy auth_history.json file
+
+        Counters and the recent attempts are imported; running statistics are
+        seeded from the stored mean/std. Users the database already has are
+        skipped. The file is renamed to '<name>.migrated' afterwards.
+
+        Returns:
+            Number of users imported
+        """
+        json_path = Path(json_path)
+        with open(json_path, 'r') as f:
+            history = json.load(f)
+
+        imported = {}
+        with self._lock:
+            # One transaction: an error rolls back every user, and the
+            # in-memory stats only change once it has committed
+            with self._conn:
+                for username, entry in history.items():
+                    if username in self._users:
+                        logger.warning(f"Skipping legacy history for '{username}': already in {self.db_path}")
+                        continue
+                    imported[username] = self._import_user(username, entry)
+            self._users.update(imported)
+
+        json_path.replace(json_path.with_name(json_path.name + '.migrated'))
+        logger.info(f"Migrated authentication history for {len(imported)} users from {json_path}")
+        return len(imported)
+
+    def _import_user(self, username: str, entry: dict) -> dict:
+        """Insert one legacy user's attempts and stats (inside migrate_json's transaction)"""
+        # The legacy lists are not aligned per attempt; recover each
+        # attempt's outcome by matching it against the success list
+        unmatched_successes = list(entry.get('success_distances', []))
+        success_sketch = QuantileSketch()
+        failure_sketch = QuantileSketch()
+        for timestamp, distance in zip(entry.get('timestamps', []), entry.get('distances', [])):
+            success = distance in unmatched_successes
+            if success:
+                unmatched_successes.remove(distance)
+            (success_sketch if success else failure_sketch).update(float(distance))
+            self._conn.execute(
+                "INSERT INTO attempts (username, timestamp, distance, success) VALUES (?, ?, ?, ?)",
+                (username, timestamp, float(distance), int(success))
+            )
+
+        successful = entry.get('successful', 0)
+        std = entry.get('std_success_distance', 0.0)
+        user = {
+            'total_attempts': entry.get('total_attempts', 0),
+            'successful': successful,
+            'failed': entry.get('failed', 0),
+            'success_distance': RunningStats(
+                successful, entry.get('avg_success_distance', 0.0), std * std * successful
+            ),
+            'success_sketch': success_sketch,
+            'failure_sketch': failure_sketch,
+        }
+        self._write_user(username, user)
+        return user
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_auth_history(db_path: Union[str, Path] = 'voice_profiles/auth_history.db',
+                      legacy_json: Union[str, Path] = 'voice_profiles/auth_history.json') -> AuthHistory:
+    """Open the history database, importing the legacy JSON file if present"""
+    history = AuthHistory(db_path)
+    if os.path.exists(legacy_json):
+        try:
+            history.migrate_json(legacy_json)
+        except Exception as e:
+            logger.warning(f"Failed to migrate auth history from {legacy_json}: {e}")
+    logger.info(f"Loaded authentication history for {len(history)} users")
+    return history
@@ -0,0 +1,518 @@
+"""
+Benchmarks
+==========
+Offline performance checks that need no microphone or model download.
+
+Usage:
+    python benchmarks.py index [--sizes 10000 50000] [--nlist 256]
+    python benchmarks.py preprocess [--trials 20]
+    python benchmarks.py denoise [--snr 5 10 20]
+    python benchmarks.py pipeline [--users 50]
+    python benchmarks.py imports [--modules main gui_app]
+    python benchmarks.py threads [--threads 1 2 4] [--processes 1 4] [--backend speechbrain]
+    python benchmarks.py scoring [--probes 1000] [--enrolled 1000]
+    python benchmarks.py precision [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy.signal import lfilter
+
+import audio_processing
+from latency_metrics import format_summary
+from speaker_index import FlatIndex, IVFIndex
+
+
+def synthetic_embeddings(n: int, dim: int = 192, clusters: int = 500,
+                         spread: float = 1.5, seed: int = 0) -> np.ndarray:
+    """
+    Random L2-normalized embeddings grouped around `clusters` centres,
+    roughly mimicking how real speaker embeddings cluster by accent/gender/channel
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    vectors = centres[rng.integers(0, clusters, n)] + noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _perturb(vectors: np.ndarray, noise: float, seed: int) -> np.ndarray:
+    """New recordings of the same speakers: enrolled vector plus session noise"""
+    rng = np.random.default_rng(seed)
+    probes = vectors + rng.standard_normal(vectors.shape).astype(np.float32) * (noise / np.sqrt(vectors.shape[1]))
+    return probes / np.linalg.norm(probes, axis=1, keepdims=True)
+
+
+def _time_queries(index, queries: np.ndarray, top_k: int):
+    """Run every query; return (results, mean latency in ms)"""
+    start = time.perf_counter()
+    results = [index.search(q, top_k) for q in queries]
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1000
+
+
+def bench_index(args):
+    """Recall vs latency of the IVF index against exact flat search"""
+    for n in args.sizes:
+        print(f"\n📊 {n} enrolled speakers, {args.dim}-d, {args.queries} probes")
+        vectors = synthetic_embeddings(n, args.dim, seed=args.seed)
+        keys = [f"user{i}" for i in range(n)]
+        rng = np.random.default_rng(args.seed + 1)
+        picked = rng.choice(n, args.queries, replace=False)
+        queries = _perturb(vectors[picked], args.noise, args.seed + 2)
+
+        flat = FlatIndex(args.dim, capacity=n)
+        for key, vector in zip(keys, vectors):
+            flat.add(key, vector)
+        truth, flat_ms = _time_queries(flat, queries, args.top_k)
+        truth_sets = [{key for key, _ in result} for result in truth]
+        true_owner = sum(truth[i][0][0] == keys[picked[i]] for i in range(len(picked))) / len(picked)
+        print(f"   flat        : {flat_ms:7.3f} ms/query  (top-1 is the true speaker: {true_owner:.1%})")
+
+        ivf = IVFIndex(args.dim, nlist=args.nlist, train_size=n + 1, seed=args.seed)
+        start = time.perf_counter()
+        ivf.train(vectors)
+        for key, vector in zip(keys, vectors):
+            ivf.add(key, vector)
+        build_s = time.perf_counter() - start
+        print(f"   ivf build   : {build_s:7.2f} s  (nlist={args.nlist})")
+
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            results, ivf_ms = _time_queries(ivf, queries, args.top_k)
+            recall_1 = np.mean([r[0][0] == t[0][0] for r, t in zip(results, truth)])
+            recall_k = np.mean([len({key for key, _ in r} & t) / len(t) for r, t in zip(results, truth_sets)])
+            print(f"   ivf nprobe={nprobe:<3}: {ivf_ms:7.3f} ms/query  "
+                  f"recall@1={recall_1:.3f}  recall@{args.top_k}={recall_k:.3f}  "
+                  f"speedup={flat_ms / ivf_ms:4.1f}x")
+
+        # Incremental maintenance cost on the trained index
+        start = time.perf_counter()
+        for i in range(min(1000, n)):
+            ivf.remove(keys[i])
+            ivf.add(keys[i], vectors[i])
+        churn_us = (time.perf_counter() - start) / min(1000, n) * 1e6
+        print(f"   ivf delete+insert: {churn_us:.1f} µs per speaker")
+
+
+def synthetic_utterance(sample_rate: int = 16000, duration: float = 5.0,
+                        seed: int = 0) -> np.ndarray:
+    """Noise floor with a 'spoken' middle section of harmonics under a syllable envelope"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = ((t > 1.0) & (t < 3.8)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2)
+    noise = rng.standard_normal(len(t)) * 0.005
+    return (0.2 * voice * envelope + noise).astype(np.float32)
+
+
+def _time_call(func, trials: int) -> float:
+    """Best-of-N wall time of func() in ms"""
+    best = float('inf')
+    for _ in range(trials):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _import_time(module: str) -> float:
+    """Seconds to import a module in a fresh interpreter"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    return float(result.stdout) if result.returncode == 0 else float('nan')
+
+
+def bench_preprocess(args):
+    """Parity and speed of audio_processing against librosa"""
+    audio = synthetic_utterance(args.sample_rate)
+    print(f"\n🔬 Preprocessing {len(audio) / args.sample_rate:.1f}s of audio")
+    print(f"   import audio_processing: {_import_time('audio_processing'):.3f} s")
+
+    try:
+        librosa = importlib.import_module('librosa')
+    except ImportError:
+        librosa = None
+        print("   librosa not installed: parity checks skipped")
+    else:
+        print(f"   import librosa:          {_import_time('librosa'):.3f} s")
+
+    ours = {
+        'trim': lambda: audio_processing.trim_silence(audio, top_db=20),
+        'normalize': lambda: audio_processing.normalize_peak(audio),
+        'preemphasis': lambda: audio_processing.preemphasis(audio, coef=0.97),
+        'resample 48k->16k': lambda: audio_processing.resample(audio, 48000, 16000),
+        'preprocess': lambda: audio_processing.preprocess(audio, args.sample_rate),
+    }
+    reference = {}
+    if librosa is not None:
+        def librosa_preprocess():
+            trimmed, _ = librosa.effects.trim(audio, top_db=20, frame_length=2048, hop_length=512)
+            if len(trimmed) < args.sample_rate:
+                trimmed = audio
+            return librosa.effects.preemphasis(librosa.util.normalize(trimmed), coef=0.97)
+
+        reference = {
+            'trim': lambda: librosa.effects.trim(audio, top_db=20, frame_length=2048, hop_length=512),
+            'normalize': lambda: librosa.util.normalize(audio),
+            'preemphasis': lambda: librosa.effects.preemphasis(audio, coef=0.97),
+            'resample 48k->16k': lambda: librosa.resample(audio, orig_sr=48000, target_sr=16000),
+            'preprocess': librosa_preprocess,
+        }
+
+    for name, func in ours.items():
+        line = f"   {name:<18}: {_time_call(func, args.trials):7.3f} ms"
+        if name in reference:
+            expected, actual = reference[name](), func()
+            line += f"  (librosa {_time_call(reference[name], args.trials):7.3f} ms"
+            if name == 'trim':
+                line += f", bounds {actual[1]} vs {tuple(int(i) for i in expected[1])})"
+            else:
+                n = min(len(expected), len(actual))
+                error = np.max(np.abs(np.asarray(expected[:n]) - np.asarray(actual[:n])))
+                line += f", max abs diff {error:.2e})"
+        print(line)
+    if librosa is not None:
+        print("   (resampling differs by design: librosa defaults to soxr, this uses a polyphase FIR; "
+              "tests/test_audio_processing.py bounds the difference)")
+
+
+def _snr_db(clean: np.ndarray, signal: np.ndarray) -> float:
+    """SNR of a signal against its clean reference in dB"""
+    return float(10 * np.log10(np.sum(clean ** 2) / max(np.sum((signal - clean) ** 2), 1e-20)))
+
+
+def bench_denoise(args):
+    """Cost and SNR gain of the spectral noise gate"""
+    clean = synthetic_utterance(args.sample_rate, args.duration, seed=args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    # Pink-ish office noise: white noise through a one-pole low-pass
+    white = rng.standard_normal(len(clean) + args.sample_rate).astype(np.float32)
+    noise = lfilter([1.0], [1.0, -0.9], white).astype(np.float32)
+    countdown, noise = noise[:args.sample_rate], noise[args.sample_rate:]
+    speech_power = np.mean(clean[clean != 0] ** 2)
+
+    print(f"\n🔇 Spectral gate on {args.duration:.1f}s of audio")
+    for snr in args.snr:
+        scale = np.sqrt(speech_power / np.mean(noise ** 2) / 10 ** (snr / 10))
+        noisy = clean + scale * noise
+        profile = audio_processing.NoiseProfile()
+        profile_ms = _time_call(lambda: audio_processing.NoiseProfile().update(scale * countdown), args.trials)
+        profile.update(scale * countdown)
+        gate_ms = _time_call(lambda: audio_processing.spectral_gate(noisy, profile), args.trials)
+        denoised = audio_processing.spectral_gate(noisy, profile)
+        print(f"   input SNR {snr:>4.0f} dB: {_snr_db(clean, noisy):5.1f} -> {_snr_db(clean, denoised):5.1f} dB  "
+              f"gate {gate_ms / args.duration:6.3f} ms per s of audio "
+              f"({args.duration * 1000 / gate_ms:5.0f}x real time), profile {profile_ms:.2f} ms")
+
+
+def synthetic_speaker(speaker: int, take: int, sample_rate: int = 16000,
+                      duration: float = 3.0) -> np.ndarray:
+    """
+    One 'take' of a synthetic speaker: pitch and harmonic timbre are fixed by
+    `speaker`, vibrato phase and background noise vary with `take`
+    """
+    voice_rng = np.random.default_rng([speaker, 0])
+    take_rng = np.random.default_rng([speaker, take + 1])
+    pitch = voice_rng.uniform(90, 250)
+    timbre = voice_rng.uniform(0.2, 1.0, 12) / np.arange(1, 13)
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    f0 = pitch * (1 + 0.05 * np.sin(2 * np.pi * 0.5 * t + take_rng.uniform(0, 2 * np.pi)))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(w * np.sin(k * phase) for k, w in enumerate(timbre, start=1))
+    # Syllable rhythm, with half a second of room noise before and after
+    envelope = (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t) ** 2) * ((t > 0.5) & (t < duration - 0.5))
+    noise = take_rng.standard_normal(len(t)) * 0.005
+    return (0.3 * voice * envelope / timbre.sum() + noise).astype(np.float32)
+
+
+@contextlib.contextmanager
+def _scratch_directory():
+    """Run in a throwaway working directory (profiles and history use relative paths)"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
+
+
+def bench_pipeline(args):
+    """Enrollment, verification and identification end to end with the fake encoder"""
+    from voice_authenticator import VoiceAuthenticator
+
+    with _scratch_directory():
+        auth = VoiceAuthenticator(backend='fake', sample_rate=args.sample_rate)
+        auth.load_enrollments()
+        enrollment_audio = [[synthetic_speaker(speaker, take, args.sample_rate) for take in range(args.samples)]
+                            for speaker in range(args.users)]
+        probe_audio = [synthetic_speaker(speaker, args.samples + 1, args.sample_rate)
+                       for speaker in range(args.users)]
+
+        start = time.perf_counter()
+        for speaker, takes in enumerate(enrollment_audio):
+            embeddings = [auth.extract_embedding(auth.preprocess_audio(audio)) for audio in takes]
+            auth.save_profile(f"user{speaker}", embeddings)
+        enroll_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        genuine, impostor, identified = [], [], 0
+        for speaker, audio in enumerate(probe_audio):
+            if not auth.check_quality(audio).ok:
+                continue
+            embedding = auth.extract_embedding(auth.preprocess_audio(audio))
+            genuine.append(auth.score_profile(embedding, auth.enrolled_embeddings[f"user{speaker}"]))
+            impostor.append(auth.score_profile(embedding, auth.enrolled_embeddings[f"user{(speaker + 1) % args.users}"]))
+            auth.record_attempt(f"user{speaker}", genuine[-1], genuine[-1] < auth.threshold)
+            candidates = auth.identify_embedding(embedding, top_k=1)
+            identified += bool(candidates) and candidates[0]['username'] == f"user{speaker}"
+        verify_s = time.perf_counter() - start
+        auth.auth_history.close()
+
+    print(f"\n🧪 Pipeline with the fake encoder: {args.users} users x {args.samples} samples")
+    print(f"   enrollment : {enroll_s:6.2f} s ({enroll_s / args.users * 1000:.1f} ms per user)")
+    print(f"   verification + identification: {verify_s / args.users * 1000:.1f} ms per probe")
+    print(f"   genuine distance {np.mean(genuine):.3f}, impostor (next user) {np.mean(impostor):.3f}, "
+          f"top-1 identification {identified / max(1, len(genuine)):.1%}")
+    print()
+    for line in format_summary(auth.latency_summary()).splitlines():
+        print(f"   {line}")
+
+
+def _thread_worker(kind: str, options: dict, threads: int, runs: int, audio: np.ndarray):
+    """Load a backend pinned to `threads` in a fresh process and time `runs` embeddings"""
+    from embedding_backends import create_backend
+
+    backend = create_backend(kind, threads=threads, **options)
+    backend.load()
+    backend.embed(audio)  # Warm-up
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(runs):
+        call_start = time.perf_counter()
+        backend.embed(audio)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def bench_threads(args):
+    """Embedding latency and throughput across thread pool sizes and concurrent processes"""
+    import multiprocessing
+
+    options = {'sample_rate': args.sample_rate}
+    if args.model_dir:
+        options['model_dir'] = args.model_dir
+    if args.path:
+        options['path'] = args.path
+    audio = synthetic_utterance(args.sample_rate, args.duration)
+    # Spawned workers start with fresh thread pools; torch cannot resize them after use
+    context = multiprocessing.get_context('spawn')
+
+    print(f"\n🧵 {args.backend} encoder, {args.duration:.1f} s utterance, {os.cpu_count()} cores")
+    print(f"   {'threads':>7}{'procs':>7}{'p50 ms':>10}{'p95 ms':>10}{'emb/s':>10}")
+    for processes in args.processes:
+        for threads in args.threads:
+            with context.Pool(processes) as pool:
+                results = pool.starmap(_thread_worker, [(args.backend, options, threads, args.runs, audio)] * processes)
+            latencies = np.concatenate([worker_latencies for worker_latencies, _ in results]) * 1000
+            throughput = sum(args.runs / wall for _, wall in results)
+            print(f"   {threads:>7}{processes:>7}{np.percentile(latencies, 50):>10.1f}"
+                  f"{np.percentile(latencies, 95):>10.1f}{throughput:>10.1f}")
+
+
+def bench_scoring(args):
+    """All-pairs scoring: one compute_similarity call per pair vs a single score_matrix call"""
+    from voice_authenticator import VoiceAuthenticator, score_matrix
+
+    probes = synthetic_embeddings(args.probes, args.dim, seed=args.seed)
+    enrolled = synthetic_embeddings(args.enrolled, args.dim, seed=args.seed + 1)
+    with _scratch_directory():
+        auth = VoiceAuthenticator(backend='fake')
+        auth.auth_history.close()
+
+    # The per-pair loop is timed on a slice and scaled up
+    pairs = min(args.probes, 20)
+    start = time.perf_counter()
+    looped = np.array([[auth.compute_similarity(p, e) for e in enrolled] for p in probes[:pairs]])
+    loop_s = (time.perf_counter() - start) * args.probes / pairs
+    matrix_ms = _time_call(lambda: score_matrix(probes, enrolled), args.trials)
+    error = np.abs(score_matrix(probes[:pairs], enrolled) - looped).max()
+
+    n_pairs = args.probes * args.enrolled
+    print(f"\n🧮 Scoring {args.probes} probes x {args.enrolled} enrolled ({n_pairs:,} pairs, dim {args.dim})")
+    print(f"   compute_similarity per pair: {loop_s:8.2f} s  ({loop_s / n_pairs * 1e6:.2f} µs per pair)")
+    print(f"   score_matrix (one GEMM)    : {matrix_ms / 1000:8.4f} s  ({matrix_ms * 1000 / n_pairs:.4f} µs per pair, "
+          f"{loop_s * 1000 / matrix_ms:,.0f}x faster)")
+    print(f"   max difference: {error:.2e}")
+
+
+def bench_precision(args):
+    """Memory, distance error and 1:N scan time of float32, float16 and int8 rows"""
+    from compact_embeddings import EMBEDDING_DTYPES, compact_scores, distance_error_bound, quantize, row_dtype
+
+    for n in args.sizes:
+        vectors = synthetic_embeddings(n, args.dim, seed=args.seed)
+        rng = np.random.default_rng(args.seed + 1)
+        picked = rng.choice(n, args.queries, replace=False)
+        queries = _perturb(vectors[picked], args.noise, args.seed + 2)
+        exact = queries @ vectors.T
+        exact_top = np.argmax(exact, axis=1)
+
+        print(f"\n🗜️  {n} enrolled rows, {args.dim}-d, {args.queries} probes")
+        print(f"   {'dtype':<8}{'bytes/row':>10}{'memory':>11}{'max |Δd|':>11}{'p99 |Δd|':>11}"
+              f"{'bound':>10}{'scan ms':>9}{'top-1 same':>12}")
+        for dtype in EMBEDDING_DTYPES:
+            values, scales = quantize(vectors, dtype)
+            # In place: at a million rows the score matrices dominate memory
+            error = compact_scores(values, scales, queries)
+            top = np.argmax(error, axis=1)
+            error -= exact
+            np.abs(error, out=error)
+            scan_ms = _time_call(lambda: compact_scores(values, scales, queries[0]), args.trials)
+            row_bytes = row_dtype(dtype, args.dim).itemsize
+            print(f"   {dtype:<8}{row_bytes:>10}{row_bytes * n / 2 ** 20:>8.1f} MB"
+                  f"{error.max():>11.2e}{np.percentile(error, 99):>11.2e}"
+                  f"{distance_error_bound(dtype, args.dim, scales):>10.2e}{scan_ms:>9.2f}"
+                  f"{np.mean(top == exact_top):>12.1%}")
+            del values, scales, error
+
+
+IMPORT_MODULES = ['main', 'gui_app', 'voice_authenticator', 'audio_processing', 'folder_encryption',
+                  'credential_manager', 'browser_automation']
+
+
+def _importtime(module: str, cwd: str):
+    """
+    Parse `python -X importtime -c 'import module'`
+
+    Returns:
+        (total seconds or None if the import failed, [(cumulative us, self us, name)], error text)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [cwd, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            capture_output=True, text=True, cwd=tempfile.gettempdir(), env=env)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    if result.returncode != 0:
+        return None, rows, result.stderr.strip().splitlines()[-1]
+    total = next((cumulative for cumulative, _, name in rows if name.strip() == module), 0)
+    return total / 1e6, rows, ''
+
+
+def bench_imports(args):
+    """Import time of the entry points and what dominates it"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"\n⏱️  Import time (python -X importtime, fresh interpreter each)")
+    for module in args.modules:
+        total, rows, error = _importtime(module, here)
+        if total is None:
+            print(f"   {module:<22}: failed ({error})")
+            continue
+        print(f"   {module:<22}: {total * 1000:7.1f} ms")
+        # Output is post-order with two spaces of indent per level: the module's
+        # direct imports are the depth-1 lines just before its own line
+        end = next(i for i, row in enumerate(rows) if row[2].strip() == module)
+        children = []
+        for cumulative, _, name in reversed(rows[:end]):
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if depth == 0:
+                break
+            if depth == 1:
+                children.append((cumulative, name.strip()))
+        for cumulative, name in sorted(children, reverse=True)[:args.top]:
+            print(f"      {cumulative / 1000:7.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice authentication benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help="Speaker index recall vs latency")
+    index_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    index_parser.add_argument('--dim', type=int, default=192)
+    index_parser.add_argument('--queries', type=int, default=500)
+    index_parser.add_argument('--top-k', type=int, default=10)
+    index_parser.add_argument('--nlist', type=int, default=256)
+    index_parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    index_parser.add_argument('--noise', type=float, default=0.5,
+                              help="Session noise added to probes (relative to the embedding norm)")
+    index_parser.add_argument('--seed', type=int, default=0)
+    index_parser.set_defaults(func=bench_index)
+
+    preprocess_parser = subparsers.add_parser('preprocess', help="Preprocessing parity and speed vs librosa")
+    preprocess_parser.add_argument('--sample-rate', type=int, default=16000)
+    preprocess_parser.add_argument('--trials', type=int, default=20)
+    preprocess_parser.set_defaults(func=bench_preprocess)
+
+    denoise_parser = subparsers.add_parser('denoise', help="Noise gate cost per second of audio")
+    denoise_parser.add_argument('--sample-rate', type=int, default=16000)
+    denoise_parser.add_argument('--duration', type=float, default=5.0)
+    denoise_parser.add_argument('--snr', type=float, nargs='+', default=[5, 10, 20])
+    denoise_parser.add_argument('--trials', type=int, default=20)
+    denoise_parser.add_argument('--seed', type=int, default=0)
+    denoise_parser.set_defaults(func=bench_denoise)
+
+    pipeline_parser = subparsers.add_parser('pipeline', help="End-to-end pipeline offline (fake encoder)")
+    pipeline_parser.add_argument('--users', type=int, default=50)
+    pipeline_parser.add_argument('--samples', type=int, default=3)
+    pipeline_parser.add_argument('--sample-rate', type=int, default=16000)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    imports_parser = subparsers.add_parser('imports', help="Import time of the entry points")
+    imports_parser.add_argument('--modules', nargs='+', default=IMPORT_MODULES)
+    imports_parser.add_argument('--top', type=int, default=5, help="Heaviest imports listed per module")
+    imports_parser.set_defaults(func=bench_imports)
+
+    threads_parser = subparsers.add_parser('threads', help="Encoder latency and throughput per thread count")
+    threads_parser.add_argument('--backend', default='speechbrain',
+                                help="speechbrain, torchscript, onnx or fake (dry run without a model)")
+    threads_parser.add_argument('--model-dir', help="Pinned SpeechBrain model directory")
+    threads_parser.add_argument('--path', help="Model file for the torchscript and onnx backends")
+    threads_parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    threads_parser.add_argument('--processes', type=int, nargs='+', default=[1],
+                                help="Concurrent authenticating processes sharing the CPU")
+    threads_parser.add_argument('--runs', type=int, default=20)
+    threads_parser.add_argument('--duration', type=float, default=3.0)
+    threads_parser.add_argument('--sample-rate', type=int, default=16000)
+    threads_parser.set_defaults(func=bench_threads)
+
+    scoring_parser = subparsers.add_parser('scoring', help="Per-pair vs matrix scoring throughput")
+    scoring_parser.add_argument('--probes', type=int, default=1000)
+    scoring_parser.add_argument('--enrolled', type=int, default=1000)
+    scoring_parser.add_argument('--dim', type=int, default=192)
+    scoring_parser.add_argument('--trials', type=int, default=5)
+    scoring_parser.add_argument('--seed', type=int, default=0)
+    scoring_parser.set_defaults(func=bench_scoring)
+
+    precision_parser = subparsers.add_parser('precision', help="float32 vs float16 vs int8 embedding rows")
+    precision_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    precision_parser.add_argument('--dim', type=int, default=192)
+    precision_parser.add_argument('--queries', type=int, default=100)
+    precision_parser.add_argument('--noise', type=float, default=0.5,
+                                  help="Session noise added to probes (relative to the embedding norm)")
+    precision_parser.add_argument('--trials', type=int, default=10)
+    precision_parser.add_argument('--seed', type=int, default=0)
+    precision_parser.set_defaults(func=bench_precision)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Compact Embeddings Module
+=========================
+Reduced-precision rows for L2-normalized voice embeddings.
+
+Formats:
+- float32: 4 bytes per value (reference)
+- float16: 2 bytes per value
+- int8:    1 byte per value plus one float32 scale per row (symmetric,
+           scale = max|x| / 127)
+
+Worst-case cosine distance error of a stored unit row x against a unit probe p:
+- float16: each value is rounded to within 2^-11 of itself, so
+           |error| <= 2^-11 * sum|x_i p_i| <= 2^-11 (about 4.9e-4)
+- int8:    each value is within scale/2, so |error| <= scale/2 * ||p||_1
+           <= scale/2 * sqrt(dim)
+distance_error_bound() evaluates these bounds; `python benchmarks.py
+precision` measures the error that actually occurs.
+
+Profiles loaded from a compact store keep their rows in the stored format:
+'embedding' and 'samples' are float16/int8 views into the memory map and
+int8 profiles add the per-row 'scales' (mean embedding first). Score them
+with profile_rows() + compact_scores(); profile_embedding() and
+profile_samples() decode to float32 where full precision is needed.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+# Rows dequantized at a time while scoring: small enough to stay in cache
+SCORE_BLOCK_ROWS = 8192
+
+# Profile keys holding embedding rows rather than metadata
+ROW_KEYS = ('embedding', 'samples', 'scales')
+
+
+def _check_dtype(dtype: str):
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unknown embedding dtype '{dtype}' (choose from {', '.join(EMBEDDING_DTYPES)})")
+
+
+def row_dtype(dtype: str, dim: int) -> np.dtype:
+    """
+    On-disk record of one embedding row
+
+    Float formats map to a (dim,) sub-array, so a memory map of them is a
+    plain (rows, dim) matrix; int8 rows are (scale, values) records.
+    """
+    _check_dtype(dtype)
+    if dtype == 'int8':
+        return np.dtype([('scale', '<f4'), ('values', 'i1', (dim,))])
+    return np.dtype(('<f4' if dtype == 'float32' else '<f2', (dim,)))
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert float rows to a compact format
+
+    Args:
+        matrix: (n, dim) float rows
+        dtype: 'float32', 'float16' or 'int8'
+
+    Returns:
+        (values, scales); scales is None for the float formats
+    """
+    _check_dtype(dtype)
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    if dtype == 'float32':
+        return matrix, None
+    if dtype == 'float16':
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    values = np.clip(np.rint(matrix / scales[:, np.newaxis]), -127, 127).astype(np.int8)
+    return values, scales.astype(np.float32)
+
+
+def dequantize(values: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Float32 rows back from (values, scales)"""
+    matrix = np.asarray(values).astype(np.float32)
+    if scales is not None:
+        matrix *= np.asarray(scales, dtype=np.float32)[:, np.newaxis]
+    return matrix
+
+
+def encode_rows(matrix: np.ndarray, dtype: str) -> np.ndarray:
+    """Float rows as an array of row_dtype records"""
+    values, scales = quantize(matrix, dtype)
+    records = np.empty(len(values), dtype=row_dtype(dtype, values.shape[1]))
+    if dtype == 'int8':
+        records['scale'] = scales
+        records['values'] = values
+    else:
+        records[...] = values
+    return records
+
+
+def split_records(records: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(values, scales) views of row_dtype records (no copy)"""
+    if records.dtype.names:
+        return records['values'], records['scale']
+    return records, None
+
+
+def _as_float32(values: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    if values.dtype == np.float32 and scales is None:
+        return values
+    return dequantize(values, scales)
+
+
+def decode_rows(records: np.ndarray) -> np.ndarray:
+    """Float32 rows from row_dtype records (float32 records are returned as-is)"""
+    return _as_float32(*split_records(records))
+
+
+def profile_rows(profile: dict, samples: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    A profile's rows as stored, without decoding
+
+    Args:
+        profile: Profile dict (float32, or compact as loaded from the store)
+        samples: Return the sample rows when the profile has any; otherwise
+                 (or if False) the mean embedding as a single row
+
+    Returns:
+        ((k, dim) values, (k,) int8 scales or None)
+    """
+    scales = profile.get('scales')
+    rows = profile.get('samples') if samples else None
+    if rows is None or len(rows) == 0:
+        return np.atleast_2d(profile['embedding']), None if scales is None else scales[:1]
+    return rows, None if scales is None else scales[1:]
+
+
+def profile_embedding(profile: dict) -> np.ndarray:
+    """A profile's mean embedding as float32 (decoded only if stored compact)"""
+    return _as_float32(*profile_rows(profile, samples=False))[0]
+
+
+def profile_samples(profile: dict) -> Optional[np.ndarray]:
+    """A profile's sample rows as float32, or None if it has none"""
+    if profile.get('samples') is None or len(profile['samples']) == 0:
+        return None
+    return _as_float32(*profile_rows(profile))
+
+
+def compact_scores(values: np.ndarray, scales: Optional[np.ndarray], queries: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarities of compact rows against float queries
+
+    Rows are widened to float32 one cache-sized block at a time, so the
+    full-precision matrix never exists in memory; int8 scales are applied to
+    the block's scores rather than to its values.
+
+    Args:
+        values: (n, dim) float32, float16 or int8 rows
+        scales: (n,) int8 row scales (None for the float formats)
+        queries: (dim,) or (k, dim) float queries
+
+    Returns:
+        (n,) or (k, n) similarities
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    single = queries.ndim == 1
+    queries = np.atleast_2d(queries)
+    if values.dtype == np.float32:
+        scores = queries @ np.asarray(values).T
+    else:
+        scores = np.empty((len(queries), len(values)), dtype=np.float32)
+        for start in range(0, len(values), SCORE_BLOCK_ROWS):
+            block = np.asarray(values[start:start + SCORE_BLOCK_ROWS]).astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+    if scales is not None:
+        scores *= np.asarray(scales, dtype=np.float32)
+    return scores[0] if single else scores
+
+
+def distance_error_bound(dtype: str, dim: int, scales: Optional[np.ndarray] = None) -> float:
+    """
+    Worst-case cosine distance error of a stored unit row against any unit probe
+
+    Args:
+        dtype: Storage format
+        dim: Embedding dimension
+        scales: int8 row scales (the bound is taken over all of them)
+    """
+    _check_dtype(dtype)
+    if dtype == 'float32':
+        return 0.0
+    if dtype == 'float16':
+        return 2.0 ** -11
+    if scales is None or len(scales) == 0:
+        # Without scales, assume the largest possible value (1.0) in some row
+        return 0.5 / 127.0 * math.sqrt(dim)
+    return float(np.max(scales)) / 2.0 * math.sqrt(dim)
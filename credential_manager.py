@@ -8,9 +8,6 @@ using AES-128 encryption. Only decrypts after voice authentication.
 import json
 import os
 from pathlib import Path
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes, hmac
 from datetime import datetime
 import logging
 
@@ -46,6 +43,10 @@ class CredentialManager:
             True if successful, False otherwise
         """
         try:
+            from cryptography.hazmat.backends import default_backend
+            from cryptography.hazmat.primitives import hashes, hmac
+            from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+            
             # 1. Create credential object
             credential_data = {
                 "platform": platform,
@@ -119,6 +120,10 @@ class CredentialManager:
             ValueError: If decryption fails or HMAC verification fails
         """
         try:
+            from cryptography.hazmat.backends import default_backend
+            from cryptography.hazmat.primitives import hashes, hmac
+            from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+            
             # 1. Load encryption key
             key_file = self.keys_dir / f"{platform.lower()}_{owner}.key"
             if not key_file.exists():
@@ -0,0 +1,446 @@
+"""
+Embedding Backends Module
+=========================
+Speaker encoders behind one small interface, so the rest of the pipeline
+does not care where embeddings come from.
+
+Backends:
+- SpeechBrainBackend: pre-trained ECAPA-TDNN from SpeechBrain (default)
+- TorchScriptBackend: an exported TorchScript encoder (.pt)
+- ONNXBackend: an exported ONNX encoder run with onnxruntime
+- FakeBackend: deterministic random projection of spectral features; needs
+  only NumPy and runs in about a millisecond (tests, benchmarks, offline runs)
+
+Heavy dependencies (torch, speechbrain, onnxruntime) are imported when a
+backend is loaded, not when this module is imported.
+
+Thread pools: by default torch and onnxruntime use every core, which
+oversubscribes shared hosts when several processes authenticate at once.
+Pass `threads` (and `interop_threads`) to cap them; `python benchmarks.py
+threads` measures latency and throughput per setting.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from model_cache import MANIFEST_NAME, sha256_file, verify_model_dir
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend:
+    """
+    Common interface for speaker encoders
+
+    `embed` takes a preprocessed mono waveform at `sample_rate` and returns a
+    raw (not necessarily normalized) 1D embedding of length `dim`.
+    `model_version` identifies the weights; embeddings from different
+    versions are not comparable.
+    """
+
+    kind = None
+
+    def __init__(self, dim: int = 192, sample_rate: int = 16000,
+                 threads: Optional[int] = None, interop_threads: Optional[int] = None):
+        """
+        Args:
+            dim: Embedding dimension
+            sample_rate: Sample rate the model expects
+            threads: Intra-op CPU threads (None = library default, all cores)
+            interop_threads: Inter-op CPU threads (None = library default)
+        """
+        self.dim = dim
+        self.sample_rate = sample_rate
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.loaded = False
+        self._model_version = None
+
+    def load(self):
+        """Load model weights (idempotent)"""
+        if not self.loaded:
+            self._load()
+            self.loaded = True
+
+    def _load(self):
+        pass
+
+    @property
+    def model_version(self) -> str:
+        """Identifier of the encoder weights, recorded in every profile built with them"""
+        if self._model_version is None:
+            self._model_version = self._version()
+        return self._model_version
+
+    def _version(self) -> str:
+        return self.kind
+
+    def embed(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Embed one utterance
+
+        Args:
+            audio: 1D float waveform
+
+        Returns:
+            1D embedding
+        """
+        raise NotImplementedError
+
+    def embed_batch(self, audios: Sequence[np.ndarray]) -> np.ndarray:
+        """
+        Embed several utterances of possibly different lengths
+
+        The default embeds them one by one; encoders that accept padded
+        batches override it.
+
+        Returns:
+            (len(audios), dim) array of raw embeddings
+        """
+        if len(audios) == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(audio) for audio in audios])
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(dim={self.dim})"
+
+
+def _squeeze_embedding(embedding: np.ndarray) -> np.ndarray:
+    """Handle (batch, features) and (batch, 1, features) encoder outputs"""
+    if embedding.ndim == 3:
+        embedding = embedding.squeeze(1)  # Remove middle dimension if present
+    return embedding.squeeze(0)  # Remove batch dimension
+
+
+def configure_torch_threads(threads: Optional[int] = None, interop_threads: Optional[int] = None):
+    """
+    Size torch's process-wide CPU thread pools
+
+    Args:
+        threads: Intra-op threads (one operator split across cores)
+        interop_threads: Inter-op threads; torch only accepts this before it
+                         has run any parallel work, later calls are logged and ignored
+    """
+    import torch
+
+    if threads is not None:
+        torch.set_num_threads(threads)
+    if interop_threads is not None and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            logger.warning(f"Could not set torch inter-op threads to {interop_threads}: {e}")
+    logger.debug(f"torch threads: intra-op {torch.get_num_threads()}, "
+                 f"inter-op {torch.get_num_interop_threads()}")
+
+
+class _TorchBackend(EmbeddingBackend):
+    """Shared thread setup and tensor conversion for torch-based encoders"""
+
+    def load(self):
+        if not self.loaded:
+            configure_torch_threads(self.threads, self.interop_threads)
+        super().load()
+
+    def _encode(self, audio_tensor):
+        raise NotImplementedError
+
+    def embed(self, audio: np.ndarray) -> np.ndarray:
+        import torch
+
+        self.load()
+        # Wrap as a tensor without copying (contiguous float32 input is shared as-is)
+        audio_tensor = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+        if audio_tensor.dim() == 1:
+            audio_tensor = audio_tensor.unsqueeze(0)  # Add batch dimension
+        # inference_mode also skips version-counter and view tracking, unlike no_grad
+        with torch.inference_mode():
+            embedding = self._encode(audio_tensor)
+        return _squeeze_embedding(embedding.cpu().numpy())
+
+
+class SpeechBrainBackend(_TorchBackend):
+    """
+    Pre-trained SpeechBrain speaker encoder (ECAPA-TDNN by default)
+
+    With `model_dir` the model is loaded strictly offline from a pinned
+    directory (see model_cache.py): the files are checked against their
+    SHA-256 manifest, the Hugging Face hub is put in offline mode and
+    SpeechBrain uses the files in place instead of fetching or copying them.
+    """
+
+    kind = 'speechbrain'
+
+    def __init__(self,
+                 source: str = "speechbrain/spkrec-ecapa-voxceleb",
+                 savedir: Union[str, Path] = "pretrained_models/spkrec-ecapa-voxceleb",
+                 dim: int = 192,
+                 sample_rate: int = 16000,
+                 model_dir: Optional[Union[str, Path]] = None,
+                 verify: str = 'once',
+                 threads: Optional[int] = None,
+                 interop_threads: Optional[int] = None):
+        """
+        Args:
+            source: HuggingFace model path or local directory
+            savedir: Where the model files are kept
+            dim: Embedding dimension
+            sample_rate: Sample rate the model expects
+            model_dir: Pinned model directory for strict offline loading (overrides source/savedir)
+            verify: Manifest check for model_dir: 'once' (full hash, then only when
+                    files change) or 'always' (full hash at every load)
+            threads: Intra-op torch threads (None = all cores; process-wide)
+            interop_threads: Inter-op torch threads (None = torch default; process-wide)
+        """
+        if verify not in ('once', 'always'):
+            raise ValueError(f"Unknown verify mode '{verify}' (choose from 'once', 'always')")
+        super().__init__(dim, sample_rate, threads, interop_threads)
+        self.source = source
+        self.savedir = savedir
+        self.model_dir = Path(model_dir) if model_dir is not None else None
+        self.verify = verify
+        self.model = None
+
+    def _load(self):
+        # Disable symlinks on Windows to avoid permission errors
+        os.environ.setdefault("HF_HUB_DISABLE_SYMLINKS", "1")
+
+        # Compatibility shim for torchaudio builds without backend helpers
+        try:
+            import torchaudio
+            if not hasattr(torchaudio, "list_audio_backends"):
+                def _list_audio_backends():
+                    return ["soundfile"]
+                torchaudio.list_audio_backends = _list_audio_backends  # type: ignore[attr-defined]
+            if hasattr(torchaudio, "set_audio_backend"):
+                torchaudio.set_audio_backend("soundfile")
+        except Exception:
+            pass
+
+        if self.model_dir is not None:
+            self._load_pinned()
+            return
+
+        from speechbrain.pretrained import EncoderClassifier
+        from speechbrain.utils.fetching import LocalStrategy
+
+        logger.info(f"Loading model from {self.source}...")
+        self.model = EncoderClassifier.from_hparams(
+            source=self.source,
+            savedir=str(self.savedir),
+            local_strategy=LocalStrategy.COPY
+        )
+
+    def _load_pinned(self):
+        """Load from the pinned directory without touching the network or copying files"""
+        verify_model_dir(self.model_dir, force=self.verify == 'always')
+        # Any accidental hub lookup fails immediately instead of timing out
+        os.environ["HF_HUB_OFFLINE"] = "1"
+
+        from speechbrain.pretrained import EncoderClassifier
+        from speechbrain.utils.fetching import LocalStrategy
+
+        model_dir = str(self.model_dir.resolve())
+        # The published hyperparams point the pretrainer at the hub repo
+        hparams = (self.model_dir / 'hyperparams.yaml').read_text()
+        overrides = {'pretrained_path': model_dir} if 'pretrained_path:' in hparams else {}
+
+        logger.info(f"Loading pinned model from {self.model_dir} (offline)...")
+        self.model = EncoderClassifier.from_hparams(
+            source=model_dir,
+            savedir=model_dir,
+            overrides=overrides,
+            local_strategy=LocalStrategy.NO_LINK
+        )
+
+    def _version(self) -> str:
+        if self.model_dir is None:
+            return f"speechbrain:{self.source}"
+        # The manifest pins every file digest, so its own digest names the weights
+        manifest_path = self.model_dir / MANIFEST_NAME
+        digest = sha256_file(manifest_path)[:12] if manifest_path.exists() else 'unpinned'
+        return f"speechbrain:{self.model_dir.name}@{digest}"
+
+    def _encode(self, audio_tensor):
+        return self.model.encode_batch(audio_tensor)
+
+    def embed_batch(self, audios: Sequence[np.ndarray]) -> np.ndarray:
+        import torch
+
+        if len(audios) == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        self.load()
+        # Zero-pad to the longest utterance; relative lengths keep the padding
+        # out of the statistics pooling
+        lengths = np.array([len(audio) for audio in audios])
+        batch = np.zeros((len(audios), lengths.max()), dtype=np.float32)
+        for row, audio in zip(batch, audios):
+            row[:len(audio)] = audio
+        wav_lens = torch.from_numpy((lengths / lengths.max()).astype(np.float32))
+        with torch.inference_mode():
+            embeddings = self.model.encode_batch(torch.from_numpy(batch), wav_lens)
+        return embeddings.cpu().numpy().reshape(len(audios), -1)
+
+
+class TorchScriptBackend(_TorchBackend):
+    """
+    Exported TorchScript encoder
+
+    The module must map a (batch, samples) float32 waveform tensor to
+    (batch, dim) or (batch, 1, dim) embeddings.
+    """
+
+    kind = 'torchscript'
+
+    def __init__(self, path: Union[str, Path], dim: int = 192, sample_rate: int = 16000,
+                 threads: Optional[int] = None, interop_threads: Optional[int] = None):
+        """
+        Args:
+            path: TorchScript file saved with torch.jit.save
+            dim: Embedding dimension
+            sample_rate: Sample rate the model expects
+            threads: Intra-op torch threads (None = all cores; process-wide)
+            interop_threads: Inter-op torch threads (None = torch default; process-wide)
+        """
+        super().__init__(dim, sample_rate, threads, interop_threads)
+        self.path = Path(path)
+        self.model = None
+
+    def _load(self):
+        import torch
+
+        logger.info(f"Loading TorchScript encoder from {self.path}...")
+        self.model = torch.jit.load(str(self.path), map_location='cpu')
+        self.model.eval()
+
+    def _version(self) -> str:
+        return f"{self.kind}:{self.path.name}@{sha256_file(self.path)[:12]}"
+
+    def _encode(self, audio_tensor):
+        return self.model(audio_tensor)
+
+
+class ONNXBackend(EmbeddingBackend):
+    """
+    Exported ONNX encoder run with onnxruntime on the CPU
+
+    The graph's first input takes a (batch, samples) float32 waveform and its
+    first output is the (batch, dim) or (batch, 1, dim) embedding.
+    """
+
+    kind = 'onnx'
+
+    def __init__(self, path: Union[str, Path], dim: int = 192, sample_rate: int = 16000,
+                 threads: Optional[int] = None, interop_threads: Optional[int] = None):
+        """
+        Args:
+            path: .onnx model file
+            dim: Embedding dimension
+            sample_rate: Sample rate the model expects
+            threads: Intra-op threads of the session (None = all cores)
+            interop_threads: Inter-op threads of the session (None = onnxruntime default)
+        """
+        super().__init__(dim, sample_rate, threads, interop_threads)
+        self.path = Path(path)
+        self.session = None
+        self._input_name = None
+
+    def _load(self):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("ONNX backend requires onnxruntime: pip install onnxruntime") from e
+
+        logger.info(f"Loading ONNX encoder from {self.path}...")
+        options = onnxruntime.SessionOptions()
+        if self.threads is not None:
+            options.intra_op_num_threads = self.threads
+        if self.interop_threads is not None:
+            options.inter_op_num_threads = self.interop_threads
+        self.session = onnxruntime.InferenceSession(str(self.path), sess_options=options,
+                                                    providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def _version(self) -> str:
+        return f"{self.kind}:{self.path.name}@{sha256_file(self.path)[:12]}"
+
+    def embed(self, audio: np.ndarray) -> np.ndarray:
+        self.load()
+        batch = np.ascontiguousarray(audio, dtype=np.float32).reshape(1, -1)
+        embedding = self.session.run(None, {self._input_name: batch})[0]
+        return _squeeze_embedding(np.asarray(embedding))
+
+
+class FakeBackend(EmbeddingBackend):
+    """
+    Deterministic stand-in encoder: seeded random projection of spectral features
+
+    The features are the per-bin mean and standard deviation of the log power
+    spectrum, so the same recording always gives the same embedding and
+    recordings with similar spectra (same synthetic "speaker") land close
+    together. It has nothing to do with real speaker identity.
+    """
+
+    kind = 'fake'
+
+    def __init__(self, dim: int = 192, sample_rate: int = 16000, seed: int = 0,
+                 n_fft: int = 512, hop_length: int = 160,
+                 threads: Optional[int] = None, interop_threads: Optional[int] = None):
+        """
+        Args:
+            dim: Embedding dimension
+            sample_rate: Audio sample rate in Hz
+            seed: Seed of the projection matrix (same seed = same "model")
+            n_fft: Frame length of the spectral features
+            hop_length: Hop between frames
+            threads: Accepted for interface parity; the fake encoder is single-threaded numpy
+            interop_threads: Accepted for interface parity
+        """
+        super().__init__(dim, sample_rate, threads, interop_threads)
+        self.seed = seed
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self._window = np.hanning(n_fft).astype(np.float32)
+        n_bins = n_fft // 2 + 1
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((2 * n_bins, dim)) / np.sqrt(2 * n_bins)).astype(np.float32)
+
+    def _version(self) -> str:
+        return f"fake:seed{self.seed}-dim{self.dim}-fft{self.n_fft}-hop{self.hop_length}"
+
+    def embed(self, audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32).ravel()
+        if len(audio) < self.n_fft:
+            audio = np.pad(audio, (0, self.n_fft - len(audio)))
+        frames = np.lib.stride_tricks.sliding_window_view(audio, self.n_fft)[::self.hop_length]
+        log_power = np.log(np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-8)
+        # Remove the overall level so loudness does not move the embedding
+        log_power -= log_power.mean()
+        features = np.concatenate([log_power.mean(axis=0), log_power.std(axis=0)])
+        return features @ self.projection
+
+
+BACKEND_TYPES = {
+    SpeechBrainBackend.kind: SpeechBrainBackend,
+    TorchScriptBackend.kind: TorchScriptBackend,
+    ONNXBackend.kind: ONNXBackend,
+    FakeBackend.kind: FakeBackend,
+}
+
+
+def create_backend(kind: str = 'speechbrain', **kwargs) -> EmbeddingBackend:
+    """
+    Create an (unloaded) embedding backend by name
+
+    Args:
+        kind: 'speechbrain', 'torchscript', 'onnx' or 'fake'
+        **kwargs: Backend-specific options (e.g. path for 'torchscript'/'onnx',
+                  source/savedir for 'speechbrain', seed for 'fake')
+    """
+    if kind not in BACKEND_TYPES:
+        raise ValueError(f"Unknown embedding backend '{kind}' (choose from {', '.join(BACKEND_TYPES)})")
+    return BACKEND_TYPES[kind](**kwargs)
@@ -0,0 +1,409 @@
+"""
+Enrollment Store Module
+=======================
+On-disk storage for enrolled voice profiles.
+
+Layout (inside the store directory):
+- manifest.json:            format version, embedding dimension and dtype, current generation
+- embeddings-<gen>.<dtype>: raw little-endian rows, opened with a read-only
+                            memory map; each profile write appends a block of
+                            rows (mean embedding, then sample embeddings).
+                            Rows are float32 (.f32), float16 (.f16) or int8
+                            with a float32 scale in front (.i8), see
+                            compact_embeddings.py
+- metadata-<gen>.jsonl:     append-only log of profile writes and deletions
+
+Enrolling a user appends one block of rows and one log line; deleting
+appends one log line. Rows superseded by re-enrollment or deletion are reclaimed by
+compaction, which writes the next generation and switches the manifest
+atomically.
+"""
+
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+from compact_embeddings import (ROW_KEYS, decode_rows, encode_rows, profile_embedding, profile_samples,
+                                row_dtype, split_records)
+from file_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 3
+
+# Where the application keeps its profiles
+DEFAULT_STORE_DIR = 'voice_profiles/store'
+LEGACY_PICKLE_PATH = 'voice_profiles/enrollments.pkl'
+
+# Embedding file suffix per row dtype
+_SUFFIXES = {'float32': 'f32', 'float16': 'f16', 'int8': 'i8'}
+
+
+def _json_default(value):
+    """Make NumPy scalars/arrays in profile metadata JSON-serialisable"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot store {type(value).__name__} in profile metadata")
+
+
+class EnrollmentStore:
+    """
+    Memory-mapped, append-friendly store of voice profiles
+
+    Profiles are dicts with an 'embedding' vector, an optional (k, dim)
+    'samples' matrix and JSON-serialisable metadata. Loaded embeddings are
+    zero-copy views into the memory map in the store's dtype; int8 profiles
+    also carry their row 'scales' (see compact_embeddings.profile_rows).
+    """
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_STORE_DIR, dim: int = 192,
+                 dtype: str = 'float32'):
+        """
+        Args:
+            directory: Store directory (created on first write)
+            dim: Embedding dimension used when creating a new store
+            dtype: Row format used when creating a new store ('float32',
+                   'float16' or 'int8'); an existing store keeps its own (see convert)
+        """
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / 'manifest.json'
+        self.dim = dim
+        self.dtype = dtype
+        self.generation = 0
+        self._format_version = FORMAT_VERSION
+        self._matrix = np.zeros(0, dtype=row_dtype(dtype, dim))
+        self._rows = {}
+        self._counts = {}
+        self._metadata = {}
+        self._loaded = False
+
+    @property
+    def embeddings_path(self) -> Path:
+        return self.directory / f"embeddings-{self.generation:06d}.{_SUFFIXES[self.dtype]}"
+
+    @property
+    def metadata_path(self) -> Path:
+        return self.directory / f"metadata-{self.generation:06d}.jsonl"
+
+    @property
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    @property
+    def dead_rows(self) -> int:
+        """Rows no longer referenced by any profile"""
+        return len(self._matrix) - sum(self._counts.values())
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def row_bytes(self) -> int:
+        return row_dtype(self.dtype, self.dim).itemsize
+
+    def _map(self, rows: int):
+        """Memory-map the first `rows` rows of the embedding file"""
+        if rows == 0:
+            self._matrix = np.zeros(0, dtype=row_dtype(self.dtype, self.dim))
+        else:
+            # Float rows map to a (rows, dim) matrix, int8 rows to (scale, values) records
+            self._matrix = np.memmap(self.embeddings_path, dtype=row_dtype(self.dtype, self.dim),
+                                     mode='r', shape=(rows,))
+
+    def _records(self, username: str) -> np.ndarray:
+        row = self._rows[username]
+        return self._matrix[row:row + self._counts[username]]
+
+    def _profile(self, username: str) -> dict:
+        profile = dict(self._metadata[username])
+        values, scales = split_records(self._records(username))
+        profile['embedding'] = values[0]
+        if len(values) > 1:
+            profile['samples'] = values[1:]
+        if scales is not None:
+            profile['scales'] = scales
+        return profile
+
+    @staticmethod
+    def _block(profile: dict) -> np.ndarray:
+        """Mean embedding and sample rows of a (possibly compact) profile as float32"""
+        block = np.asarray(profile_embedding(profile), dtype='<f4').ravel()[np.newaxis]
+        samples = profile_samples(profile)
+        if samples is not None:
+            block = np.vstack([block, np.asarray(samples, dtype='<f4')])
+        return block
+
+    def open(self) -> Dict[str, dict]:
+        """
+        Load the store
+
+        Returns:
+            Profiles by username, with embeddings backed by the memory map
+        """
+        self._rows = {}
+        self._counts = {}
+        self._metadata = {}
+        self._loaded = True
+        if not self.exists:
+            return {}
+
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version', 0) > FORMAT_VERSION:
+            raise RuntimeError(
+                f"Enrollment store {self.directory} uses format version "
+                f"{manifest['format_version']}; this version supports up to {FORMAT_VERSION}"
+            )
+        self.dim = manifest['dim']
+        # Stores written before format 3 are always float32
+        self.dtype = manifest.get('dtype', 'float32')
+        self.generation = manifest['generation']
+        self._format_version = manifest.get('format_version', 1)
+
+        # A crash mid-append can leave a partial trailing row; ignore it
+        size = self.embeddings_path.stat().st_size if self.embeddings_path.exists() else 0
+        rows = size // self.row_bytes
+        self._map(rows)
+
+        if self.metadata_path.exists():
+            with open(self.metadata_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupt entry in {self.metadata_path}")
+                        continue
+                    username = entry['username']
+                    # Format 1 entries always covered a single row
+                    count = entry.get('count', 1)
+                    if entry['op'] == 'put' and entry['row'] + count <= rows:
+                        self._rows[username] = entry['row']
+                        self._counts[username] = count
+                        self._metadata[username] = entry['profile']
+                    elif entry['op'] == 'delete':
+                        self._rows.pop(username, None)
+                        self._counts.pop(username, None)
+                        self._metadata.pop(username, None)
+
+        self._remove_stale_generations()
+        logger.info(f"Opened enrollment store with {len(self._rows)} profiles "
+                    f"({self.dead_rows} reclaimable rows)")
+        return {username: self._profile(username) for username in self._rows}
+
+    def _write_manifest(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._format_version = FORMAT_VERSION
+        write_atomic(self.manifest_path, json.dumps({
+            'format_version': FORMAT_VERSION,
+            'dim': self.dim,
+            'dtype': self.dtype,
+            'generation': self.generation,
+        }, indent=2))
+
+    def _append_log(self, entry: dict):
+        with open(self.metadata_path, 'a') as f:
+            f.write(json.dumps(entry, default=_json_default) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def put(self, username: str, profile: dict) -> dict:
+        """
+        Store (or replace) a profile by appending one block of rows and one log entry
+
+        Args:
+            username: Profile owner
+            profile: Profile dict with an 'embedding' vector and optionally a
+                     (k, dim) 'samples' matrix
+
+        Returns:
+            The stored profile, with its embedding backed by the memory map
+        """
+        if not self._loaded:
+            self.open()
+        block = self._block(profile)
+        if not self.exists:
+            self.dim = block.shape[1]
+        if not self.exists or self._format_version < FORMAT_VERSION:
+            self._write_manifest()
+        if block.shape[1] != self.dim:
+            raise ValueError(f"Embedding has dimension {block.shape[1]}, store expects {self.dim}")
+
+        # Rows first, then the log entry that references them: a crash in
+        # between only leaves unreferenced rows
+        row = len(self._matrix)
+        with open(self.embeddings_path, 'ab') as f:
+            f.truncate(row * self.row_bytes)  # Drop a partial row left by a crash
+            f.write(encode_rows(block, self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._map(row + len(block))
+
+        metadata = {key: value for key, value in profile.items() if key not in ROW_KEYS}
+        self._append_log({'op': 'put', 'username': username, 'row': row, 'count': len(block),
+                          'profile': metadata})
+        self._rows[username] = row
+        self._counts[username] = len(block)
+        self._metadata[username] = json.loads(json.dumps(metadata, default=_json_default))
+
+        self._maybe_compact()
+        return self._profile(username)
+
+    def delete(self, username: str):
+        """Remove a profile (its rows are reclaimed by the next compaction)"""
+        if not self._loaded:
+            self.open()
+        if username not in self._rows:
+            return
+        self._append_log({'op': 'delete', 'username': username})
+        del self._rows[username]
+        del self._counts[username]
+        del self._metadata[username]
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.dead_rows >= 32 and self.dead_rows > sum(self._counts.values()):
+            self.compact()
+
+    def compact(self):
+        """Rewrite live profiles into a new generation and drop dead rows"""
+        usernames = list(self._rows)
+        self._write_generation(usernames, [self._records(u) for u in usernames],
+                               [self._metadata[u] for u in usernames])
+        logger.info(f"Compacted enrollment store to generation {self.generation}")
+
+    def convert(self, dtype: str) -> Dict[str, dict]:
+        """
+        Re-encode every row in another format, as a new generation
+
+        Converting to float16 or int8 is lossy; converting back does not
+        restore the dropped precision.
+
+        Args:
+            dtype: 'float32', 'float16' or 'int8'
+
+        Returns:
+            The stored profiles, decoded from the new rows
+        """
+        if not self._loaded:
+            self.open()
+        usernames = list(self._rows)
+        blocks = [encode_rows(decode_rows(self._records(u)), dtype) for u in usernames]
+        old_dtype, self.dtype = self.dtype, dtype
+        self._write_generation(usernames, blocks, [self._metadata[u] for u in usernames])
+        logger.info(f"Converted enrollment store from {old_dtype} to {dtype} "
+                    f"({self.row_bytes} bytes per row)")
+        return {username: self._profile(username) for username in usernames}
+
+    def rewrite(self, profiles: Dict[str, dict]) -> Dict[str, dict]:
+        """
+        Replace every profile in the store at once
+
+        The new profiles are written as the next generation and become
+        visible with the manifest switch; a crash before that leaves the old
+        generation in place. The embedding dimension may change.
+
+        Args:
+            profiles: Profile dicts by username (same form as put)
+
+        Returns:
+            The stored profiles, with embeddings backed by the memory map
+        """
+        if not self._loaded:
+            self.open()
+        usernames, blocks, metadata = [], [], []
+        for username, profile in profiles.items():
+            usernames.append(username)
+            blocks.append(encode_rows(self._block(profile), self.dtype))
+            metadata.append(json.loads(json.dumps(
+                {key: value for key, value in profile.items() if key not in ROW_KEYS},
+                default=_json_default
+            )))
+        dims = {len(profiles[username]['embedding']) for username in usernames}
+        if len(dims) > 1:
+            raise ValueError(f"Profiles have mixed embedding dimensions: {sorted(dims)}")
+        if dims:
+            self.dim = dims.pop()
+
+        self._write_generation(usernames, blocks, metadata)
+        logger.info(f"Rewrote {len(usernames)} profiles as generation {self.generation}")
+        return {username: self._profile(username) for username in usernames}
+
+    def _write_generation(self, usernames: List[str], blocks: List[np.ndarray], metadata: List[dict]):
+        """Write profiles (blocks of encoded rows) as the next generation and switch the manifest to it"""
+        live = np.ascontiguousarray(
+            np.concatenate(blocks) if blocks else np.zeros(0, dtype=row_dtype(self.dtype, self.dim))
+        )
+
+        self.generation += 1
+        with open(self.embeddings_path, 'wb') as f:
+            f.write(live.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        rows, counts = {}, {}
+        with open(self.metadata_path, 'w') as f:
+            row = 0
+            for username, block, profile in zip(usernames, blocks, metadata):
+                rows[username] = row
+                counts[username] = len(block)
+                f.write(json.dumps({'op': 'put', 'username': username, 'row': row,
+                                    'count': len(block), 'profile': profile}) + '\n')
+                row += len(block)
+            f.flush()
+            os.fsync(f.fileno())
+        # The manifest switch is the commit point of the new generation
+        self._write_manifest()
+
+        self._rows = rows
+        self._counts = counts
+        self._metadata = dict(zip(usernames, metadata))
+        self._map(len(live))
+        self._remove_stale_generations()
+
+    def _remove_stale_generations(self):
+        """Delete files left behind by earlier generations"""
+        current = {self.embeddings_path.name, self.metadata_path.name}
+        for pattern in ('embeddings-*', 'metadata-*.jsonl'):
+            for path in self.directory.glob(pattern):
+                if path.name not in current:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        # Still mapped by a live profile (Windows); retried next open
+                        pass
+
+    def migrate_legacy(self, pickle_path: Union[str, Path] = LEGACY_PICKLE_PATH) -> int:
+        """
+        Import the legacy enrollments.pkl file if it has not been migrated yet
+
+        Returns:
+            Number of profiles imported (0 if there was nothing to migrate)
+        """
+        if not Path(pickle_path).exists():
+            return 0
+        return self.migrate_pickle(pickle_path)
+
+    def migrate_pickle(self, pickle_path: Union[str, Path]) -> int:
+        """
+        Import profiles from a legacy enrollments.pkl file
+
+        The pickle is renamed to '<name>.migrated' afterwards so it is only
+        imported once.
+
+        Returns:
+            Number of profiles imported
+        """
+        pickle_path = Path(pickle_path)
+        with open(pickle_path, 'rb') as f:
+            profiles = pickle.load(f)
+        for username, profile in profiles.items():
+            self.put(username, profile)
+        pickle_path.replace(pickle_path.with_name(pickle_path.name + '.migrated'))
+        logger.info(f"Migrated {len(profiles)} profiles from {pickle_path} to {self.directory}")
+        return len(profiles)
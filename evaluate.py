@@ -0,0 +1,272 @@
+"""
+Evaluation
+==========
+Verification accuracy and latency of the full pipeline on a labelled corpus.
+
+Corpus layout: one sub-directory per speaker, named after the speaker,
+holding that speaker's WAV files. The first --enroll files of each speaker
+(in name order) build the profile; the rest are probes, scored against
+every profile (genuine trials against their own, impostor trials against
+all others).
+
+Reports:
+- EER (equal error rate) and the threshold where it occurs
+- FAR/FRR at the configured threshold
+- DET curve (FRR at fixed FAR points; full curve with --det-csv / --det-plot)
+- Per-stage latency of loading, quality check, preprocessing and embedding
+
+Usage:
+    python evaluate.py corpus/ [--enroll 3] [--threshold 0.30] [--scoring topm]
+    python evaluate.py corpus/ --backend onnx --backend-path ecapa.onnx --det-csv det.csv
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import audio_processing
+from audio_capture import VoiceActivityDetector
+from latency_metrics import format_summary
+from voice_authenticator import VoiceAuthenticator, build_profile
+
+logger = logging.getLogger(__name__)
+
+# False accept rates at which the DET summary reports the false reject rate
+DET_POINTS = (0.001, 0.01, 0.05, 0.10)
+
+
+def load_corpus(directory: Path) -> Dict[str, List[Path]]:
+    """WAV files per speaker sub-directory, in name order"""
+    corpus = {}
+    for speaker_dir in sorted(directory.iterdir()):
+        if speaker_dir.is_dir():
+            files = sorted(speaker_dir.glob('*.wav'))
+            if files:
+                corpus[speaker_dir.name] = files
+    return corpus
+
+
+def error_rates(genuine: np.ndarray, impostor: np.ndarray, threshold: float) -> Tuple[float, float]:
+    """
+    False accept and false reject rate at a distance threshold
+
+    A trial is accepted when its distance is below the threshold, as in authenticate().
+    """
+    far = float(np.mean(impostor < threshold)) if len(impostor) else 0.0
+    frr = float(np.mean(genuine >= threshold)) if len(genuine) else 0.0
+    return far, frr
+
+
+def det_curve(genuine: np.ndarray, impostor: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    False accept and false reject rates at every distinct score
+
+    Returns:
+        (thresholds, far, frr), with thresholds ascending
+    """
+    genuine, impostor = np.sort(genuine), np.sort(impostor)
+    thresholds = np.unique(np.concatenate([genuine, impostor, [np.inf]]))
+    far = np.searchsorted(impostor, thresholds, side='left') / max(1, len(impostor))
+    frr = 1.0 - np.searchsorted(genuine, thresholds, side='left') / max(1, len(genuine))
+    return thresholds, far, frr
+
+
+def equal_error_rate(genuine: np.ndarray, impostor: np.ndarray) -> Tuple[float, float]:
+    """
+    Rate at which false accepts and false rejects are equal
+
+    Returns:
+        (EER, threshold where it occurs)
+    """
+    thresholds, far, frr = det_curve(genuine, impostor)
+    i = int(np.argmin(np.abs(far - frr)))
+    return float((far[i] + frr[i]) / 2), float(thresholds[i])
+
+
+def frr_at_far(far: np.ndarray, frr: np.ndarray, target: float) -> float:
+    """Lowest false reject rate with a false accept rate of at most `target`"""
+    allowed = far <= target
+    return float(frr[allowed].min()) if np.any(allowed) else 1.0
+
+
+def leading_noise(audio: np.ndarray, sample_rate: int, pre_roll: float = 0.3) -> np.ndarray:
+    """
+    Background audio before the speaker starts, as a live capture hands it to
+    the noise profile (everything before the first voiced frame, less the pre-roll)
+    """
+    vad = VoiceActivityDetector(sample_rate)
+    vad.process(audio)
+    onset = vad.speech_start
+    if onset is None:
+        return audio[:0]
+    return audio[:max(0, onset - int(pre_roll * sample_rate))]
+
+
+def warm_up_preprocessing(auth: VoiceAuthenticator):
+    """Preprocess once untimed so one-off imports (scipy.signal) stay out of the histogram"""
+    noise = np.random.default_rng(0).standard_normal(auth.sample_rate).astype(np.float32) * 0.01
+    profile = audio_processing.NoiseProfile()
+    profile.update(noise)
+    audio_processing.preprocess(noise, auth.sample_rate, noise_profile=profile)
+
+
+def embed_file(auth: VoiceAuthenticator, path: Path):
+    """Load, quality-check, preprocess and embed one file (None if it fails the quality gate)"""
+    with auth.metrics.span('load'):
+        audio = auth.load_audio(str(path))
+    if not auth.check_quality(audio).ok:
+        return None
+    # Gate with the file's own background noise, like a live login gates with
+    # the noise heard during its countdown
+    noise_profile = audio_processing.NoiseProfile()
+    noise_profile.update(leading_noise(audio, auth.sample_rate))
+    return auth.extract_embedding(auth.preprocess_audio(audio, noise_profile=noise_profile))
+
+
+def evaluate(auth: VoiceAuthenticator, corpus: Dict[str, List[Path]], enroll: int = 3) -> dict:
+    """
+    Enroll every speaker from their first files and score the rest
+
+    Args:
+        auth: Authenticator providing the encoder, scoring mode and threshold
+        corpus: WAV files per speaker
+        enroll: Files per speaker used for enrollment
+
+    Returns:
+        Genuine and impostor distances, top-1 identification accuracy and counts
+    """
+    warm_up_preprocessing(auth)
+    profiles, probes, labels, rejected = {}, [], [], []
+    for speaker, files in corpus.items():
+        embeddings = []
+        for path in files:
+            embedding = embed_file(auth, path)
+            if embedding is None:
+                rejected.append(path)
+            elif len(embeddings) < enroll and speaker not in profiles:
+                embeddings.append(embedding)
+                if len(embeddings) == enroll:
+                    profiles[speaker] = build_profile(embeddings, auth.backend.model_version, auth.denoise)
+            else:
+                probes.append(embedding)
+                labels.append(speaker)
+        if speaker not in profiles and embeddings:
+            profiles[speaker] = build_profile(embeddings, auth.backend.model_version, auth.denoise)
+
+    if not probes:
+        raise ValueError(f"No probe files left after enrolling {enroll} files per speaker")
+
+    usernames, distances = auth.score_profiles(np.array(probes), profiles)
+    own = np.array([usernames.index(label) for label in labels], dtype=int)
+    mask = np.zeros(distances.shape, dtype=bool)
+    mask[np.arange(len(own)), own] = True
+    return {
+        'genuine': distances[mask],
+        'impostor': distances[~mask],
+        'identification': float(np.mean(np.argmin(distances, axis=1) == own)) if len(own) else 0.0,
+        'speakers': len(profiles),
+        'probes': len(probes),
+        'rejected': rejected,
+    }
+
+
+def _plot_det(far: np.ndarray, frr: np.ndarray, path: str):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from scipy.stats import norm
+
+    # Normal-deviate axes, as is customary for DET plots
+    eps = 1e-4
+    ticks = np.array([0.001, 0.01, 0.05, 0.2, 0.5])
+    fig, ax = plt.subplots(figsize=(5, 5))
+    ax.plot(norm.ppf(np.clip(far, eps, 1 - eps)), norm.ppf(np.clip(frr, eps, 1 - eps)))
+    for axis in (ax.xaxis, ax.yaxis):
+        axis.set_ticks(norm.ppf(ticks))
+        axis.set_ticklabels([f"{t:.1%}" for t in ticks])
+    ax.set_xlabel("False accept rate")
+    ax.set_ylabel("False reject rate")
+    ax.grid(True)
+    fig.savefig(path, bbox_inches='tight')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verification accuracy and latency on a labelled WAV corpus")
+    parser.add_argument('corpus', help="Directory with one sub-directory of WAV files per speaker")
+    parser.add_argument('--enroll', type=int, default=3, help="Files per speaker used for enrollment")
+    parser.add_argument('--threshold', type=float, default=0.30)
+    parser.add_argument('--scoring', default='centroid', help="centroid, mean, max or topm")
+    parser.add_argument('--top-m', type=int, default=3)
+    parser.add_argument('--backend', default='speechbrain', help="speechbrain, torchscript, onnx or fake")
+    parser.add_argument('--backend-path', help="Model file for the torchscript and onnx backends")
+    parser.add_argument('--model-dir', help="Pinned SpeechBrain model directory")
+    parser.add_argument('--no-denoise', action='store_true',
+                        help="Evaluate without the noise gate (for an authenticator run with denoise=False)")
+    parser.add_argument('--det-csv', help="Write the full DET curve (threshold, far, frr) to this file")
+    parser.add_argument('--det-plot', help="Plot the DET curve to this image (needs matplotlib)")
+    args = parser.parse_args()
+    # voice_authenticator configures INFO logging on import; keep the report readable
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+
+    corpus = load_corpus(Path(args.corpus))
+    if not corpus:
+        print(f"❌ No speaker directories with WAV files in {args.corpus}")
+        raise SystemExit(1)
+    outputs = [os.path.abspath(path) if path else None for path in (args.det_csv, args.det_plot)]
+    corpus = {speaker: [path.resolve() for path in files] for speaker, files in corpus.items()}
+    backend_options = {'path': args.backend_path} if args.backend_path else {}
+
+    # The authenticator keeps its history under ./voice_profiles; keep that out of the real one
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            auth = VoiceAuthenticator(threshold=args.threshold, scoring=args.scoring, top_m=args.top_m,
+                                      backend=args.backend, backend_options=backend_options,
+                                      model_dir=args.model_dir, denoise=not args.no_denoise)
+            results = evaluate(auth, corpus, args.enroll)
+            if auth.auth_history is not None:
+                auth.auth_history.close()
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        finally:
+            os.chdir(cwd)
+
+    genuine, impostor = results['genuine'], results['impostor']
+    thresholds, far, frr = det_curve(genuine, impostor)
+    eer, eer_threshold = equal_error_rate(genuine, impostor)
+    far_at, frr_at = error_rates(genuine, impostor, args.threshold)
+
+    print(f"\n📊 {results['speakers']} speakers, {results['probes']} probes "
+          f"({len(genuine)} genuine / {len(impostor)} impostor trials), "
+          f"{len(results['rejected'])} files failed the quality gate")
+    print(f"   encoder: {auth.backend.model_version}, scoring: {args.scoring}")
+    print(f"   EER: {eer:.2%} at threshold {eer_threshold:.3f}")
+    print(f"   threshold {args.threshold:.3f}: FAR {far_at:.2%}, FRR {frr_at:.2%}")
+    print(f"   top-1 identification: {results['identification']:.1%}")
+    print(f"   DET: " + ", ".join(f"FRR {frr_at_far(far, frr, p):.1%} @ FAR {p:.1%}" for p in DET_POINTS))
+    print()
+    for line in format_summary(auth.latency_summary()).splitlines():
+        print(f"   {line}")
+
+    det_csv, det_plot = outputs
+    if det_csv:
+        np.savetxt(det_csv, np.column_stack([thresholds, far, frr]), delimiter=',',
+                   header='threshold,far,frr', comments='', fmt='%.6f')
+        print(f"\n💾 DET curve written to {det_csv}")
+    if det_plot:
+        try:
+            _plot_det(far, frr, det_plot)
+            print(f"💾 DET plot written to {det_plot}")
+        except ImportError:
+            print("⚠️  matplotlib is not installed; use --det-csv instead")
+
+
+if __name__ == "__main__":
+    main()
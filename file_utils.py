@@ -0,0 +1,18 @@
+"""
+File Utilities
+==============
+Small filesystem helpers shared by the on-disk stores.
+"""
+
+import os
+from pathlib import Path
+
+
+def write_atomic(path: Path, text: str):
+    """Replace a file's contents so readers never see a partial write"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
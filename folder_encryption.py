@@ -20,10 +20,6 @@ import hashlib
 import logging
 from datetime import datetime
 
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-
 logger = logging.getLogger(__name__)
 
 class FolderEncryption:
@@ -47,6 +43,9 @@ class FolderEncryption:
         Returns:
             Tuple of (key, salt)
         """
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        
         if salt is None:
             salt = os.urandom(16)
         
@@ -68,6 +67,7 @@ class FolderEncryption:
         Returns:
             Encryption key
         """
+        from cryptography.fernet import Fernet
         return Fernet.generate_key()
     
     def save_key(self, key: bytes, filepath: str, password: Optional[str] = None):
@@ -84,6 +84,8 @@ class FolderEncryption:
         }
         
         if password:
+            from cryptography.fernet import Fernet
+            
             # Encrypt the key with password-derived key
             derived_key, salt = self.generate_key_from_password(password)
             fernet_key = base64.urlsafe_b64encode(derived_key)
@@ -120,6 +122,7 @@ class FolderEncryption:
         if key_data.get('encrypted'):
             if not password:
                 raise ValueError("Password required to decrypt key file")
+            from cryptography.fernet import Fernet
             salt = bytes.fromhex(key_data['salt'])
             derived_key, _ = self.generate_key_from_password(password, salt=salt)
             fernet_key = base64.urlsafe_b64encode(derived_key)
@@ -132,6 +135,7 @@ class FolderEncryption:
     
     def set_key(self, key: bytes):
         """Set the encryption key"""
+        from cryptography.fernet import Fernet
         self.key = key
         self.fernet = Fernet(key)
     
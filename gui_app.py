@@ -11,9 +11,10 @@ from datetime import datetime
 import json
 
 from voice_authenticator import VoiceAuthenticator
+from audio_quality import AudioQualityError
 from folder_encryption import FolderEncryption
 from credential_manager import CredentialManager
-from browser_automation import BrowserAutomation
+from session_manager import SessionManager
 
 # Configure theme
 ctk.set_appearance_mode("dark")
@@ -25,17 +26,31 @@ class VoiceLockGUI:
         self.root.title("Voice-Authenticated Folder Lock")
         self.root.geometry("1000x700")
         
-        # Initialize backend
-        self.voice_auth = None
+        # Initialize backend; the voice model loads and warms up in the background
+        # while the login screen is shown
+        self.voice_auth = VoiceAuthenticator(background_load=True)
+        self.voice_auth.load_enrollments()
+        self.voice_auth.model_ready.add_done_callback(self._on_model_ready)
         self.encryption = FolderEncryption()
         self.cred_manager = CredentialManager()
         self.current_user = None
+        # One voice check covers lock, unlock and platform logins for a few minutes
+        self.sessions = SessionManager(ttl=300, idle_timeout=120)
+        self.session_token = None
         self.config_file = 'folder_lock_config.json'
         self.config = self._load_config()
         
         # Show login screen
         self.show_login_screen()
         
+    def _on_model_ready(self, future):
+        """Report a failed background model load (runs on the loader thread)"""
+        error = future.exception()
+        if error is not None:
+            self.root.after(0, lambda: messagebox.showerror(
+                "Voice Model Error", f"The voice model could not be loaded:\n{error}"
+            ))
+    
     def _load_config(self):
         """Load system configuration"""
         if Path(self.config_file).exists():
@@ -57,6 +72,81 @@ class VoiceLockGUI:
         for widget in self.root.winfo_children():
             widget.destroy()
     
+    def _progress_updater(self, window, progress=None, timer_label=None):
+        """Build a recording progress callback that updates widgets from a worker thread"""
+        def on_progress(elapsed, max_duration):
+            if progress is not None:
+                window.after(0, lambda p=elapsed / max_duration: progress.set(p))
+            if timer_label is not None:
+                window.after(0, lambda r=max_duration - elapsed: timer_label.configure(text=f"⏱️ up to {r:.1f}s left"))
+        return on_progress
+    
+    def _countdown_updater(self, window, countdown_label, status_label=None,
+                           tick_format="{}", recording_text="🔴",
+                           status_text="🔴 RECORDING NOW! Please speak..."):
+        """Build a countdown callback (the microphone is already open while it runs)"""
+        def on_tick(remaining):
+            if remaining > 0:
+                window.after(0, lambda: countdown_label.configure(text=tick_format.format(remaining)))
+                if status_label is not None:
+                    window.after(0, lambda: status_label.configure(text="Get ready to speak..."))
+            else:
+                window.after(0, lambda: countdown_label.configure(text=recording_text))
+                if status_label is not None:
+                    window.after(0, lambda: status_label.configure(text=status_text))
+        return on_tick
+    
+    def _record_voice(self, window, progress=None, timer_label=None, duration=5, on_countdown=None):
+        """Record until the speaker finishes, updating progress widgets as audio arrives"""
+        return self.voice_auth.record_audio(
+            duration=duration,
+            show_countdown=False,
+            progress_callback=self._progress_updater(window, progress, timer_label),
+            countdown_callback=on_countdown
+        )
+    
+    def _verify_voice(self, window, username, progress=None, timer_label=None, duration=5, on_countdown=None):
+        """
+        Record and verify a user, deciding as soon as the match is clear
+        
+        Raises AudioQualityError (whose message is a retry prompt) when the
+        recording was unusable rather than a voice mismatch.
+        """
+        with self.voice_auth.metrics.span('gui_verify'):
+            authenticated, distance, _ = self.voice_auth.authenticate_streaming(
+                username,
+                max_duration=duration,
+                show_countdown=False,
+                progress_callback=self._progress_updater(window, progress, timer_label),
+                countdown_callback=on_countdown
+            )
+        report = self.voice_auth.last_quality
+        if not authenticated and report is not None and not report.ok:
+            raise AudioQualityError(report)
+        return authenticated, distance
+    
+    def _start_session(self, username):
+        """Open a session after a successful voice check (replacing any earlier one)"""
+        self.sessions.revoke(self.session_token)
+        self.session_token = self.sessions.issue(username)
+    
+    def _session_active(self):
+        """True while the current user's last voice check still covers sensitive actions"""
+        return self.sessions.validate(self.session_token, self.current_user) is not None
+    
+    def _end_session(self):
+        self.sessions.revoke(self.session_token)
+        self.session_token = None
+    
+    def _run_with_session(self, action, error_title):
+        """Run a sensitive action covered by the session in a worker thread, reporting errors"""
+        def run():
+            try:
+                action()
+            except Exception as e:
+                messagebox.showerror("Error", f"{error_title}: {str(e)}")
+        threading.Thread(target=run, daemon=True).start()
+    
     # ==================== LOGIN SCREEN ====================
     
     def show_login_screen(self):
@@ -106,11 +196,6 @@ class VoiceLockGUI:
         )
         card_subtitle.pack(pady=(0, 30))
         
-        # Initialize voice auth to get enrolled users
-        if self.voice_auth is None:
-            self.voice_auth = VoiceAuthenticator()
-            self.voice_auth.load_enrollments()
-        
         enrolled_users = self.voice_auth.list_enrolled_users()
         
         # User selection
@@ -145,6 +230,19 @@ class VoiceLockGUI:
                 hover_color="#1e40af"
             )
             login_btn.pack(pady=10)
+            
+            # Identify button (no username needed)
+            identify_btn = ctk.CTkButton(
+                login_card,
+                text="🎙️ Just Speak (Identify Me)",
+                command=self.handle_identify_login,
+                width=300,
+                height=50,
+                font=("Segoe UI", 16),
+                fg_color="#7c3aed",
+                hover_color="#6d28d9"
+            )
+            identify_btn.pack(pady=10)
         
         # Register button
         register_btn = ctk.CTkButton(
@@ -214,66 +312,26 @@ class VoiceLockGUI:
         progress.set(0)
         
         def authenticate():
-            import time
-            import sounddevice as sd
-            
             try:
-                # Countdown 3, 2, 1
-                for count in [3, 2, 1]:
-                    loading_window.after(0, lambda c=count: countdown_label.configure(text=str(c)))
-                    loading_window.after(0, lambda: status_label.configure(text="Recording will start in..."))
-                    time.sleep(1)
-                
-                # Recording
                 duration = 5
-                loading_window.after(0, lambda: countdown_label.configure(text="🔴"))
-                loading_window.after(0, lambda: status_label.configure(text="🔴 RECORDING NOW! Please speak..."))
+                if username not in self.voice_auth.enrolled_embeddings:
+                    raise ValueError(f"User {username} not enrolled")
                 
-                # Start recording with timer updates
-                start_time = time.time()
-                audio_data = sd.rec(
-                    int(duration * self.voice_auth.sample_rate),
-                    samplerate=self.voice_auth.sample_rate,
-                    channels=1,
-                    dtype='float32'
+                # Microphone opens with the countdown; verify while recording
+                on_countdown = self._countdown_updater(loading_window, countdown_label, status_label)
+                authenticated, distance = self._verify_voice(
+                    loading_window, username, progress, timer_label, duration, on_countdown
                 )
                 
-                # Update timer during recording
-                while time.time() - start_time < duration:
-                    elapsed = time.time() - start_time
-                    remaining = duration - elapsed
-                    progress_val = elapsed / duration
-                    loading_window.after(0, lambda p=progress_val: progress.set(p))
-                    loading_window.after(0, lambda r=remaining: timer_label.configure(text=f"⏱️ {r:.1f}s remaining"))
-                    time.sleep(0.1)
-                
-                sd.wait()
-                audio_data = audio_data.squeeze()
-                
-                # Processing
                 loading_window.after(0, lambda: countdown_label.configure(text=""))
-                loading_window.after(0, lambda: status_label.configure(text="Processing..."))
                 loading_window.after(0, lambda: timer_label.configure(text=""))
                 loading_window.after(0, lambda: progress.set(1.0))
                 
-                # Preprocess and extract embedding
-                audio_data = self.voice_auth.preprocess_audio(audio_data)
-                
-                if username not in self.voice_auth.enrolled_embeddings:
-                    raise ValueError(f"User {username} not enrolled")
-                
-                stored_embedding = self.voice_auth.enrolled_embeddings[username]['embedding']
-                test_embedding = self.voice_auth.extract_embedding(audio_data)
-                distance = self.voice_auth.compute_similarity(test_embedding, stored_embedding)
-                authenticated = distance < self.voice_auth.threshold
-                
-                # Update history
-                self.voice_auth._update_auth_history(username, distance, authenticated)
-                
                 loading_window.after(0, loading_window.destroy)
                 
                 if authenticated:
                     self.current_user = username
+                    self._start_session(username)
                     self.root.after(0, self.show_main_dashboard)
                     messagebox.showinfo(
                         "Success",
@@ -292,6 +350,69 @@ class VoiceLockGUI:
         thread = threading.Thread(target=authenticate, daemon=True)
         thread.start()
     
+    def handle_identify_login(self):
+        """Log in by voice alone: identify the speaker among all enrolled users"""
+        window = ctk.CTkToplevel(self.root)
+        window.title("Identifying")
+        window.geometry("450x320")
+        window.transient(self.root)
+        window.grab_set()
+        
+        title = ctk.CTkLabel(window, text="🎙️ Who's speaking?", font=("Segoe UI", 18, "bold"))
+        title.pack(pady=(30, 10))
+        countdown_label = ctk.CTkLabel(window, text="", font=("Segoe UI", 48, "bold"), text_color="#7c3aed")
+        countdown_label.pack(pady=15)
+        status_label = ctk.CTkLabel(window, text="Get ready to speak...", font=("Segoe UI", 14))
+        status_label.pack(pady=10)
+        progress = ctk.CTkProgressBar(window, width=350)
+        progress.pack(pady=20)
+        progress.set(0)
+        
+        def identify():
+            try:
+                on_countdown = self._countdown_updater(window, countdown_label, status_label)
+                with self.voice_auth.metrics.span('gui_identify'):
+                    audio_data = self._record_voice(window, progress, on_countdown=on_countdown)
+                    window.after(0, lambda: status_label.configure(text="Identifying..."))
+                    
+                    candidates = self.voice_auth.identify(audio_data, top_k=2)
+                window.after(0, window.destroy)
+                
+                report = self.voice_auth.last_quality
+                if report is not None and not report.ok:
+                    messagebox.showwarning("Please Try Again", f"🎤 {report.message}")
+                    return
+                
+                best = candidates[0] if candidates else None
+                identified = (best is not None
+                              and best['distance'] < self.voice_auth.threshold
+                              and best['margin'] >= self.voice_auth.identification_margin)
+                # A margin-only rejection is most likely the real user, too close
+                # to someone else: it is neither a genuine accept nor an impostor
+                # distance, so it is not logged
+                if identified or (best is not None and best['distance'] >= self.voice_auth.threshold):
+                    self.voice_auth.record_attempt(best['username'], best['distance'], identified)
+                
+                if identified:
+                    self.current_user = best['username']
+                    self._start_session(best['username'])
+                    self.root.after(0, self.show_main_dashboard)
+                    messagebox.showinfo(
+                        "Success",
+                        f"✅ Welcome back, {best['username']}!\n\nSimilarity: {(1-best['distance'])*100:.1f}%"
+                    )
+                else:
+                    messagebox.showerror(
+                        "Not Recognized",
+                        "❌ Could not identify you confidently.\n\nPlease try again or select your username."
+                    )
+            except Exception as e:
+                window.after(0, window.destroy)
+                messagebox.showerror("Error", f"Identification error: {str(e)}")
+        
+        thread = threading.Thread(target=identify, daemon=True)
+        thread.start()
+    
     # ==================== REGISTRATION SCREEN ====================
     
     def show_registration_screen(self):
@@ -443,100 +564,48 @@ class VoiceLockGUI:
         status.pack(pady=10)
         
         def enroll():
-            import time
-            import sounddevice as sd
-            import numpy as np
-            from pathlib import Path
-            
             try:
                 num_samples = 5
                 duration = 5
-                embeddings = []
                 
-                for i in range(num_samples):
-                    # Update sample label
-                    enroll_window.after(0, lambda i=i: sample_label.configure(
-                        text=f"Sample {i+1} of {num_samples}"
-                    ))
-                    enroll_window.after(0, lambda: instruction.configure(
-                        text="Recording will start in..."
-                    ))
-                    enroll_window.after(0, lambda: progress.set((i) / num_samples))
-                    
-                    # Countdown 3, 2, 1
-                    for count in [3, 2, 1]:
-                        enroll_window.after(0, lambda c=count: countdown_label.configure(
-                            text=str(c)
+                with self.voice_auth.start_enrollment(username) as pipeline:
+                    for i in range(num_samples):
+                        # Update sample label
+                        enroll_window.after(0, lambda i=i: sample_label.configure(
+                            text=f"Sample {i+1} of {num_samples}"
                         ))
-                        time.sleep(1)
-                    
-                    # Recording
-                    enroll_window.after(0, lambda: countdown_label.configure(text="🔴"))
-                    enroll_window.after(0, lambda: instruction.configure(
-                        text="🔴 RECORDING NOW! Please speak..."
-                    ))
-                    
-                    # Record audio
-                    audio_data = sd.rec(
-                        int(duration * self.voice_auth.sample_rate),
-                        samplerate=self.voice_auth.sample_rate,
-                        channels=1,
-                        dtype='float32'
-                    )
-                    sd.wait()
-                    audio_data = audio_data.squeeze()
-                    
-                    # Preprocess
-                    audio_data = self.voice_auth.preprocess_audio(audio_data)
+                        enroll_window.after(0, lambda i=i: progress.set(i / num_samples))
+                        
+                        # Record audio (countdown is cosmetic, stops once the passphrase is finished)
+                        on_countdown = self._countdown_updater(enroll_window, countdown_label, instruction)
+                        audio_data = self._record_voice(enroll_window, duration=duration, on_countdown=on_countdown)
+                        report = self.voice_auth.check_quality(audio_data)
+                        while not report.ok:
+                            # Unusable take: ask again straight away instead of embedding it
+                            enroll_window.after(0, lambda m=report.message: status.configure(
+                                text=f"⚠️ {m}. Recording sample {i+1} again..."
+                            ))
+                            audio_data = self._record_voice(enroll_window, duration=duration, on_countdown=on_countdown)
+                            report = self.voice_auth.check_quality(audio_data)
+                        
+                        # Preprocess, embed and save on a worker while the next sample records
+                        pipeline.submit(audio_data)
+                        
+                        # Update status
+                        enroll_window.after(0, lambda i=i: status.configure(
+                            text=f"✅ Sample {i+1} recorded successfully!"
+                        ))
+                        enroll_window.after(0, lambda: countdown_label.configure(text=""))
                     
-                    # Extract embedding
+                    # Wait for the last samples, then average, store and save the profile
+                    # (also updates the identification index)
                     enroll_window.after(0, lambda: instruction.configure(
-                        text="Processing recording..."
+                        text="Creating voice profile..."
                     ))
-                    embedding = self.voice_auth.extract_embedding(audio_data)
-                    embeddings.append(embedding)
-                    
-                    # Save sample
-                    user_dir = Path("voice_profiles") / username
-                    user_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    import soundfile as sf
-                    sf.write(user_dir / f"sample_{i+1}.wav", audio_data, self.voice_auth.sample_rate)
-                    
-                    # Update status
-                    enroll_window.after(0, lambda i=i: status.configure(
-                        text=f"✅ Sample {i+1} recorded successfully!"
-                    ))
-                    enroll_window.after(0, lambda: countdown_label.configure(text=""))
-                    
-                    time.sleep(0.5)
+                    enroll_window.after(0, lambda: progress.set(1.0))
+                    profile = pipeline.finish()
                 
-                # Average embeddings
-                enroll_window.after(0, lambda: instruction.configure(
-                    text="Creating voice profile..."
-                ))
-                enroll_window.after(0, lambda: progress.set(1.0))
-                
-                avg_embedding = np.mean(embeddings, axis=0)
-                
-                # Calculate consistency
-                distances = []
-                for emb in embeddings:
-                    dist = self.voice_auth.compute_similarity(emb, avg_embedding)
-                    distances.append(dist)
-                mean_dist = np.mean(distances)
-                
-                # Store enrollment
-                from datetime import datetime
-                self.voice_auth.enrolled_embeddings[username] = {
-                    'embedding': avg_embedding,
-                    'num_samples': num_samples,
-                    'enrolled_at': datetime.now().isoformat(),
-                    'mean_distance': float(mean_dist)
-                }
-                
-                # Save to disk
-                self.voice_auth._save_enrollments()
+                mean_dist = profile['mean_distance']
                 
                 enroll_window.after(0, enroll_window.destroy)
                 
@@ -835,6 +904,11 @@ class VoiceLockGUI:
             messagebox.showwarning("Already Locked", "This folder is already locked!")
             return
         
+        # Still within the session of the last voice check: no need to record again
+        if self._session_active():
+            self._run_with_session(lambda: self._lock_folder_now(folder_path), "Failed to lock folder")
+            return
+        
         # Show authentication dialog with countdown
         auth_window = ctk.CTkToplevel(self.root)
         auth_window.title("Authenticating to Lock")
@@ -877,91 +951,28 @@ class VoiceLockGUI:
         progress.set(0)
         
         def authenticate_and_lock():
-            import time, sounddevice as sd
-            
             try:
-                # Countdown
-                for count in [3, 2, 1]:
-                    auth_window.after(0, lambda c=count: countdown_label.configure(text=str(c)))
-                    auth_window.after(0, lambda: instruction.configure(text="Recording will start in..."))
-                    time.sleep(1)
-                
-                # Recording
+                # Microphone opens with the countdown; verify while recording
                 duration = 5
-                auth_window.after(0, lambda: countdown_label.configure(text="🔴"))
-                auth_window.after(0, lambda: instruction.configure(text="🔴 RECORDING! Speak now..."))
-                
-                start_time = time.time()
-                audio_data = sd.rec(int(duration * self.voice_auth.sample_rate),
-                                   samplerate=self.voice_auth.sample_rate, channels=1, dtype='float32')
-                
-                while time.time() - start_time < duration:
-                    elapsed = time.time() - start_time
-                    remaining = duration - elapsed
-                    progress_val = elapsed / duration
-                    auth_window.after(0, lambda p=progress_val: progress.set(p))
-                    auth_window.after(0, lambda r=remaining: timer_label.configure(text=f"⏱️ {r:.1f}s remaining"))
-                    time.sleep(0.1)
-                
-                sd.wait()
-                audio_data = audio_data.squeeze()
+                on_countdown = self._countdown_updater(
+                    auth_window, countdown_label, instruction, status_text="🔴 RECORDING! Speak now..."
+                )
+                authenticated, distance = self._verify_voice(
+                    auth_window, self.current_user, progress, timer_label, duration, on_countdown
+                )
                 
-                # Processing
                 auth_window.after(0, lambda: countdown_label.configure(text=""))
-                auth_window.after(0, lambda: instruction.configure(text="Processing..."))
                 auth_window.after(0, lambda: timer_label.configure(text=""))
                 auth_window.after(0, lambda: progress.set(1.0))
                 
-                # Authenticate
-                audio_data = self.voice_auth.preprocess_audio(audio_data)
-                stored_embedding = self.voice_auth.enrolled_embeddings[self.current_user]['embedding']
-                test_embedding = self.voice_auth.extract_embedding(audio_data)
-                distance = self.voice_auth.compute_similarity(test_embedding, stored_embedding)
-                authenticated = distance < self.voice_auth.threshold
-                self.voice_auth._update_auth_history(self.current_user, distance, authenticated)
-                
                 auth_window.after(0, auth_window.destroy)
                 
                 if not authenticated:
                     messagebox.showerror("Failed", "Voice authentication failed!")
                     return
                 
-                # Generate key and encrypt
-                key = self.encryption.generate_key()
-                self.encryption.set_key(key)
-                
-                # Save key
-                import os
-                os.makedirs("keys", exist_ok=True)
-                key_file = f"keys/{self.current_user}_{Path(folder_path).name}_key.bin"
-                with open(key_file, 'wb') as f:
-                    f.write(key)
-                
-                # Encrypt folder
-                stats = self.encryption.encrypt_folder(str(folder_path), delete_original=False)
-                
-                # Delete originals
-                deleted = 0
-                for root, dirs, files in os.walk(str(folder_path)):
-                    for file in files:
-                        if not file.endswith('.encrypted'):
-                            os.remove(os.path.join(root, file))
-                            deleted += 1
-                
-                # Update config
-                self.config['locked_folders'][str(Path(folder_path).resolve())] = {
-                    'owner': self.current_user,
-                    'locked_at': datetime.now().isoformat(),
-                    'key_file': key_file,
-                    'stats': stats
-                }
-                self._save_config()
-                
-                self.refresh_folders_list()
-                messagebox.showinfo(
-                    "Success",
-                    f"✅ Folder locked successfully!\n\nFiles encrypted: {stats['encrypted_files']}\nOriginals deleted: {deleted}"
-                )
+                self._start_session(self.current_user)
+                self._lock_folder_now(folder_path)
             except Exception as e:
                 auth_window.after(0, progress.stop)
                 auth_window.after(0, auth_window.destroy)
@@ -970,6 +981,45 @@ class VoiceLockGUI:
         thread = threading.Thread(target=authenticate_and_lock, daemon=True)
         thread.start()
     
+    def _lock_folder_now(self, folder_path):
+        """Encrypt a folder for the current user (caller has verified the user)"""
+        # Generate key and encrypt
+        key = self.encryption.generate_key()
+        self.encryption.set_key(key)
+        
+        # Save key
+        import os
+        os.makedirs("keys", exist_ok=True)
+        key_file = f"keys/{self.current_user}_{Path(folder_path).name}_key.bin"
+        with open(key_file, 'wb') as f:
+            f.write(key)
+        
+        # Encrypt folder
+        stats = self.encryption.encrypt_folder(str(folder_path), delete_original=False)
+        
+        # Delete originals
+        deleted = 0
+        for root, dirs, files in os.walk(str(folder_path)):
+            for file in files:
+                if not file.endswith('.encrypted'):
+                    os.remove(os.path.join(root, file))
+                    deleted += 1
+        
+        # Update config
+        self.config['locked_folders'][str(Path(folder_path).resolve())] = {
+            'owner': self.current_user,
+            'locked_at': datetime.now().isoformat(),
+            'key_file': key_file,
+            'stats': stats
+        }
+        self._save_config()
+        
+        self.refresh_folders_list()
+        messagebox.showinfo(
+            "Success",
+            f"✅ Folder locked successfully!\n\nFiles encrypted: {stats['encrypted_files']}\nOriginals deleted: {deleted}"
+        )
+    
     def show_unlock_dialog(self):
         """Show dialog to select folder to unlock"""
         user_folders = {k: v for k, v in self.config['locked_folders'].items() 
@@ -1024,6 +1074,12 @@ class VoiceLockGUI:
             messagebox.showerror("Error", "Folder not found in locked list")
             return
         
+        # Still within the session of the last voice check: no need to record again
+        if self._session_active():
+            self._run_with_session(lambda: self._unlock_folder_now(folder_path, folder_info),
+                                   "Failed to unlock folder")
+            return
+        
         # Show authentication dialog with countdown
         auth_window = ctk.CTkToplevel(self.root)
         auth_window.title("Authenticating to Unlock")
@@ -1066,86 +1122,28 @@ class VoiceLockGUI:
         progress.set(0)
         
         def authenticate_and_unlock():
-            import time, sounddevice as sd
-            
             try:
-                # Countdown
-                for count in [3, 2, 1]:
-                    auth_window.after(0, lambda c=count: countdown_label.configure(text=str(c)))
-                    auth_window.after(0, lambda: instruction.configure(text="Recording will start in..."))
-                    time.sleep(1)
-                
-                # Recording
+                # Microphone opens with the countdown; verify while recording
                 duration = 5
-                auth_window.after(0, lambda: countdown_label.configure(text="🔴"))
-                auth_window.after(0, lambda: instruction.configure(text="🔴 RECORDING! Speak now..."))
-                
-                start_time = time.time()
-                audio_data = sd.rec(int(duration * self.voice_auth.sample_rate),
-                                   samplerate=self.voice_auth.sample_rate, channels=1, dtype='float32')
-                
-                while time.time() - start_time < duration:
-                    elapsed = time.time() - start_time
-                    remaining = duration - elapsed
-                    progress_val = elapsed / duration
-                    auth_window.after(0, lambda p=progress_val: progress.set(p))
-                    auth_window.after(0, lambda r=remaining: timer_label.configure(text=f"⏱️ {r:.1f}s remaining"))
-                    time.sleep(0.1)
-                
-                sd.wait()
-                audio_data = audio_data.squeeze()
+                on_countdown = self._countdown_updater(
+                    auth_window, countdown_label, instruction, status_text="🔴 RECORDING! Speak now..."
+                )
+                authenticated, distance = self._verify_voice(
+                    auth_window, self.current_user, progress, timer_label, duration, on_countdown
+                )
                 
-                # Processing
                 auth_window.after(0, lambda: countdown_label.configure(text=""))
-                auth_window.after(0, lambda: instruction.configure(text="Processing..."))
                 auth_window.after(0, lambda: timer_label.configure(text=""))
                 auth_window.after(0, lambda: progress.set(1.0))
                 
-                # Authenticate  
-                audio_data = self.voice_auth.preprocess_audio(audio_data)
-                stored_embedding = self.voice_auth.enrolled_embeddings[self.current_user]['embedding']
-                test_embedding = self.voice_auth.extract_embedding(audio_data)
-                distance = self.voice_auth.compute_similarity(test_embedding, stored_embedding)
-                authenticated = distance < self.voice_auth.threshold
-                self.voice_auth._update_auth_history(self.current_user, distance, authenticated)
-                
                 auth_window.after(0, auth_window.destroy)
                 
                 if not authenticated:
                     messagebox.showerror("Failed", "Voice authentication failed!")
                     return
                 
-                # Load key
-                key_file = folder_info['key_file']
-                with open(key_file, 'rb') as f:
-                    key = f.read()
-                
-                self.encryption.set_key(key)
-                
-                # Decrypt folder
-                stats = self.encryption.decrypt_folder(str(folder_path), delete_encrypted=False)
-                
-                # Ask to delete encrypted files
-                delete = messagebox.askyesno(
-                    "Delete Encrypted Files?",
-                    f"Folder unlocked successfully!\n\nFiles decrypted: {stats['decrypted_files']}\n\nDelete encrypted files?"
-                )
-                
-                if delete:
-                    import os
-                    deleted = 0
-                    for root, dirs, files in os.walk(str(folder_path)):
-                        for file in files:
-                            if file.endswith('.encrypted'):
-                                os.remove(os.path.join(root, file))
-                                deleted += 1
-                
-                # Remove from config
-                del self.config['locked_folders'][str(folder_path)]
-                self._save_config()
-                
-                self.refresh_folders_list()
-                messagebox.showinfo("Success", f"✅ Folder unlocked successfully!")
+                self._start_session(self.current_user)
+                self._unlock_folder_now(folder_path, folder_info)
                 
             except Exception as e:
                 auth_window.after(0, progress.stop)
@@ -1155,6 +1153,40 @@ class VoiceLockGUI:
         thread = threading.Thread(target=authenticate_and_unlock, daemon=True)
         thread.start()
     
+    def _unlock_folder_now(self, folder_path, folder_info):
+        """Decrypt a folder of the current user (caller has verified the user)"""
+        # Load key
+        key_file = folder_info['key_file']
+        with open(key_file, 'rb') as f:
+            key = f.read()
+        
+        self.encryption.set_key(key)
+        
+        # Decrypt folder
+        stats = self.encryption.decrypt_folder(str(folder_path), delete_encrypted=False)
+        
+        # Ask to delete encrypted files
+        delete = messagebox.askyesno(
+            "Delete Encrypted Files?",
+            f"Folder unlocked successfully!\n\nFiles decrypted: {stats['decrypted_files']}\n\nDelete encrypted files?"
+        )
+        
+        if delete:
+            import os
+            deleted = 0
+            for root, dirs, files in os.walk(str(folder_path)):
+                for file in files:
+                    if file.endswith('.encrypted'):
+                        os.remove(os.path.join(root, file))
+                        deleted += 1
+        
+        # Remove from config
+        del self.config['locked_folders'][str(folder_path)]
+        self._save_config()
+        
+        self.refresh_folders_list()
+        messagebox.showinfo("Success", f"✅ Folder unlocked successfully!")
+    
     def show_statistics(self):
         """Show user authentication statistics"""
         stats = self.voice_auth.get_user_stats(self.current_user)
@@ -1162,7 +1194,7 @@ class VoiceLockGUI:
         # Create statistics window
         stats_window = ctk.CTkToplevel(self.root)
         stats_window.title(f"Statistics - {self.current_user}")
-        stats_window.geometry("600x600")
+        stats_window.geometry("600x660")
         stats_window.transient(self.root)
         
         # Title
@@ -1212,6 +1244,8 @@ class VoiceLockGUI:
                 f"Successful: {stats['successful']} ✅\n"
                 f"Failed: {stats['failed']} ❌\n"
                 f"Success rate: {stats['success_rate']*100:.1f}%"
+                + (f"\nProfile auto-updates: {stats['profile_adaptations']}"
+                   if stats.get('profile_adaptations') else "")
             )
             perf_text.configure(state="disabled")
             
@@ -1227,14 +1261,28 @@ class VoiceLockGUI:
                 )
                 dist_title.pack(pady=(15, 10), padx=15, anchor="w")
                 
-                dist_text = ctk.CTkTextbox(dist_card, height=120, font=("Segoe UI", 12))
-                dist_text.pack(fill="x", padx=15, pady=(0, 15))
-                dist_text.insert("1.0",
+                dist_lines = (
                     f"Average distance: {stats['avg_success_distance']:.4f}\n"
                     f"Std deviation: {stats['std_success_distance']:.4f}\n"
                     f"Current threshold: {self.voice_auth.threshold}\n"
                     f"Suggested threshold: {stats.get('suggested_threshold', 'N/A'):.4f}"
                 )
+                quantiles = stats.get('success_quantiles', {})
+                if quantiles:
+                    dist_lines += (
+                        f"\nAccepted distance p50/p95/p99: {quantiles[0.5]:.4f} / "
+                        f"{quantiles[0.95]:.4f} / {quantiles[0.99]:.4f}"
+                    )
+                if stats.get('estimated_frr') is not None:
+                    far = stats['estimated_far']
+                    dist_lines += (
+                        f"\nAt suggested threshold: ~{stats['estimated_frr']*100:.1f}% false rejects, "
+                        f"{'n/a' if far is None else f'~{far*100:.1f}%'} false accepts"
+                    )
+                
+                dist_text = ctk.CTkTextbox(dist_card, height=160, font=("Segoe UI", 12))
+                dist_text.pack(fill="x", padx=15, pady=(0, 15))
+                dist_text.insert("1.0", dist_lines)
                 dist_text.configure(state="disabled")
         
         close_btn = ctk.CTkButton(
@@ -1294,6 +1342,11 @@ class VoiceLockGUI:
     
     def voice_login_platform(self, platform):
         """Voice-authenticated login to social media platform"""
+        # Still within the session of the last voice check: no need to record again
+        if self._session_active():
+            self._run_with_session(lambda: self._login_platform_now(platform), "Browser automation error")
+            return
+        
         auth_window = ctk.CTkToplevel(self.root)
         auth_window.title(f"Login to {platform}")
         auth_window.geometry("400x350")
@@ -1311,56 +1364,66 @@ class VoiceLockGUI:
         progress.set(0)
         
         def authenticate_and_login():
-            for i in range(3, 0, -1):
-                auth_window.after(0, lambda count=i: countdown_label.configure(text=f"🎯 {count}"))
-                import time
-                time.sleep(1)
-            auth_window.after(0, lambda: countdown_label.configure(text="🔴 RECORDING! Speak now..."))
-            audio = self.voice_auth.record_audio(duration=5, show_countdown=False)
-            auth_window.after(0, lambda: countdown_label.configure(text="🔄 Verifying..."))
-            embedding = self.voice_auth.extract_embedding(audio)
-            distance = self.voice_auth.compute_similarity(embedding, self.voice_auth.enrolled_embeddings[self.current_user]['embedding'])
-            auth_window.after(0, auth_window.destroy)
-            if distance > 0.3:
-                messagebox.showerror("Authentication Failed", f"❌ Voice authentication failed!\\n\\nDistance: {distance:.4f}")
-                return
             try:
-                credentials = self.cred_manager.get_credential(platform, self.current_user)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to retrieve credentials: {str(e)}")
+                on_countdown = self._countdown_updater(
+                    auth_window, countdown_label, tick_format="🎯 {}", recording_text="🔴 RECORDING! Speak now..."
+                )
+                authenticated, distance = self._verify_voice(auth_window, self.current_user, progress, on_countdown=on_countdown)
+            except AudioQualityError as e:
+                auth_window.after(0, auth_window.destroy)
+                messagebox.showwarning("Please Try Again", f"🎤 {e.report.message}")
                 return
-            browser = BrowserAutomation()
-            try:
-                if platform == "GitHub":
-                    success = browser.login_github(credentials['username'], credentials['password'])
-                elif platform == "Instagram":
-                    success = browser.login_instagram(credentials['username'], credentials['password'])
-                elif platform == "Gmail":
-                    success = browser.login_gmail(credentials['username'], credentials['password'])
-                elif platform == "Twitter":
-                    success = browser.login_twitter(credentials['username'], credentials['password'])
-                else:
-                    success = False
-                credentials = None
-                if success:
-                    messagebox.showinfo("Success", f"✅ Logged into {platform}!\\n\\nBrowser window will stay open.")
-                    browser.keep_alive()
-                else:
-                    messagebox.showerror("Login Failed", f"❌ Failed to login to {platform}\\n\\nPlease check your credentials.")
-                    browser.close()
             except Exception as e:
-                messagebox.showerror("Error", f"Browser automation error: {str(e)}")
-                browser.close()
+                auth_window.after(0, auth_window.destroy)
+                messagebox.showerror("Error", f"Voice authentication error: {str(e)}")
+                return
+            auth_window.after(0, auth_window.destroy)
+            if not authenticated:
+                messagebox.showerror("Authentication Failed", f"❌ Voice authentication failed!\\n\\nDistance: {distance:.4f}")
+                return
+            self._start_session(self.current_user)
+            self._login_platform_now(platform)
         
         thread = threading.Thread(target=authenticate_and_login, daemon=True)
         thread.start()
     
+    def _login_platform_now(self, platform):
+        """Log the current user into a platform in the browser (caller has verified the user)"""
+        try:
+            credentials = self.cred_manager.get_credential(platform, self.current_user)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to retrieve credentials: {str(e)}")
+            return
+        from browser_automation import BrowserAutomation  # Deferred: selenium is slow to import
+        browser = BrowserAutomation()
+        try:
+            if platform == "GitHub":
+                success = browser.login_github(credentials['username'], credentials['password'])
+            elif platform == "Instagram":
+                success = browser.login_instagram(credentials['username'], credentials['password'])
+            elif platform == "Gmail":
+                success = browser.login_gmail(credentials['username'], credentials['password'])
+            elif platform == "Twitter":
+                success = browser.login_twitter(credentials['username'], credentials['password'])
+            else:
+                success = False
+            credentials = None
+            if success:
+                messagebox.showinfo("Success", f"✅ Logged into {platform}!\\n\\nBrowser window will stay open.")
+                browser.keep_alive()
+            else:
+                messagebox.showerror("Login Failed", f"❌ Failed to login to {platform}\\n\\nPlease check your credentials.")
+                browser.close()
+        except Exception as e:
+            messagebox.showerror("Error", f"Browser automation error: {str(e)}")
+            browser.close()
+    
     def handle_delete_profile(self):
         """Delete current user profile after voice authentication"""
         if not messagebox.askyesno("Delete Profile", "⚠️ DANGER: This will PERMANENTLY delete your voice profile and all saved credentials!\n\nThis action cannot be undone.\n\nAre you sure you want to proceed?"):
             return
             
-        # Voice authentication window
+        # Always a fresh voice check: deletion cannot be undone, so an open session does not cover it
         auth_window = ctk.CTkToplevel(self.root)
         auth_window.title("Confirm Deletion")
         auth_window.geometry("400x350")
@@ -1381,28 +1444,27 @@ class VoiceLockGUI:
         progress.set(0)
         
         def authenticate_and_delete():
-            # Countdown
-            for i in range(3, 0, -1):
-                auth_window.after(0, lambda count=i: countdown_label.configure(text=f"🎯 {count}"))
-                import time
-                time.sleep(1)
-            
-            # Record
-            auth_window.after(0, lambda: countdown_label.configure(text="🔴 RECORDING! Speak now..."))
-            audio = self.voice_auth.record_audio(duration=5, show_countdown=False)
-            
-            # Verify
-            auth_window.after(0, lambda: countdown_label.configure(text="🔄 Verifying..."))
-            embedding = self.voice_auth.extract_embedding(audio)
-            
-            # Get enrolled embedding
-            enrolled_embedding = self.voice_auth.enrolled_embeddings[self.current_user]['embedding']
-            distance = self.voice_auth.compute_similarity(embedding, enrolled_embedding)
+            # Countdown runs with the microphone already open; verify while recording
+            try:
+                on_countdown = self._countdown_updater(
+                    auth_window, countdown_label, tick_format="🎯 {}", recording_text="🔴 RECORDING! Speak now..."
+                )
+                authenticated, distance = self._verify_voice(auth_window, self.current_user, progress, on_countdown=on_countdown)
+            except AudioQualityError as e:
+                auth_window.after(0, auth_window.destroy)
+                messagebox.showwarning("Please Try Again", f"🎤 {e.report.message}\n\nProfile deletion cancelled.")
+                return
+            except Exception as e:
+                auth_window.after(0, auth_window.destroy)
+                messagebox.showerror("Error", f"Voice authentication error: {str(e)}")
+                return
             
             # Check result
             auth_window.after(0, auth_window.destroy)
             
-            if distance > 0.3:
+            if not authenticated:
+                # Someone else may be at the keyboard: later actions need a new voice check too
+                self._end_session()
                 messagebox.showerror("Authentication Failed", f"❌ Voice mismatch! Profile deletion cancelled.\n\nDistance: {distance:.4f}")
                 return
             
@@ -1420,6 +1482,8 @@ class VoiceLockGUI:
                     messagebox.showinfo("Profile Deleted", f"🗑️ Profile for '{user_to_delete}' has been permanently deleted.\n- {cred_count} credentials removed\n- Voice profile removed")
                     
                     # 3. Force logout
+                    self.sessions.revoke_user(user_to_delete)
+                    self.session_token = None
                     self.current_user = None
                     self.show_login_screen()
                     
@@ -1432,6 +1496,7 @@ class VoiceLockGUI:
     def handle_logout(self):
         """Logout current user"""
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
+            self._end_session()
             self.current_user = None
             self.show_login_screen()
     
@@ -0,0 +1,190 @@
+"""
+Latency Metrics Module
+======================
+Lightweight timing spans for the authentication pipeline.
+
+Features:
+- `with metrics.span('embedding'):` around any stage, nestable, thread-safe
+- `@timed('embedding')` for methods of objects that own a `metrics` recorder
+- Per-stage log-bucketed histograms with p50/p95/p99 in constant memory
+- Optional JSONL stream of every span for offline analysis
+"""
+
+import functools
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REPORTED_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations on log-spaced buckets
+
+    With 32 buckets per decade each bucket spans ~7.5%, so a percentile read
+    from the bucket's geometric midpoint is within ~4% of the true value,
+    whatever the number of samples.
+    """
+
+    def __init__(self, min_seconds: float = 1e-6, max_seconds: float = 1e3, buckets_per_decade: int = 32):
+        """
+        Args:
+            min_seconds: Lower edge of the first bucket (shorter spans are clamped)
+            max_seconds: Upper edge of the last bucket (longer spans are clamped)
+            buckets_per_decade: Resolution of the histogram
+        """
+        self.min_seconds = min_seconds
+        self.buckets_per_decade = buckets_per_decade
+        n_buckets = int(math.ceil(math.log10(max_seconds / min_seconds) * buckets_per_decade))
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.min_seconds:
+            return 0
+        index = int(math.log10(seconds / self.min_seconds) * self.buckets_per_decade)
+        return min(index, len(self.counts) - 1)
+
+    def _midpoint(self, index: int) -> float:
+        return self.min_seconds * 10 ** ((index + 0.5) / self.buckets_per_decade)
+
+    def add(self, seconds: float):
+        self.counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, p: float) -> float:
+        """Estimated p-quantile in seconds (0.0 if empty)"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(p * self.count)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self._midpoint(index), self.max)
+
+    def summary(self) -> dict:
+        """Count, mean, max and the reported percentiles, in milliseconds"""
+        summary = {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'max_ms': self.max * 1000,
+        }
+        for p in REPORTED_PERCENTILES:
+            summary[f"p{int(p * 100)}_ms"] = self.quantile(p) * 1000
+        return summary
+
+
+class LatencyRecorder:
+    """
+    Collects timing spans per stage
+
+    Example:
+        metrics = LatencyRecorder()
+        with metrics.span('preprocess'):
+            audio = preprocess(audio)
+        metrics.summary()['preprocess']['p95_ms']
+    """
+
+    def __init__(self, jsonl_path: Optional[Union[str, Path]] = None, enabled: bool = True):
+        """
+        Args:
+            jsonl_path: Append every span as a JSON line to this file (None = in memory only)
+            enabled: Record spans at all (a disabled recorder costs one attribute check)
+        """
+        self.jsonl_path = Path(jsonl_path) if jsonl_path is not None else None
+        self.enabled = enabled
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._jsonl = None
+
+    @contextmanager
+    def span(self, stage: str, **tags) -> Iterator[None]:
+        """
+        Time the enclosed block as one occurrence of `stage`
+
+        Args:
+            stage: Stage name (e.g. 'capture', 'preprocess', 'embedding')
+            **tags: Extra JSON-serialisable fields written to the JSONL record
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **tags)
+
+    def record(self, stage: str, seconds: float, **tags):
+        """Add an externally measured duration for `stage`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.add(seconds)
+            if self.jsonl_path is not None:
+                self._write_jsonl({'ts': time.time(), 'stage': stage, 'ms': seconds * 1000, **tags})
+        logger.debug(f"{stage}: {seconds * 1000:.2f} ms")
+
+    def _write_jsonl(self, entry: dict):
+        if self._jsonl is None:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self._jsonl = open(self.jsonl_path, 'a', buffering=1)
+        self._jsonl.write(json.dumps(entry) + '\n')
+
+    def summary(self) -> Dict[str, dict]:
+        """Per-stage count, mean, max and p50/p95/p99 in milliseconds"""
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self._histograms.items()}
+
+    def reset(self):
+        """Forget all recorded spans"""
+        with self._lock:
+            self._histograms.clear()
+
+    def close(self):
+        """Close the JSONL file, if one is open"""
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+def timed(stage: str):
+    """
+    Method decorator that records each call as a span of `stage` in `self.metrics`
+
+    Example:
+        @timed('embedding')
+        def extract_embedding(self, audio_data): ...
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_summary(summary: Dict[str, dict]) -> str:
+    """Render a LatencyRecorder summary as an aligned text table"""
+    lines = [f"{'stage':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)"]
+    for stage, row in summary.items():
+        lines.append(f"{stage:<16}{row['count']:>7}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                     f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}")
+    return "\n".join(lines)
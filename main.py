@@ -17,7 +17,6 @@ import logging
 from typing import Optional
 from datetime import datetime
 
-from voice_authenticator import VoiceAuthenticator
 from folder_encryption import FolderEncryption
 
 # Setup logging
@@ -55,19 +54,45 @@ class VoiceFolderLock:
         """
         self.config_file = config_file
         self.config = {}
+        self.auth_threshold = auth_threshold
+        self._voice_auth = None
         
-        # Initialize components
-        self.voice_auth = VoiceAuthenticator(threshold=auth_threshold)
+        # Initialize components (voice authentication is created on first use)
         self.encryption = FolderEncryption()
         
         # Load configuration
         self._load_config()
         
-        # Load existing enrollments
-        self.voice_auth.load_enrollments()
-        
         logger.info("Voice Folder Lock System initialized")
     
+    @property
+    def voice_auth(self):
+        """
+        Voice authenticator, created on first use
+        
+        Folder listing and the access log never pay for the audio stack; the
+        first voice command starts loading the model in the background while
+        the user is still typing.
+        """
+        if self._voice_auth is None:
+            from voice_authenticator import VoiceAuthenticator
+            
+            self._voice_auth = VoiceAuthenticator(threshold=self.auth_threshold, background_load=True)
+            self._voice_auth.load_enrollments()
+        return self._voice_auth
+    
+    def enrolled_user_count(self) -> int:
+        """Number of enrolled users, read from the store if the authenticator is not running"""
+        if self._voice_auth is not None:
+            return len(self._voice_auth.list_enrolled_users())
+        from enrollment_store import EnrollmentStore
+        
+        # Same migration as VoiceAuthenticator.load_enrollments, so an install
+        # still on enrollments.pkl does not report zero users
+        store = EnrollmentStore()
+        store.migrate_legacy()
+        return len(store.open())
+    
     def _load_config(self):
         """Load system configuration"""
         if os.path.exists(self.config_file):
@@ -160,7 +185,7 @@ class VoiceFolderLock:
         
         # Authenticate user
         print(f"\n🔐 Authenticating user: {username}")
-        authenticated, score = self.voice_auth.authenticate(username, duration=5)
+        authenticated, score, _ = self.voice_auth.authenticate_streaming(username, max_duration=5)
         
         if not authenticated:
             print(f"\n❌ Authentication failed! Cannot lock folder.")
@@ -239,7 +264,7 @@ class VoiceFolderLock:
         
         # Authenticate user
         print(f"\n🔐 Authenticating owner: {username}")
-        authenticated, score = self.voice_auth.authenticate(username, duration=5)
+        authenticated, score, _ = self.voice_auth.authenticate_streaming(username, max_duration=5)
         
         if not authenticated:
             print(f"\n❌ Authentication failed! Cannot unlock folder.")
@@ -431,8 +456,9 @@ def main():
                 print(f"\n🎤 Voice Authentication:")
                 print(f"   Model: SpeechBrain ECAPA-TDNN")
                 print(f"   Source: speechbrain/spkrec-ecapa-voxceleb")
-                print(f"   Threshold: {system.voice_auth.threshold}")
-                print(f"   Enrolled users: {len(system.voice_auth.list_enrolled_users())}")
+                # Read from the configuration so viewing this does not load the model
+                print(f"   Threshold: {system.auth_threshold}")
+                print(f"   Enrolled users: {system.enrolled_user_count()}")
                 
                 print(f"\n🔒 Folder Encryption:")
                 print(f"   Algorithm: Fernet (AES-128)")
@@ -441,6 +467,14 @@ def main():
                 print(f"\n📊 Statistics:")
                 print(f"   Access log entries: {len(system.config['access_log'])}")
                 print(f"   System created: {system.config['created_at'][:19]}")
+                
+                latency = system._voice_auth.latency_summary() if system._voice_auth is not None else None
+                if latency:
+                    from latency_metrics import format_summary
+                    
+                    print(f"\n⏱️  Latency this session:")
+                    for line in format_summary(latency).splitlines():
+                        print(f"   {line}")
             
             elif choice == '8':
                 enrolled_users = system.voice_auth.list_enrolled_users()
@@ -466,6 +500,8 @@ def main():
                         print(f"   Successful: {stats['successful']} ✅")
                         print(f"   Failed: {stats['failed']} ❌")
                         print(f"   Success rate: {stats['success_rate']*100:.1f}%")
+                        if stats.get('profile_adaptations'):
+                            print(f"   Profile auto-updates: {stats['profile_adaptations']}")
                         
                         if 'avg_success_distance' in stats:
                             print(f"\n🎯 Distance Metrics:")
@@ -474,6 +510,16 @@ def main():
                             print(f"   Current threshold: {system.voice_auth.threshold}")
                             print(f"   Suggested threshold: {stats.get('suggested_threshold', 'N/A'):.4f}")
                             
+                            quantiles = stats.get('success_quantiles', {})
+                            if quantiles:
+                                print(f"   Accepted distance p50/p90/p95/p99: "
+                                      f"{quantiles[0.5]:.4f} / {quantiles[0.9]:.4f} / "
+                                      f"{quantiles[0.95]:.4f} / {quantiles[0.99]:.4f}")
+                            if stats.get('estimated_frr') is not None:
+                                far = stats['estimated_far']
+                                print(f"   At suggested threshold: ~{stats['estimated_frr']*100:.1f}% false rejects, "
+                                      f"{'n/a' if far is None else f'~{far*100:.1f}%'} false accepts")
+                            
                             # Show recommendation
                             if stats['suggested_threshold'] < system.voice_auth.threshold - 0.05:
                                 print(f"\n💡 Recommendation: Consider lowering threshold to {stats['suggested_threshold']:.4f}")
@@ -0,0 +1,196 @@
+"""
+Model Cache Module
+==================
+Pinned local copies of encoder models with a SHA-256 manifest.
+
+A pinned directory holds the model files plus:
+- manifest.json:   file names, sizes and SHA-256 digests (written by `pin`)
+- .verified.json:  stamp written after a successful full check; later
+                   startups only compare file sizes and modification times
+                   against it instead of re-hashing
+
+Usage:
+    python model_cache.py pin models/spkrec-ecapa-voxceleb      # online, once
+    python model_cache.py verify models/spkrec-ecapa-voxceleb   # full re-hash
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Union
+
+from file_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+STAMP_NAME = '.verified.json'
+FORMAT_VERSION = 1
+
+
+class ModelIntegrityError(RuntimeError):
+    """Raised when a pinned model directory does not match its manifest"""
+
+
+def sha256_file(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Hex SHA-256 digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_files(directory: Path):
+    for path in sorted(directory.rglob('*')):
+        if path.is_file() and path.name not in (MANIFEST_NAME, STAMP_NAME) and not path.name.endswith('.tmp'):
+            yield path
+
+
+def write_manifest(directory: Union[str, Path], source: str = '') -> dict:
+    """
+    Hash every file in a model directory and record it in manifest.json
+
+    Args:
+        directory: Model directory
+        source: Where the files came from (informational)
+
+    Returns:
+        The manifest
+    """
+    directory = Path(directory)
+    files = {}
+    for path in _model_files(directory):
+        files[path.relative_to(directory).as_posix()] = {
+            'sha256': sha256_file(path),
+            'size': path.stat().st_size,
+        }
+    if not files:
+        raise ModelIntegrityError(f"No model files found in {directory}")
+    manifest = {'format_version': FORMAT_VERSION, 'source': source, 'files': files}
+    write_atomic(directory / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True))
+    logger.info(f"Wrote manifest for {len(files)} files in {directory}")
+    return manifest
+
+
+def _file_stats(directory: Path, names) -> Dict[str, list]:
+    stats = {}
+    for name in names:
+        stat = (directory / name).stat()
+        stats[name] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def verify_model_dir(directory: Union[str, Path], force: bool = False) -> dict:
+    """
+    Check a pinned model directory against its manifest
+
+    The full SHA-256 check runs once; afterwards a stamp of file sizes and
+    modification times stands in for it until a file or the manifest changes.
+
+    Args:
+        directory: Pinned model directory
+        force: Re-hash every file even if the stamp is current
+
+    Returns:
+        The manifest
+
+    Raises:
+        ModelIntegrityError: Missing manifest, missing file or digest mismatch
+    """
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise ModelIntegrityError(
+            f"No {MANIFEST_NAME} in {directory}; create it with: python model_cache.py pin {directory}"
+        )
+    manifest_text = manifest_path.read_text()
+    manifest = json.loads(manifest_text)
+    if manifest.get('format_version', 0) > FORMAT_VERSION:
+        raise ModelIntegrityError(f"{manifest_path} uses format version {manifest['format_version']}")
+    files = manifest['files']
+    manifest_digest = hashlib.sha256(manifest_text.encode()).hexdigest()
+
+    missing = [name for name in files if not (directory / name).is_file()]
+    if missing:
+        raise ModelIntegrityError(f"Model files missing from {directory}: {', '.join(missing)}")
+    stats = _file_stats(directory, files)
+
+    stamp_path = directory / STAMP_NAME
+    if not force and stamp_path.exists():
+        try:
+            stamp = json.loads(stamp_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            stamp = {}
+        if stamp.get('manifest_sha256') == manifest_digest and stamp.get('files') == stats:
+            logger.debug(f"Model files in {directory} unchanged since last verification")
+            return manifest
+
+    for name, expected in files.items():
+        if stats[name][0] != expected['size'] or sha256_file(directory / name) != expected['sha256']:
+            raise ModelIntegrityError(f"{directory / name} does not match its manifest digest")
+
+    try:
+        write_atomic(stamp_path, json.dumps({'manifest_sha256': manifest_digest, 'files': stats}))
+    except OSError as e:
+        # Read-only installs still work, they just re-hash at every start
+        logger.debug(f"Could not write verification stamp in {directory}: {e}")
+    logger.info(f"Verified {len(files)} model files in {directory}")
+    return manifest
+
+
+def pin_model(source: str, directory: Union[str, Path]) -> dict:
+    """
+    Download a SpeechBrain model into `directory` as real files and write its manifest
+
+    Args:
+        source: HuggingFace model path
+        directory: Target directory (later passed as model_dir)
+
+    Returns:
+        The manifest
+    """
+    from speechbrain.pretrained import EncoderClassifier
+    from speechbrain.utils.fetching import LocalStrategy
+
+    os.environ.setdefault("HF_HUB_DISABLE_SYMLINKS", "1")
+    EncoderClassifier.from_hparams(source=source, savedir=str(directory),
+                                   local_strategy=LocalStrategy.COPY)
+    return write_manifest(directory, source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pin and verify local encoder model files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pin_parser = subparsers.add_parser('pin', help="Download a model and write its manifest")
+    pin_parser.add_argument('directory')
+    pin_parser.add_argument('--source', default="speechbrain/spkrec-ecapa-voxceleb")
+
+    manifest_parser = subparsers.add_parser('manifest', help="Write a manifest for files already in place")
+    manifest_parser.add_argument('directory')
+    manifest_parser.add_argument('--source', default='')
+
+    verify_parser = subparsers.add_parser('verify', help="Re-hash the files against the manifest")
+    verify_parser.add_argument('directory')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if args.command == 'pin':
+            manifest = pin_model(args.source, args.directory)
+        elif args.command == 'manifest':
+            manifest = write_manifest(args.directory, args.source)
+        else:
+            manifest = verify_model_dir(args.directory, force=True)
+    except ModelIntegrityError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(f"✅ {len(manifest['files'])} files pinned in {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
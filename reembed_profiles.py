@@ -0,0 +1,288 @@
+"""
+Re-embed Profiles
+=================
+Rebuild every voice profile from its stored samples after an encoder change
+(new checkpoint, quantised or exported model), so users do not have to re-enroll.
+
+- Samples are read from voice_profiles/<user>/sample_N.wav. They were saved
+  after preprocessing, so they go to the encoder as-is.
+- Users are spread over a process pool; each worker loads the encoder once
+  and embeds a user's samples in padded batches.
+- All profiles are switched in one store generation: until the new manifest
+  is written, the old profiles stay in use, even if the job is interrupted.
+- Each profile records the model_version it was built with and whether
+  its samples were noise-gated. Samples of ungated profiles (enrolled before
+  gating, or migrated from enrollments.pkl) are gated with a noise profile
+  learned from their own pauses. Adaptation state learned with the old
+  encoder is discarded.
+
+Usage:
+    python reembed_profiles.py                                    # default SpeechBrain encoder
+    python reembed_profiles.py --model-dir models/spkrec-ecapa-voxceleb
+    python reembed_profiles.py --backend onnx --path ecapa.onnx --workers 4
+    python reembed_profiles.py --dry-run
+"""
+
+import argparse
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+import audio_processing
+from audio_capture import VoiceActivityDetector, frame_signal
+from embedding_backends import create_backend
+from enrollment_store import DEFAULT_STORE_DIR, EnrollmentStore
+from voice_authenticator import build_profile, profile_is_stale
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_PATTERN = re.compile(r'sample_(\d+)\.wav$')
+
+# Encoder loaded once per worker process by _init_worker
+_worker_backend = None
+
+
+def find_samples(profiles_dir: Union[str, Path]) -> Dict[str, List[Path]]:
+    """
+    Stored enrollment samples per user, in recording order
+
+    Args:
+        profiles_dir: Directory holding one sub-directory of sample_N.wav files per user
+    """
+    samples = {}
+    for user_dir in sorted(Path(profiles_dir).iterdir()):
+        if not user_dir.is_dir():
+            continue
+        numbered = [(int(match.group(1)), path) for path in user_dir.iterdir()
+                    if (match := SAMPLE_PATTERN.search(path.name))]
+        if numbered:
+            samples[user_dir.name] = [path for _, path in sorted(numbered)]
+    return samples
+
+
+def _init_worker(backend: str, backend_options: dict):
+    global _worker_backend
+    logging.basicConfig(level=logging.WARNING)
+    _worker_backend = create_backend(backend, **backend_options)
+    _worker_backend.load()
+
+
+def _read_sample(path: Path, sample_rate: int) -> np.ndarray:
+    import soundfile as sf
+
+    audio, sr = sf.read(str(path), dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1)
+    if sr != sample_rate:
+        audio = audio_processing.resample(audio, sr, sample_rate)
+    return audio
+
+
+def gate_sample(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Noise-gate a stored (already trimmed) sample with a profile learned from its unvoiced frames
+
+    Stored samples keep no lead-in, so the pauses inside the utterance stand
+    in for the countdown noise a live recording is gated with.
+    """
+    vad = VoiceActivityDetector(sample_rate)
+    voiced = vad.process(audio)
+    noise_profile = audio_processing.NoiseProfile()
+    noise_profile.update(frame_signal(audio, vad.frame_length)[~voiced].ravel())
+    return audio_processing.spectral_gate(audio, noise_profile)
+
+
+def embed_samples(paths: List[Path], batch_size: int = 8, gate: bool = False) -> np.ndarray:
+    """
+    Embed stored samples with the worker's encoder
+
+    Samples are batched by similar length to keep padding small.
+
+    Args:
+        paths: Stored sample WAVs
+        batch_size: Samples per encoder call
+        gate: Noise-gate the samples first (they were stored ungated)
+
+    Returns:
+        (len(paths), dim) L2-normalized embeddings, in the order of `paths`
+    """
+    backend = _worker_backend
+    audios = [_read_sample(path, backend.sample_rate) for path in paths]
+    if gate:
+        audios = [gate_sample(audio, backend.sample_rate) for audio in audios]
+    order = np.argsort([len(audio) for audio in audios])
+    embeddings = np.zeros((len(audios), backend.dim), dtype=np.float32)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        embeddings[batch] = backend.embed_batch([audios[i] for i in batch])
+
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    if np.any(norms == 0):
+        raise ValueError("Encoder returned a zero embedding")
+    return embeddings / norms
+
+
+def reembed(store_dir: Union[str, Path] = DEFAULT_STORE_DIR,
+            profiles_dir: Union[str, Path] = 'voice_profiles',
+            backend: str = 'speechbrain',
+            backend_options: Optional[dict] = None,
+            workers: Optional[int] = None,
+            batch_size: int = 8,
+            only_stale: bool = False,
+            drop_missing: bool = False,
+            dry_run: bool = False,
+            denoise: bool = True) -> dict:
+    """
+    Rebuild stored profiles with the given encoder
+
+    Args:
+        store_dir: Enrollment store directory
+        profiles_dir: Directory with the per-user sample WAVs
+        backend: Encoder kind (see embedding_backends.create_backend)
+        backend_options: Encoder arguments (source, model_dir, path, ...)
+        workers: Worker processes (None = one per core, at most one per user)
+        batch_size: Samples per encoder call
+        only_stale: Skip profiles already built with this encoder and denoise setting
+        drop_missing: Delete profiles that have no stored samples instead of
+                      keeping them (required when the embedding size changes)
+        dry_run: Only report what would be done
+        denoise: Preprocessing the authenticator runs with (VoiceAuthenticator's
+                 denoise); ungated samples are gated when True
+
+    Returns:
+        Report with the model version and the re-embedded, kept, dropped and
+        failed usernames
+
+    Raises:
+        RuntimeError: Profiles without samples cannot be kept because the
+                      embedding dimension changed
+    """
+    backend_options = dict(backend_options or {})
+    encoder = create_backend(backend, **backend_options)
+    model_version = encoder.model_version
+    store = EnrollmentStore(store_dir)
+    profiles = store.open()
+    samples = find_samples(profiles_dir) if Path(profiles_dir).exists() else {}
+
+    todo = {username: samples[username] for username in profiles if username in samples
+            and not (only_stale and not profile_is_stale(profiles[username], model_version, denoise))}
+    # Stored samples keep the gating they were recorded with; it cannot be undone
+    gated = {username for username in todo if profiles[username].get('denoise', False)}
+    cannot_ungate = sorted(gated) if not denoise else []
+    for username in cannot_ungate:
+        del todo[username]
+    missing = [username for username in profiles if username not in samples]
+    if missing and not drop_missing and profiles and encoder.dim != store.dim:
+        raise RuntimeError(
+            f"The new encoder changes the embedding size ({store.dim} -> {encoder.dim}) and "
+            f"{', '.join(missing)} have no stored samples. Re-run with drop_missing."
+        )
+    report = {'model_version': model_version, 'reembedded': sorted(todo),
+              'failed': {username: "samples were stored noise-gated; re-enroll to build an ungated profile"
+                         for username in cannot_ungate},
+              'kept': [], 'dropped': missing if drop_missing else []}
+    if dry_run:
+        report['kept'] = sorted(set(profiles) - set(todo) - set(report['dropped']))
+        return report
+    if not todo and not report['dropped']:
+        report['kept'] = sorted(profiles)
+        return report
+
+    rebuilt = {}
+    workers = min(workers or os.cpu_count() or 1, max(1, len(todo)))
+    # Split the cores between the workers instead of every worker using all of them
+    backend_options.setdefault('threads', max(1, (os.cpu_count() or 1) // workers))
+    logger.info(f"Re-embedding {len(todo)} profiles with {model_version} on {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                             initializer=_init_worker, initargs=(backend, backend_options)) as pool:
+        futures = {username: pool.submit(embed_samples, paths, batch_size, denoise and username not in gated)
+                   for username, paths in todo.items()}
+        for username, future in futures.items():
+            try:
+                embeddings = future.result()
+            except Exception as e:
+                logger.error(f"Could not re-embed '{username}': {e}")
+                report['failed'][username] = str(e)
+                continue
+            profile = build_profile(embeddings, model_version, denoise)
+            profile['enrolled_at'] = profiles[username].get('enrolled_at', profile['enrolled_at'])
+            profile['reembedded_at'] = datetime.now().isoformat()
+            rebuilt[username] = profile
+    report['reembedded'] = sorted(rebuilt)
+    if not rebuilt and not report['dropped']:
+        report['kept'] = sorted(profiles)
+        return report
+
+    # Everything not rebuilt keeps its current profile, unless dropped
+    new_profiles = {}
+    for username, profile in profiles.items():
+        if username in rebuilt:
+            new_profiles[username] = rebuilt[username]
+        elif username not in report['dropped']:
+            new_profiles[username] = profile
+            report['kept'].append(username)
+    dims = {len(profile['embedding']) for profile in new_profiles.values()}
+    if len(dims) > 1:
+        raise RuntimeError(
+            f"The new encoder changes the embedding size; profiles without stored samples or "
+            f"that failed ({', '.join(report['kept'])}) cannot be kept. Re-run with drop_missing."
+        )
+
+    store.rewrite(new_profiles)
+    # The saved speaker index still holds the old embeddings; it is rebuilt on next start
+    index_file = Path(profiles_dir) / 'speaker_index.npz'
+    if index_file.exists():
+        index_file.unlink()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild voice profiles from stored samples with a new encoder")
+    parser.add_argument('--backend', default='speechbrain', help="speechbrain, torchscript, onnx or fake")
+    parser.add_argument('--source', help="SpeechBrain model path (default: the authenticator's default)")
+    parser.add_argument('--model-dir', help="Pinned SpeechBrain model directory (see model_cache.py)")
+    parser.add_argument('--path', help="Model file for the torchscript and onnx backends")
+    parser.add_argument('--dim', type=int, help="Embedding dimension of the new encoder")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--profiles', default='voice_profiles')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--only-stale', action='store_true',
+                        help="Skip profiles already built with this encoder and denoise setting")
+    parser.add_argument('--drop-missing', action='store_true', help="Delete profiles that have no stored samples")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--no-denoise', action='store_true',
+                        help="Build profiles for an authenticator running with denoise=False")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    options = {key: value for key, value in (('source', args.source), ('model_dir', args.model_dir),
+                                             ('path', args.path), ('dim', args.dim)) if value is not None}
+    try:
+        report = reembed(args.store, args.profiles, args.backend, options, args.workers,
+                         args.batch_size, args.only_stale, args.drop_missing, args.dry_run,
+                         not args.no_denoise)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    action = "Would re-embed" if args.dry_run else "Re-embedded"
+    print(f"\n🔁 {action} {len(report['reembedded'])} profiles with {report['model_version']}")
+    if report['kept']:
+        print(f"   Kept unchanged: {', '.join(report['kept'])}")
+    if report['dropped']:
+        print(f"   Dropped (no stored samples): {', '.join(report['dropped'])}")
+    for username, error in report['failed'].items():
+        print(f"   ❌ {username}: {error}")
+    if report['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
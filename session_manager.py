@@ -0,0 +1,147 @@
+"""
+Session Manager Module
+======================
+Short-lived sessions issued after a successful voice verification.
+
+A session is identified by a random token and ends when any of these happens:
+- its lifetime (`ttl`) has passed since the voice check, however busy it is
+- it has not been used for `idle_timeout` seconds
+- it is revoked (logout, profile deletion)
+
+Sessions live in memory only, so they never outlive the process.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """One authenticated session"""
+
+    def __init__(self, username: str, created_at: float):
+        self.username = username
+        self.created_at = created_at
+        self.last_used = created_at
+
+    def expired(self, now: float, ttl: float, idle_timeout: float) -> bool:
+        return now - self.created_at >= ttl or now - self.last_used >= idle_timeout
+
+
+class SessionManager:
+    """
+    Issues, validates and revokes session tokens
+
+    Example:
+        sessions = SessionManager(ttl=300, idle_timeout=120)
+        token = sessions.issue(username)          # after a successful voice check
+        if sessions.validate(token, username):    # before a sensitive action
+            ...
+        sessions.revoke(token)                    # on logout
+    """
+
+    def __init__(self, ttl: float = 300.0, idle_timeout: float = 120.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Maximum session lifetime in seconds, counted from the voice check
+            idle_timeout: Seconds without use after which a session ends
+            clock: Monotonic time source (replaceable for simulations)
+        """
+        if ttl <= 0 or idle_timeout <= 0:
+            raise ValueError("ttl and idle_timeout must be positive")
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def issue(self, username: str) -> str:
+        """
+        Start a session for a user who has just passed a voice check
+
+        Returns:
+            The session token
+        """
+        token = secrets.token_urlsafe(32)
+        now = self.clock()
+        with self._lock:
+            self._purge(now)
+            self._sessions[token] = Session(username, now)
+        logger.info(f"Session started for '{username}' (ttl {self.ttl:.0f}s, idle {self.idle_timeout:.0f}s)")
+        return token
+
+    def validate(self, token: Optional[str], username: Optional[str] = None) -> Optional[str]:
+        """
+        Check a token and mark the session as used
+
+        Args:
+            token: Session token (None is never valid)
+            username: Also require the session to belong to this user
+
+        Returns:
+            The session's username, or None if the token is unknown, expired
+            or belongs to someone else
+        """
+        if token is None:
+            return None
+        now = self.clock()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session.expired(now, self.ttl, self.idle_timeout):
+                del self._sessions[token]
+                logger.info(f"Session for '{session.username}' expired")
+                return None
+            if username is not None and session.username != username:
+                return None
+            session.last_used = now
+            return session.username
+
+    def remaining(self, token: Optional[str]) -> float:
+        """Seconds until the session ends if left idle (0.0 if it is not active)"""
+        now = self.clock()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or session.expired(now, self.ttl, self.idle_timeout):
+                return 0.0
+            return min(session.created_at + self.ttl, session.last_used + self.idle_timeout) - now
+
+    def revoke(self, token: Optional[str]):
+        """End one session"""
+        with self._lock:
+            session = self._sessions.pop(token, None)
+        if session is not None:
+            logger.info(f"Session for '{session.username}' revoked")
+
+    def revoke_user(self, username: str) -> int:
+        """
+        End every session of a user
+
+        Returns:
+            Number of sessions ended
+        """
+        with self._lock:
+            tokens = [token for token, session in self._sessions.items() if session.username == username]
+            for token in tokens:
+                del self._sessions[token]
+        if tokens:
+            logger.info(f"Revoked {len(tokens)} sessions for '{username}'")
+        return len(tokens)
+
+    def _purge(self, now: float):
+        expired = [token for token, session in self._sessions.items()
+                   if session.expired(now, self.ttl, self.idle_timeout)]
+        for token in expired:
+            del self._sessions[token]
+
+    def __len__(self) -> int:
+        """Number of active sessions"""
+        with self._lock:
+            self._purge(self.clock())
+            return len(self._sessions)
@@ -0,0 +1,396 @@
+"""
+Speaker Index Module
+====================
+Nearest-neighbour search over enrolled voice embeddings (cosine similarity).
+
+Features:
+- FlatIndex: exact search with a single matrix-vector product
+- IVFIndex: approximate inverted-file search (spherical k-means coarse
+  quantizer, only `nprobe` lists are scanned per query)
+- Incremental insert, replace and delete
+- float32, float16 or int8 rows (see compact_embeddings.py)
+- Save/load to a single .npz file
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from compact_embeddings import EMBEDDING_DTYPES, compact_scores, dequantize, quantize
+
+logger = logging.getLogger(__name__)
+
+
+class SpeakerIndex:
+    """
+    Common interface for speaker embedding indexes
+
+    Vectors are expected to be L2-normalized; scores are cosine similarities
+    (higher is more similar).
+    """
+
+    kind = None
+
+    def __init__(self, dim: int = 192):
+        self.dim = dim
+
+    def add(self, key: str, vector: np.ndarray):
+        """Insert a vector, replacing any existing vector for `key`"""
+        raise NotImplementedError
+
+    def remove(self, key: str):
+        """Delete the vector stored for `key` (no-op if absent)"""
+        raise NotImplementedError
+
+    def search(self, query: np.ndarray, top_k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Find the most similar stored vectors
+
+        Returns:
+            Up to top_k (key, cosine similarity) pairs, best first
+        """
+        raise NotImplementedError
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def save(self, path: Union[str, Path]):
+        """Save the index to a .npz file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state = self._state()
+        state['kind'] = np.array(self.kind)
+        # Write to a temp file first so a crash never leaves a half-written index
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **state)
+        tmp_path.replace(path)
+        logger.debug(f"Saved {self.kind} index with {len(self)} vectors to {path}")
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first"""
+    n = len(scores)
+    if top_k < n:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        top = np.arange(n)
+    return top[np.argsort(-scores[top])]
+
+
+class FlatIndex(SpeakerIndex):
+    """
+    Exact cosine search over one contiguous (N, dim) matrix
+
+    Rows grow geometrically on insert; deletes move the last row into the
+    freed slot, so both are O(1) amortised and the matrix stays dense.
+    With dtype 'float16' or 'int8' the rows are kept in that format (int8
+    with one scale per row) and scored without widening the whole matrix.
+    """
+
+    kind = 'flat'
+
+    def __init__(self, dim: int = 192, capacity: int = 16, dtype: str = 'float32'):
+        """
+        Args:
+            dim: Embedding dimension
+            capacity: Initial number of rows
+            dtype: Row format: 'float32', 'float16' or 'int8'
+        """
+        super().__init__(dim)
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}' (choose from {', '.join(EMBEDDING_DTYPES)})")
+        self.dtype = dtype
+        capacity = max(1, capacity)
+        self._matrix = np.zeros((capacity, dim), dtype=dtype)
+        self._scales = np.ones(capacity, dtype=np.float32) if dtype == 'int8' else None
+        self._keys = []
+        self._rows = {}
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the live rows, in the index's dtype"""
+        return self._matrix[:len(self._keys)]
+
+    @property
+    def scales(self) -> Optional[np.ndarray]:
+        """Per-row scales of the live int8 rows (None for the float formats)"""
+        return None if self._scales is None else self._scales[:len(self._keys)]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Live rows as float32"""
+        return dequantize(self.matrix, self.scales)
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def add(self, key: str, vector: np.ndarray):
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row == len(self._matrix):
+                grown = np.zeros((2 * row, self.dim), dtype=self._matrix.dtype)
+                grown[:row] = self._matrix
+                self._matrix = grown
+                if self._scales is not None:
+                    self._scales = np.concatenate([self._scales, np.ones(row, dtype=np.float32)])
+            self._keys.append(key)
+            self._rows[key] = row
+        values, scales = quantize(vector, self.dtype)
+        self._matrix[row] = values[0]
+        if scales is not None:
+            self._scales[row] = scales[0]
+
+    def remove(self, key: str):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._matrix[row] = self._matrix[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+        self._keys.pop()
+
+    def search(self, query: np.ndarray, top_k: int = 1) -> List[Tuple[str, float]]:
+        if not self._keys or top_k <= 0:
+            return []
+        scores = compact_scores(self.matrix, self.scales, query)
+        return [(self._keys[i], float(scores[i])) for i in _top_k(scores, top_k)]
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        state = {
+            'keys': np.array(self._keys, dtype=str),
+            'vectors': self.matrix.copy(),
+        }
+        if self._scales is not None:
+            state['scales'] = self.scales.copy()
+        return state
+
+    @classmethod
+    def _from_state(cls, state) -> 'FlatIndex':
+        # Rows are restored as saved; files written before compact rows are float32
+        vectors = state['vectors']
+        index = cls(dim=vectors.shape[1], capacity=max(16, len(vectors)), dtype=vectors.dtype.name)
+        index._matrix[:len(vectors)] = vectors
+        if index._scales is not None:
+            index._scales[:len(vectors)] = state['scales']
+        index._keys = [str(key) for key in state['keys']]
+        index._rows = {key: row for row, key in enumerate(index._keys)}
+        return index
+
+
+class IVFIndex(SpeakerIndex):
+    """
+    Approximate cosine search with an inverted-file (IVF) index
+
+    Vectors are assigned to the nearest of `nlist` centroids found by
+    spherical k-means; a query only scans the `nprobe` closest lists. Until
+    enough vectors exist to train the centroids, every query is exact.
+    """
+
+    kind = 'ivf'
+
+    def __init__(self,
+                 dim: int = 192,
+                 nlist: int = 64,
+                 nprobe: int = 8,
+                 train_size: Optional[int] = None,
+                 seed: int = 0,
+                 dtype: str = 'float32'):
+        """
+        Args:
+            dim: Embedding dimension
+            nlist: Number of inverted lists (clusters)
+            nprobe: Lists scanned per query (higher = better recall, slower)
+            train_size: Vectors needed before centroids are trained automatically
+                        (defaults to 20 per list)
+            seed: Random seed for k-means initialisation
+            dtype: Row format of the inverted lists (centroids stay float32)
+        """
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size or 20 * nlist
+        self.seed = seed
+        self.dtype = dtype
+        self.centroids = None
+        self._lists = [FlatIndex(dim, dtype=dtype) for _ in range(nlist)]
+        self._assignment = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def keys(self) -> List[str]:
+        return list(self._assignment)
+
+    def __len__(self) -> int:
+        return len(self._assignment)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._assignment
+
+    def _all_vectors(self) -> Tuple[List[str], np.ndarray]:
+        keys = []
+        blocks = []
+        for inverted_list in self._lists:
+            keys.extend(inverted_list.keys())
+            blocks.append(inverted_list.vectors)
+        return keys, np.concatenate(blocks) if blocks else np.zeros((0, self.dim), np.float32)
+
+    def train(self, vectors: Optional[np.ndarray] = None, iterations: int = 10):
+        """
+        Fit the coarse quantizer with spherical k-means and reassign all vectors
+
+        Args:
+            vectors: Training vectors (defaults to everything currently stored)
+            iterations: k-means iterations
+        """
+        keys, stored = self._all_vectors()
+        data = stored if vectors is None else np.asarray(vectors, dtype=np.float32)
+        if len(data) < self.nlist:
+            raise ValueError(f"Need at least {self.nlist} vectors to train, got {len(data)}")
+
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(len(data), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty clusters from random points
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        self.centroids = centroids.astype(np.float32)
+
+        # Reassign everything under the new quantizer
+        self._lists = [FlatIndex(self.dim, dtype=self.dtype) for _ in range(self.nlist)]
+        self._assignment = {}
+        if len(keys):
+            for key, list_id, vector in zip(keys, np.argmax(stored @ self.centroids.T, axis=1), stored):
+                self._lists[list_id].add(key, vector)
+                self._assignment[key] = int(list_id)
+        logger.debug(f"Trained IVF index: {self.nlist} lists over {len(data)} vectors")
+
+    def quantizer(self) -> 'IVFIndex':
+        """
+        Empty index with the same parameters and trained centroids
+
+        Saving this instead of the full index keeps the file at nlist x dim:
+        list membership can be rebuilt by re-adding the vectors, without training.
+        """
+        index = IVFIndex(self.dim, nlist=self.nlist, nprobe=self.nprobe, train_size=self.train_size,
+                         seed=self.seed, dtype=self.dtype)
+        index.centroids = self.centroids
+        return index
+
+    def add(self, key: str, vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        if key in self._assignment:
+            self.remove(key)
+        list_id = int(np.argmax(self.centroids @ vector)) if self.is_trained else 0
+        self._lists[list_id].add(key, vector)
+        self._assignment[key] = list_id
+
+        if not self.is_trained and len(self._assignment) >= self.train_size:
+            self.train()
+
+    def remove(self, key: str):
+        list_id = self._assignment.pop(key, None)
+        if list_id is not None:
+            self._lists[list_id].remove(key)
+
+    def search(self, query: np.ndarray, top_k: int = 1) -> List[Tuple[str, float]]:
+        if not self._assignment or top_k <= 0:
+            return []
+        query = query.astype(np.float32, copy=False)
+        if self.is_trained:
+            probe = _top_k(self.centroids @ query, min(self.nprobe, self.nlist))
+        else:
+            probe = [0]
+
+        results = []
+        for list_id in probe:
+            results.extend(self._lists[list_id].search(query, top_k))
+        results.sort(key=lambda item: -item[1])
+        return results[:top_k]
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        keys, vectors = self._all_vectors()
+        state = {
+            'keys': np.array(keys, dtype=str),
+            'vectors': vectors,
+            'params': np.array(json.dumps({
+                'nlist': self.nlist, 'nprobe': self.nprobe,
+                'train_size': self.train_size, 'seed': self.seed, 'dtype': self.dtype,
+            })),
+        }
+        if self.is_trained:
+            state['centroids'] = self.centroids
+        return state
+
+    @classmethod
+    def _from_state(cls, state) -> 'IVFIndex':
+        params = json.loads(str(state['params']))
+        vectors = state['vectors']
+        index = cls(dim=vectors.shape[1], **params)
+        if 'centroids' in state:
+            index.centroids = state['centroids'].astype(np.float32)
+        for key, vector in zip(state['keys'], vectors):
+            index.add(str(key), vector)
+        return index
+
+
+INDEX_TYPES = {
+    FlatIndex.kind: FlatIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def create_index(kind: str = 'flat', dim: int = 192, **kwargs) -> SpeakerIndex:
+    """
+    Create an empty index by name
+
+    Args:
+        kind: 'flat' (exact) or 'ivf' (approximate)
+        dim: Embedding dimension
+        **kwargs: Index-specific options (e.g. nlist, nprobe for 'ivf')
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}' (choose from {', '.join(INDEX_TYPES)})")
+    return INDEX_TYPES[kind](dim=dim, **kwargs)
+
+
+def load_index(path: Union[str, Path]) -> SpeakerIndex:
+    """Load an index saved with SpeakerIndex.save"""
+    with np.load(path, allow_pickle=False) as data:
+        state = {name: data[name] for name in data.files}
+    kind = str(state.pop('kind'))
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}' in {path}")
+    return INDEX_TYPES[kind]._from_state(state)
@@ -0,0 +1,36 @@
+"""Reservoir profile adaptation is reproducible and independent of the global NumPy RNG"""
+
+import numpy as np
+
+from compact_embeddings import profile_samples
+from voice_authenticator import VoiceAuthenticator
+
+DIM = 192
+
+
+def near(base: np.ndarray, seed: int, scale: float = 0.05) -> np.ndarray:
+    vector = base + scale * np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def adapted_samples(directory, monkeypatch, seed: int, global_seed: int) -> np.ndarray:
+    directory.mkdir()
+    monkeypatch.chdir(directory)
+    auth = VoiceAuthenticator(backend='fake', adaptation='reservoir', adaptation_interval=0,
+                              max_profile_samples=3, adaptation_seed=seed, adaptation_max_drift=1.0)
+    base = near(np.ones(DIM, dtype=np.float32), 0, scale=1.0)
+    auth.save_profile('alice', [near(base, i) for i in range(3)])
+    np.random.seed(global_seed)
+    for i in range(10):
+        probe = near(base, 100 + i)
+        assert auth.adapt_profile('alice', probe, 0.0)
+    auth.auth_history.close()
+    return np.array(profile_samples(auth.enrolled_embeddings['alice']))
+
+
+def test_reservoir_replacement_follows_the_authenticator_seed(tmp_path, monkeypatch):
+    first = adapted_samples(tmp_path / 'a', monkeypatch, seed=1, global_seed=0)
+    # Seeding the global RNG differently must not change the outcome
+    second = adapted_samples(tmp_path / 'b', monkeypatch, seed=1, global_seed=12345)
+    np.testing.assert_array_equal(first, second)
+    assert first.shape == (3, DIM)
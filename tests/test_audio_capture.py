@@ -0,0 +1,106 @@
+"""Ring buffer, callback capture and VAD stopping, driven by the file-backed fake device"""
+
+import numpy as np
+import pytest
+
+from audio_capture import AudioCapture, RingBuffer, file_stream_factory, record_until_silence
+
+SAMPLE_RATE = 16000
+
+
+def tone(duration: float, freq: float = 220.0, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def silence(duration: float, level: float = 1e-4, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (level * rng.standard_normal(int(duration * SAMPLE_RATE))).astype(np.float32)
+
+
+def assert_zero_copy(view: np.ndarray, ring: RingBuffer):
+    assert view.flags['C_CONTIGUOUS']
+    assert view.base is not None and np.shares_memory(view, ring._data)
+
+
+def test_ring_buffer_wraps_around():
+    ring = RingBuffer(10)
+    ring.write(np.arange(7, dtype=np.float32))
+    ring.write(np.arange(7, 14, dtype=np.float32))
+
+    assert ring.total_written == 14
+    assert ring.oldest == 4
+    view = ring.view()
+    np.testing.assert_array_equal(view, np.arange(4, 14))
+    assert_zero_copy(view, ring)
+    # A range across the physical end of the buffer is still one contiguous view
+    across = ring.view(8, 12)
+    np.testing.assert_array_equal(across, [8, 9, 10, 11])
+    assert_zero_copy(across, ring)
+
+
+def test_ring_buffer_clamps_to_held_samples():
+    ring = RingBuffer(10)
+    ring.write(np.arange(25, dtype=np.float32))  # Larger than the capacity
+
+    assert ring.oldest == 15
+    np.testing.assert_array_equal(ring.view(0, 18), [15, 16, 17])
+    np.testing.assert_array_equal(ring.view(20, 100), np.arange(20, 25))
+    assert len(ring.view(30, 40)) == 0
+
+
+def test_blocks_replay_the_source_as_zero_copy_views():
+    source = np.concatenate([tone(0.5), silence(0.25)])
+    levels = []
+    with AudioCapture(SAMPLE_RATE, capacity=2.0, stream_factory=file_stream_factory(source, speed=0, tail=0.25),
+                      level_callback=levels.append) as mic:
+        blocks = []
+        for block in mic.blocks():
+            assert len(block) <= mic.block_size
+            assert_zero_copy(block, mic.ring)
+            blocks.append(block.copy())
+
+    expected = np.concatenate([source, np.zeros(int(0.25 * SAMPLE_RATE), dtype=np.float32)])
+    np.testing.assert_array_equal(np.concatenate(blocks), expected)
+    # One level per device block: loud during the tone, floor-level during the silence
+    assert len(levels) == int(np.ceil(len(expected) / mic.block_size))
+    assert levels[0] == pytest.approx(10 * np.log10(0.3 ** 2 / 2), abs=0.5)
+    assert levels[-1] < -60
+
+
+def test_record_until_silence_stops_on_trailing_silence():
+    source = np.concatenate([silence(0.5), tone(2.0)])
+    progress, noise = [], []
+    audio = record_until_silence(SAMPLE_RATE, max_duration=5.0,
+                                 stream_factory=file_stream_factory(source, speed=0, tail=3.0),
+                                 progress_callback=lambda elapsed, total: progress.append((elapsed, total)),
+                                 noise_callback=noise.append)
+
+    # Pre-roll + 2 s of speech + the VAD's trailing silence, well short of max_duration
+    assert 2.0 * SAMPLE_RATE < len(audio) < 3.5 * SAMPLE_RATE
+    assert np.max(np.abs(audio)) == pytest.approx(0.3, abs=1e-3)
+    assert audio.flags['C_CONTIGUOUS']
+    # Trailing samples are the silence the VAD waited for
+    assert np.max(np.abs(audio[-int(0.5 * SAMPLE_RATE):])) < 1e-3
+
+    elapsed = [e for e, _ in progress]
+    assert elapsed == sorted(elapsed)
+    assert all(total == 5.0 and e <= total for e, total in progress)
+    assert len(noise) == 1 and 0 < len(noise[0]) <= 0.5 * SAMPLE_RATE
+
+
+def test_record_until_silence_caps_at_max_duration():
+    # Continuous speech never gives the VAD its trailing silence; the source
+    # fits the capture ring, so replaying it faster than real time loses nothing
+    audio = record_until_silence(SAMPLE_RATE, max_duration=2.0,
+                                 stream_factory=file_stream_factory(tone(2.8), speed=0, tail=0.0))
+    block_size = int(SAMPLE_RATE * 0.03)
+    assert abs(len(audio) - 2.0 * SAMPLE_RATE) <= block_size
+
+
+def test_record_until_silence_counts_down():
+    ticks = []
+    record_until_silence(SAMPLE_RATE, max_duration=2.0, countdown=2.0, countdown_callback=ticks.append,
+                         stream_factory=file_stream_factory(np.concatenate([silence(2.0), tone(1.5)]),
+                                                            speed=0, tail=1.0))
+    assert ticks == [2, 1, 0]
@@ -0,0 +1,98 @@
+"""Parity of audio_processing with the librosa functions it replaces"""
+
+import numpy as np
+import pytest
+
+import audio_processing
+
+librosa = pytest.importorskip('librosa')
+
+SAMPLE_RATE = 16000
+
+# Float32 rounding in the reference implementations
+EXACT_TOL = 1e-6
+
+# Against librosa's own polyphase resampler (the same filter design), only
+# float rounding differs
+POLYPHASE_TOL = 1e-5
+
+# librosa.resample defaults to soxr_hq, a different anti-aliasing filter than
+# the polyphase FIR used here; on speech-like audio the outputs differ by
+# about 2.5e-3 at most, well below what changes an embedding
+SOXR_TOL = 5e-3
+
+
+def utterance(sample_rate: int = SAMPLE_RATE, duration: float = 5.0, seed: int = 0) -> np.ndarray:
+    """Noise floor with a voiced middle section (harmonics under a syllable envelope)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = ((t > 1.0) & (t < 3.8)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2)
+    return (0.2 * voice * envelope + rng.standard_normal(len(t)) * 0.005).astype(np.float32)
+
+
+@pytest.mark.parametrize('top_db', [10, 20, 40])
+def test_trim_silence_matches_librosa(top_db):
+    audio = utterance()
+    expected, (start, end) = librosa.effects.trim(audio, top_db=top_db, frame_length=2048, hop_length=512)
+    trimmed, bounds = audio_processing.trim_silence(audio, top_db=top_db, frame_length=2048, hop_length=512)
+    assert bounds == (int(start), int(end))
+    np.testing.assert_array_equal(trimmed, expected)
+
+
+def test_trim_silence_of_silence():
+    trimmed, bounds = audio_processing.trim_silence(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    expected, _ = librosa.effects.trim(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    assert len(trimmed) == len(expected)
+
+
+def test_normalize_peak_matches_librosa():
+    audio = utterance()
+    np.testing.assert_allclose(audio_processing.normalize_peak(audio), librosa.util.normalize(audio),
+                               rtol=0, atol=EXACT_TOL)
+
+
+def test_normalize_peak_leaves_silence_alone():
+    silence = np.zeros(100, dtype=np.float32)
+    np.testing.assert_array_equal(audio_processing.normalize_peak(silence), silence)
+
+
+@pytest.mark.parametrize('coef', [0.5, 0.97])
+def test_preemphasis_matches_librosa(coef):
+    audio = utterance()
+    np.testing.assert_allclose(audio_processing.preemphasis(audio, coef=coef),
+                               librosa.effects.preemphasis(audio, coef=coef), rtol=0, atol=EXACT_TOL)
+
+
+def test_preprocess_matches_librosa_pipeline():
+    audio = utterance()
+    trimmed, _ = librosa.effects.trim(audio, top_db=20, frame_length=2048, hop_length=512)
+    expected = librosa.effects.preemphasis(librosa.util.normalize(trimmed), coef=0.97)
+    actual = audio_processing.preprocess(audio, SAMPLE_RATE)
+    assert actual.dtype == audio.dtype
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=EXACT_TOL)
+
+
+@pytest.mark.parametrize('orig_sr', [8000, 22050, 44100, 48000])
+def test_resample_matches_librosa_polyphase(orig_sr):
+    audio = utterance(orig_sr)
+    expected = librosa.resample(audio, orig_sr=orig_sr, target_sr=SAMPLE_RATE, res_type='polyphase')
+    actual = audio_processing.resample(audio, orig_sr, SAMPLE_RATE)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=POLYPHASE_TOL)
+
+
+@pytest.mark.parametrize('orig_sr', [44100, 48000])
+def test_resample_close_to_librosa_default(orig_sr):
+    audio = utterance(orig_sr)
+    expected = librosa.resample(audio, orig_sr=orig_sr, target_sr=SAMPLE_RATE)
+    actual = audio_processing.resample(audio, orig_sr, SAMPLE_RATE)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=SOXR_TOL)
+
+
+def test_resample_same_rate_is_identity():
+    audio = utterance()
+    assert audio_processing.resample(audio, SAMPLE_RATE, SAMPLE_RATE) is audio
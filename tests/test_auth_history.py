@@ -0,0 +1,125 @@
+"""Authentication history: the SQLite attempt log and its running statistics"""
+
+import json
+
+import numpy as np
+import pytest
+
+from auth_history import SUGGESTED_PERCENTILE, AuthHistory, P2Quantile, QuantileSketch, RunningStats
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(0).normal(0.2, 0.05, 1000)
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+    assert stats.count == 1000
+    np.testing.assert_allclose(stats.mean, values.mean(), rtol=1e-12)
+    np.testing.assert_allclose(stats.std, values.std(), rtol=1e-9)
+
+
+def test_counters_and_running_stats_survive_reopen(tmp_path):
+    distances = np.random.default_rng(1).uniform(0.1, 0.4, 50)
+    history = AuthHistory(tmp_path / 'history.db')
+    for i, distance in enumerate(distances):
+        history.record('alice', distance, success=distance < 0.3, timestamp=f'2026-01-01T00:00:{i:02d}')
+    history.record('bob', 0.5, success=False)
+    history.close()
+
+    reopened = AuthHistory(tmp_path / 'history.db')
+    stats = reopened.stats('alice')
+    accepted = distances[distances < 0.3]
+    assert len(reopened) == 2
+    assert stats['total_attempts'] == 50
+    assert stats['successful'] == len(accepted) and stats['failed'] == 50 - len(accepted)
+    np.testing.assert_allclose(stats['avg_success_distance'], accepted.mean())
+    np.testing.assert_allclose(stats['std_success_distance'], accepted.std())
+    np.testing.assert_allclose(stats['distances'], distances)
+    assert stats['timestamps'][-1] == '2026-01-01T00:00:49'
+
+
+def test_recent_returns_the_latest_attempts_oldest_first(tmp_path):
+    history = AuthHistory(tmp_path / 'history.db')
+    for i in range(10):
+        history.record('alice', i / 100, success=i % 2 == 0)
+    recent = history.recent('alice', limit=3)
+    assert [distance for _, distance, _ in recent] == [0.07, 0.08, 0.09]
+    assert [success for _, _, success in recent] == [False, True, False]
+    assert history.recent('nobody') == []
+
+
+def test_p2_quantiles_track_numpy():
+    values = np.random.default_rng(2).normal(0.2, 0.05, 5000)
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.update(value)
+
+    assert sketch.count == 5000
+    for p, estimate in sketch.quantiles().items():
+        # Within half a percentile of the exact quantile, in rank terms
+        assert abs(np.mean(values <= estimate) - p) < 0.005
+        assert abs(estimate - np.quantile(values, p)) < 0.005
+    assert abs(sketch.cdf(np.quantile(values, 0.5)) - 0.5) < 0.005
+
+
+def test_p2_is_exact_until_five_values():
+    estimator = P2Quantile(0.5)
+    assert estimator.value is None
+    for value in (0.4, 0.1, 0.3):
+        estimator.update(value)
+    assert estimator.value == np.quantile([0.4, 0.1, 0.3], 0.5)
+
+
+def test_suggested_threshold_is_the_95th_percentile_of_genuine_attempts(tmp_path):
+    distances = np.random.default_rng(3).uniform(0.15, 0.30, 500)
+    history = AuthHistory(tmp_path / 'history.db')
+    for distance in distances:
+        history.record('alice', distance, success=True)
+    history.close()
+
+    # Sketches are persisted with the counters, so a reopen continues them
+    stats = AuthHistory(tmp_path / 'history.db').stats('alice')
+    assert abs(stats['suggested_threshold'] - np.quantile(distances, SUGGESTED_PERCENTILE)) < 0.005
+    assert abs(stats['estimated_frr'] - (1 - SUGGESTED_PERCENTILE)) < 0.01
+    assert stats['estimated_far'] is None
+
+
+def legacy_entry(distances, successes) -> dict:
+    return {
+        'total_attempts': len(distances), 'successful': len(successes),
+        'failed': len(distances) - len(successes),
+        'avg_success_distance': float(np.mean(successes)) if successes else 0.0,
+        'std_success_distance': float(np.std(successes)) if successes else 0.0,
+        'distances': distances, 'success_distances': successes,
+        'timestamps': [f'2025-01-01T00:00:{i:02d}' for i in range(len(distances))],
+    }
+
+
+def test_migrate_json_skips_users_already_in_the_database(tmp_path):
+    history = AuthHistory(tmp_path / 'history.db')
+    history.record('alice', 0.1, success=True)
+    legacy = tmp_path / 'auth_history.json'
+    legacy.write_text(json.dumps({'alice': legacy_entry([0.2, 0.5], [0.2]),
+                                  'bob': legacy_entry([0.15, 0.25, 0.6], [0.15, 0.25])}))
+
+    assert history.migrate_json(legacy) == 1
+    assert history.stats('alice')['total_attempts'] == 1
+    bob = history.stats('bob')
+    assert (bob['total_attempts'], bob['successful'], bob['failed']) == (3, 2, 1)
+    assert bob['distances'] == [0.15, 0.25, 0.6]
+    assert (tmp_path / 'auth_history.json.migrated').exists()
+
+
+def test_failed_migration_leaves_memory_and_database_unchanged(tmp_path):
+    legacy = tmp_path / 'auth_history.json'
+    legacy.write_text(json.dumps({'bob': legacy_entry([0.15, 0.6], [0.15]),
+                                  'carol': legacy_entry(['not a distance'], [])}))
+    history = AuthHistory(tmp_path / 'history.db')
+    with pytest.raises(ValueError):
+        history.migrate_json(legacy)
+
+    assert len(history) == 0 and history.recent('bob') == []
+    history.record('dave', 0.1, success=True)
+    history.close()
+    assert len(AuthHistory(tmp_path / 'history.db')) == 1
+    assert legacy.exists()
@@ -0,0 +1,60 @@
+"""Compact (float16/int8) profile rows: storage, zero-copy loading and scoring"""
+
+import numpy as np
+import pytest
+
+from compact_embeddings import (EMBEDDING_DTYPES, compact_scores, distance_error_bound, profile_embedding,
+                                profile_rows, profile_samples, quantize)
+from enrollment_store import EnrollmentStore
+
+DIM = 192
+
+
+def unit_rows(n: int, seed: int = 0) -> np.ndarray:
+    rows = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize('dtype', EMBEDDING_DTYPES)
+def test_scoring_error_within_bound(dtype):
+    rows, probes = unit_rows(2000), unit_rows(50, seed=1)
+    values, scales = quantize(rows, dtype)
+    error = np.abs(compact_scores(values, scales, probes) - probes @ rows.T)
+    assert error.max() <= distance_error_bound(dtype, DIM, scales) + 1e-6
+
+
+@pytest.mark.parametrize('dtype', EMBEDDING_DTYPES)
+def test_store_keeps_loaded_profiles_compact(tmp_path, dtype):
+    rows = unit_rows(4)
+    store = EnrollmentStore(tmp_path / 'store', dtype=dtype)
+    store.put('alice', {'embedding': rows[0], 'samples': rows[1:], 'num_samples': 3})
+
+    reopened = EnrollmentStore(tmp_path / 'store')
+    profile = reopened.open()['alice']
+    assert reopened.dtype == dtype
+    assert reopened.row_bytes == {'float32': 4 * DIM, 'float16': 2 * DIM, 'int8': DIM + 4}[dtype]
+    assert profile['embedding'].dtype == np.dtype(dtype)
+    assert np.shares_memory(profile['samples'], reopened._matrix)
+    assert ('scales' in profile) == (dtype == 'int8')
+    assert profile['num_samples'] == 3
+
+    bound = distance_error_bound(dtype, DIM, profile.get('scales'))
+    np.testing.assert_allclose(profile_embedding(profile), rows[0], atol=bound)
+    np.testing.assert_allclose(profile_samples(profile), rows[1:], atol=bound)
+    values, scales = profile_rows(profile)
+    np.testing.assert_allclose(compact_scores(values, scales, rows[1]), rows[1:] @ rows[1], atol=bound)
+
+
+def test_convert_and_rewrite_compact_profiles(tmp_path):
+    rows = unit_rows(4)
+    store = EnrollmentStore(tmp_path / 'store')
+    store.put('alice', {'embedding': rows[0], 'samples': rows[1:]})
+
+    converted = store.convert('int8')['alice']
+    assert converted['samples'].dtype == np.int8
+    assert sorted(path.suffix for path in (tmp_path / 'store').glob('embeddings-*')) == ['.i8']
+
+    # Compact profiles can be written back as they are (e.g. kept by reembed_profiles)
+    rewritten = store.rewrite({'alice': converted})['alice']
+    np.testing.assert_array_equal(rewritten['samples'], converted['samples'])
+    np.testing.assert_array_equal(rewritten['scales'], converted['scales'])
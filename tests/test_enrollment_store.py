@@ -0,0 +1,90 @@
+"""Enrollment store: log replay across reopen, deletes, compaction and pickle migration"""
+
+import pickle
+
+import numpy as np
+
+from enrollment_store import EnrollmentStore
+
+DIM = 16
+
+
+def unit_rows(n: int, seed: int = 0) -> np.ndarray:
+    rows = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def profile(seed: int, samples: int = 2) -> dict:
+    rows = unit_rows(samples + 1, seed)
+    return {'embedding': rows[0], 'samples': rows[1:], 'num_samples': samples}
+
+
+def test_round_trip_across_reopen_after_put_and_delete(tmp_path):
+    store = EnrollmentStore(tmp_path / 'store')
+    store.put('alice', profile(0))
+    store.put('bob', profile(1))
+    store.put('alice', profile(2, samples=3))
+    store.delete('bob')
+    store.delete('nobody')
+
+    reopened = EnrollmentStore(tmp_path / 'store')
+    profiles = reopened.open()
+    assert sorted(profiles) == ['alice']
+    np.testing.assert_array_equal(profiles['alice']['embedding'], profile(2, samples=3)['embedding'])
+    np.testing.assert_array_equal(profiles['alice']['samples'], profile(2, samples=3)['samples'])
+    assert profiles['alice']['num_samples'] == 3
+    # The first alice block and bob's block are dead until compaction
+    assert reopened.dead_rows == 6
+
+
+def test_replay_ignores_a_torn_row_and_a_corrupt_log_line(tmp_path):
+    store = EnrollmentStore(tmp_path / 'store')
+    store.put('alice', profile(0))
+    with open(store.embeddings_path, 'ab') as f:
+        f.write(b'\x00' * 10)
+    with open(store.metadata_path, 'a') as f:
+        f.write('{"op": "put", "username": "bo')
+
+    profiles = EnrollmentStore(tmp_path / 'store').open()
+    assert sorted(profiles) == ['alice']
+    np.testing.assert_array_equal(profiles['alice']['embedding'], profile(0)['embedding'])
+
+
+def test_compaction_switches_generation_and_removes_old_files(tmp_path):
+    store = EnrollmentStore(tmp_path / 'store')
+    store.put('alice', profile(0))
+    for seed in range(1, 4):
+        store.put('bob', profile(seed))
+    assert store.generation == 0 and store.dead_rows == 6
+    store.compact()
+
+    assert store.generation == 1 and store.dead_rows == 0
+    files = sorted(path.name for path in (tmp_path / 'store').iterdir())
+    assert files == ['embeddings-000001.f32', 'manifest.json', 'metadata-000001.jsonl']
+
+    profiles = EnrollmentStore(tmp_path / 'store').open()
+    assert sorted(profiles) == ['alice', 'bob']
+    np.testing.assert_array_equal(profiles['bob']['embedding'], profile(3)['embedding'])
+
+
+def test_deletes_trigger_compaction_once_most_rows_are_dead(tmp_path):
+    store = EnrollmentStore(tmp_path / 'store')
+    for i in range(12):
+        store.put(f'user{i}', profile(i))
+    for i in range(11):
+        store.delete(f'user{i}')
+
+    assert store.generation == 1 and store.dead_rows == 0
+    assert sorted(EnrollmentStore(tmp_path / 'store').open()) == ['user11']
+
+
+def test_migrate_legacy_imports_the_pickle_once(tmp_path):
+    legacy = tmp_path / 'enrollments.pkl'
+    with open(legacy, 'wb') as f:
+        pickle.dump({'alice': profile(0), 'bob': profile(1)}, f)
+
+    store = EnrollmentStore(tmp_path / 'store')
+    assert store.migrate_legacy(legacy) == 2
+    assert not legacy.exists() and (tmp_path / 'enrollments.pkl.migrated').exists()
+    assert store.migrate_legacy(legacy) == 0
+    assert sorted(EnrollmentStore(tmp_path / 'store').open()) == ['alice', 'bob']
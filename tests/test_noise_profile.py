@@ -0,0 +1,39 @@
+"""Noise profile learning, snapshots and the spectral gate"""
+
+import numpy as np
+
+from audio_processing import NoiseProfile, spectral_gate
+
+SAMPLE_RATE = 16000
+
+
+def noise(duration: float, level: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(SAMPLE_RATE * duration)) * level).astype(np.float32)
+
+
+def test_snapshot_is_unaffected_by_later_updates():
+    profile = NoiseProfile()
+    assert profile.update(noise(0.5, 0.01))
+    snapshot = profile.snapshot()
+    mean, std = snapshot.mean_db.copy(), snapshot.std_db.copy()
+
+    assert profile.update(noise(0.5, 0.1, seed=1))
+    np.testing.assert_array_equal(snapshot.mean_db, mean)
+    np.testing.assert_array_equal(snapshot.std_db, std)
+    assert not np.allclose(profile.mean_db, mean)
+
+
+def test_gate_with_snapshot_is_deterministic():
+    profile = NoiseProfile()
+    profile.update(noise(0.5, 0.01))
+    snapshot = profile.snapshot()
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    audio = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32) + noise(1.0, 0.01, seed=2)
+
+    first = spectral_gate(audio, snapshot)
+    profile.update(noise(0.5, 0.1, seed=3))
+    np.testing.assert_array_equal(spectral_gate(audio, snapshot), first)
+    assert first.shape == audio.shape and first.dtype == audio.dtype
+    # Background-only audio is attenuated
+    assert np.std(spectral_gate(noise(1.0, 0.01, seed=4), snapshot)) < 0.01
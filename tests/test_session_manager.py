@@ -0,0 +1,78 @@
+"""Session lifetime, idle expiry and revocation with an injected clock"""
+
+import pytest
+
+from session_manager import SessionManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_session_ends_after_ttl_however_busy(clock):
+    sessions = SessionManager(ttl=300, idle_timeout=120, clock=clock)
+    token = sessions.issue('alice')
+    for _ in range(5):
+        clock.now += 59
+        assert sessions.validate(token) == 'alice'
+    assert sessions.remaining(token) == pytest.approx(5)
+    clock.now += 5
+    assert sessions.validate(token) is None
+    assert len(sessions) == 0
+
+
+def test_session_ends_when_idle(clock):
+    sessions = SessionManager(ttl=300, idle_timeout=120, clock=clock)
+    token = sessions.issue('alice')
+    clock.now += 100
+    assert sessions.validate(token) == 'alice'
+    # Use restarts the idle timer
+    clock.now += 119
+    assert sessions.validate(token) == 'alice'
+    clock.now += 120
+    assert sessions.validate(token) is None
+    assert sessions.remaining(token) == 0.0
+
+
+def test_session_is_bound_to_its_user(clock):
+    sessions = SessionManager(clock=clock)
+    token = sessions.issue('alice')
+    assert sessions.validate(token, 'bob') is None
+    assert sessions.validate(token, 'alice') == 'alice'
+    assert sessions.validate(None) is None
+    assert sessions.validate('forged') is None
+
+
+def test_revoke_and_revoke_user(clock):
+    sessions = SessionManager(clock=clock)
+    first, second = sessions.issue('alice'), sessions.issue('alice')
+    other = sessions.issue('bob')
+
+    sessions.revoke(first)
+    assert sessions.validate(first) is None and sessions.validate(second) == 'alice'
+    assert sessions.revoke_user('alice') == 1
+    assert sessions.validate(second) is None
+    assert sessions.validate(other) == 'bob'
+    assert sessions.revoke_user('alice') == 0
+
+
+def test_issue_purges_expired_sessions(clock):
+    sessions = SessionManager(ttl=300, idle_timeout=120, clock=clock)
+    sessions.issue('alice')
+    clock.now += 121
+    sessions.issue('bob')
+    assert len(sessions._sessions) == 1
+
+
+def test_rejects_non_positive_timeouts():
+    with pytest.raises(ValueError):
+        SessionManager(ttl=0)
@@ -0,0 +1,87 @@
+"""Exact and IVF speaker search: training, assignment, deletes and saved quantizers"""
+
+import numpy as np
+import pytest
+
+from speaker_index import FlatIndex, IVFIndex, create_index, load_index
+
+DIM = 32
+
+
+def unit_rows(n: int, seed: int = 0) -> np.ndarray:
+    rows = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def filled(index, rows: np.ndarray):
+    for i, row in enumerate(rows):
+        index.add(f'user{i}', row)
+    return index
+
+
+def test_flat_search_matches_brute_force():
+    rows, probes = unit_rows(100), unit_rows(20, seed=1)
+    index = filled(FlatIndex(DIM, capacity=4), rows)
+    for probe in probes:
+        expected = np.argsort(-(rows @ probe))[:3]
+        assert [key for key, _ in index.search(probe, 3)] == [f'user{i}' for i in expected]
+
+
+def test_flat_remove_moves_last_row_into_the_gap():
+    rows = unit_rows(5)
+    index = filled(FlatIndex(DIM), rows)
+    index.remove('user1')
+    assert len(index) == 4 and 'user1' not in index
+    assert index.search(rows[4])[0][0] == 'user4'
+    np.testing.assert_allclose(index.search(rows[4])[0][1], 1.0, atol=1e-6)
+
+
+def test_ivf_trains_automatically_and_assigns_to_nearest_centroid():
+    index = filled(IVFIndex(DIM, nlist=4, train_size=40), unit_rows(39))
+    assert not index.is_trained
+    index.add('user39', unit_rows(1, seed=2)[0])
+    assert index.is_trained and len(index) == 40
+
+    for key, list_id in index._assignment.items():
+        vector = index._lists[list_id].vectors[index._lists[list_id]._rows[key]]
+        assert list_id == int(np.argmax(index.centroids @ vector))
+
+
+def test_ivf_with_every_list_probed_agrees_with_flat_search():
+    rows, probes = unit_rows(200), unit_rows(30, seed=1)
+    flat = filled(FlatIndex(DIM), rows)
+    ivf = filled(IVFIndex(DIM, nlist=8, nprobe=8), rows)
+    ivf.train()
+    for probe in probes:
+        assert ivf.search(probe)[0][0] == flat.search(probe)[0][0]
+
+
+def test_ivf_remove_and_replace():
+    rows = unit_rows(50)
+    index = filled(IVFIndex(DIM, nlist=4, nprobe=4), rows)
+    index.train()
+    index.remove('user3')
+    assert 'user3' not in index and len(index) == 49
+    index.add('user4', rows[3])
+    assert index.search(rows[3])[0][0] == 'user4'
+    assert len(index) == 49
+
+
+def test_quantizer_round_trip_rebuilds_the_same_lists(tmp_path):
+    rows = unit_rows(120)
+    index = filled(IVFIndex(DIM, nlist=6, nprobe=2), rows)
+    index.train()
+
+    index.quantizer().save(tmp_path / 'index.npz')
+    loaded = load_index(tmp_path / 'index.npz')
+    assert isinstance(loaded, IVFIndex) and loaded.is_trained and len(loaded) == 0
+    assert (loaded.nlist, loaded.nprobe) == (6, 2)
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+
+    filled(loaded, rows)
+    assert loaded._assignment == index._assignment
+
+
+def test_create_index_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        create_index('hnsw', DIM)
@@ -0,0 +1,57 @@
+"""Early-decision authentication with the fake encoder and the file-backed fake device"""
+
+import numpy as np
+import pytest
+
+from audio_capture import file_stream_factory
+from voice_authenticator import SequentialDecision, VoiceAuthenticator
+
+SAMPLE_RATE = 16000
+
+
+def utterance(seed: int, amplitude: float = 0.3) -> np.ndarray:
+    """Quiet lead-in, 3.5 s of voiced harmonics, quiet tail (clipped for large amplitudes)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(5 * SAMPLE_RATE) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(130 + 20 * np.sin(2 * np.pi * 0.7 * t)) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = ((t > 1.0) & (t < 4.5)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2)
+    audio = 0.003 * rng.standard_normal(len(t)) + amplitude * voice * envelope
+    return np.clip(audio, -1.0, 1.0).astype(np.float32)
+
+
+@pytest.fixture
+def auth(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    auth = VoiceAuthenticator(backend='fake', adaptation='reservoir')
+    auth.save_profile('alice', [auth.extract_embedding(auth.preprocess_audio(utterance(seed)))
+                                for seed in range(3)])
+    yield auth
+    auth.auth_history.close()
+
+
+def test_skipped_window_breaks_the_run():
+    policy = SequentialDecision(0.3, consecutive=2)
+    assert policy.update(0.1) is None
+    policy.skip()
+    assert policy.update(0.1) is None
+    assert policy.update(0.1) is True
+
+
+def test_early_accept_does_not_adapt_the_profile(auth, monkeypatch):
+    adapted = []
+    monkeypatch.setattr(auth, 'adapt_profile', lambda *args: adapted.append(args))
+    auth.stream_factory = file_stream_factory(utterance(7), speed=50)
+
+    authenticated, distance, _ = auth.authenticate_streaming('alice', show_countdown=False)
+    assert authenticated and distance < auth.threshold
+    assert adapted == []
+
+
+def test_clipped_recording_prompts_a_retry_instead_of_rejecting(auth):
+    auth.stream_factory = file_stream_factory(utterance(8, amplitude=5.0), speed=50)
+
+    authenticated, distance, _ = auth.authenticate_streaming('alice', show_countdown=False)
+    assert not authenticated and distance == 1.0
+    assert not auth.last_quality.ok
+    assert auth.auth_history.stats('alice')['total_attempts'] == 0
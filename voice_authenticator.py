@@ -10,19 +10,27 @@ Date: 2026-01-29
 
 import os
 import sys
-import json
-import pickle
 import numpy as np
-import sounddevice as sd
-import soundfile as sf
-import torch
-import librosa
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Union
 import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import logging
 
+import audio_processing
+from audio_capture import AudioCapture, UtteranceCapture, record_until_silence
+from audio_quality import QualityAnalyzer, QualityReport
+from auth_history import open_auth_history
+from compact_embeddings import (EMBEDDING_DTYPES, ROW_KEYS, compact_scores, dequantize, profile_embedding,
+                                profile_rows, profile_samples)
+from embedding_backends import EmbeddingBackend, create_backend
+from enrollment_store import DEFAULT_STORE_DIR, EnrollmentStore
+from latency_metrics import LatencyRecorder, timed
+from speaker_index import SpeakerIndex, create_index, load_index
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +38,224 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# How a probe is scored against a multi-embedding profile
+SCORING_MODES = ('mean', 'max', 'topm', 'centroid')
+# How confident probes are folded into a stored profile
+ADAPTATION_MODES = (None, 'ema', 'reservoir')
+
+
+class SequentialDecision:
+    """
+    Early accept/reject policy over a stream of window distances
+    
+    Accepts once the distance has been comfortably below the threshold for
+    `consecutive` windows in a row, rejects once it has been clearly above it
+    for as many windows, and otherwise stays undecided.
+    """
+    
+    def __init__(self,
+                 threshold: float,
+                 accept_margin: float = 0.05,
+                 reject_margin: float = 0.15,
+                 consecutive: int = 2):
+        """
+        Args:
+            threshold: Authentication threshold (cosine distance)
+            accept_margin: How far below the threshold a window must be to count towards accepting
+            reject_margin: How far above the threshold a window must be to count towards rejecting
+            consecutive: Number of agreeing windows in a row required for a decision
+        """
+        self.accept_below = threshold - accept_margin
+        self.reject_above = threshold + reject_margin
+        self.consecutive = consecutive
+        self.accept_run = 0
+        self.reject_run = 0
+        self.distances = []
+    
+    def update(self, distance: float) -> Optional[bool]:
+        """
+        Add the distance of the latest window
+        
+        Returns:
+            True to accept, False to reject, None if more audio is needed
+        """
+        self.distances.append(float(distance))
+        self.accept_run = self.accept_run + 1 if distance < self.accept_below else 0
+        self.reject_run = self.reject_run + 1 if distance > self.reject_above else 0
+        
+        if self.accept_run >= self.consecutive:
+            return True
+        if self.reject_run >= self.consecutive:
+            return False
+        return None
+    
+    def skip(self):
+        """Record a window that could not be scored (e.g. rejected by the quality gate); it breaks both runs"""
+        self.accept_run = 0
+        self.reject_run = 0
+
+
+def score_matrix(probes: np.ndarray, enrolled: np.ndarray) -> np.ndarray:
+    """
+    Cosine distances between every probe and every enrolled embedding
+    
+    One matrix product instead of a compute_similarity call per pair; inputs
+    are expected to be L2-normalized, as returned by extract_embedding.
+    
+    Args:
+        probes: (n, dim) probe embeddings (a single 1D embedding is treated as n=1)
+        enrolled: (m, dim) enrolled embeddings
+        
+    Returns:
+        (n, m) cosine distances (0-2, lower is more similar)
+    """
+    probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+    enrolled = np.atleast_2d(np.asarray(enrolled, dtype=np.float32))
+    if probes.shape[1] != enrolled.shape[1]:
+        raise ValueError(f"Embedding dimension mismatch: {probes.shape[1]} vs {enrolled.shape[1]}")
+    similarity = probes @ enrolled.T
+    np.clip(similarity, -1.0, 1.0, out=similarity)
+    return 1.0 - similarity
+
+
+def build_profile(embeddings: List[np.ndarray], model_version: Optional[str] = None,
+                  denoise: bool = True) -> dict:
+    """
+    Average per-sample embeddings into a voice profile record
+    
+    Args:
+        embeddings: Per-sample voice embeddings (L2-normalized)
+        model_version: Encoder the embeddings came from (see EmbeddingBackend.model_version)
+        denoise: Whether the samples were noise-gated before embedding
+        
+    Returns:
+        Profile dict as stored by EnrollmentStore.put
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    
+    # Average embeddings for robust representation, then re-normalize
+    avg_embedding = np.mean(embeddings, axis=0)
+    avg_norm = np.linalg.norm(avg_embedding)
+    if avg_norm > 0:
+        avg_embedding = avg_embedding / avg_norm
+    
+    # Enrollment quality: how far each sample is from the profile
+    sample_distances = 1.0 - embeddings @ avg_embedding
+    
+    return {
+        'embedding': avg_embedding,
+        'samples': embeddings,
+        'enrolled_at': datetime.now().isoformat(),
+        'num_samples': len(embeddings),
+        'embedding_std': float(np.std(embeddings, axis=0).mean()),  # Store variability
+        'mean_distance': float(np.mean(sample_distances)),
+        'max_distance': float(np.max(sample_distances)),
+        'model_version': model_version,
+        'denoise': denoise,
+    }
+
+
+def profile_is_stale(profile: dict, model_version: str, denoise: bool) -> bool:
+    """
+    True if a profile was built by a different pipeline than the current one
+    
+    Profiles from before preprocessing was recorded (including migrated
+    enrollments.pkl files) were embedded from ungated audio.
+    """
+    if profile.get('model_version') not in (None, model_version):
+        return True
+    return bool(profile.get('denoise', False)) != denoise
+
+
+class EnrollmentPipeline:
+    """
+    Processes enrollment samples in the background while the next one is recorded
+    
+    Each submitted take is preprocessed, embedded and written to
+    voice_profiles/<user>/sample_N.wav on a worker thread, so the caller can
+    go straight back to recording. finish() waits for the outstanding samples
+    and stores the profile.
+    
+    Example:
+        with auth.start_enrollment(username) as pipeline:
+            for _ in range(5):
+                pipeline.submit(auth.record_audio())
+            profile = pipeline.finish()
+    """
+    
+    def __init__(self, authenticator: 'VoiceAuthenticator', username: str, workers: int = 1):
+        """
+        Args:
+            authenticator: Authenticator whose preprocessing, encoder and store are used
+            username: User being enrolled
+            workers: Worker threads (one keeps the encoder off the capture thread
+                     without competing with itself for cores)
+        """
+        self.authenticator = authenticator
+        self.username = username
+        self.sample_dir = Path("voice_profiles") / username
+        self.sample_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enroll")
+        self._futures: List[Future] = []
+    
+    def _process(self, audio_data: np.ndarray, index: int,
+                 noise_profile: audio_processing.NoiseProfile) -> np.ndarray:
+        auth = self.authenticator
+        with auth.metrics.span('enroll_sample'):
+            audio_data = auth.preprocess_audio(audio_data, noise_profile=noise_profile)
+            embedding = auth.extract_embedding(audio_data)
+            auth.save_audio(audio_data, str(self.sample_dir / f"sample_{index}.wav"))
+        return embedding
+    
+    def submit(self, audio_data: np.ndarray) -> Future:
+        """
+        Queue a quality-checked raw recording for processing
+        
+        Raises:
+            The error of an earlier sample that already failed, so a broken
+            enrollment stops before the user records the remaining samples
+        """
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+        # Gate each take with the noise profile as it was when the take was
+        # recorded, not as later recordings update it mid-processing
+        noise_profile = self.authenticator.noise_profile.snapshot()
+        future = self._executor.submit(self._process, audio_data, len(self._futures) + 1, noise_profile)
+        self._futures.append(future)
+        return future
+    
+    @property
+    def completed(self) -> int:
+        """Number of samples fully processed so far"""
+        return sum(future.done() for future in self._futures)
+    
+    def finish(self) -> dict:
+        """
+        Wait for every submitted sample and store the voice profile
+        
+        Returns:
+            The stored profile record (see VoiceAuthenticator.save_profile)
+        """
+        try:
+            embeddings = [future.result() for future in self._futures]
+        finally:
+            self._executor.shutdown(wait=True)
+        return self.authenticator.save_profile(self.username, embeddings)
+    
+    def cancel(self):
+        """Drop samples that have not started processing and stop the workers"""
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+    
+    def __enter__(self) -> 'EnrollmentPipeline':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cancel()
+
+
 class VoiceAuthenticator:
     """
     Voice Authentication System using SpeechBrain ECAPA-TDNN
@@ -45,7 +271,30 @@ class VoiceAuthenticator:
     def __init__(self, 
                  model_source: str = "speechbrain/spkrec-ecapa-voxceleb",
                  threshold: float = 0.30,
-                 sample_rate: int = 16000):
+                 sample_rate: int = 16000,
+                 stream_factory=None,
+                 identification_margin: float = 0.05,
+                 index: str = 'flat',
+                 index_options: Optional[dict] = None,
+                 scoring: str = 'centroid',
+                 top_m: int = 3,
+                 adaptation: Optional[str] = None,
+                 adaptation_margin: float = 0.10,
+                 adaptation_interval: float = 24 * 3600,
+                 adaptation_rate: float = 0.05,
+                 adaptation_max_drift: float = 0.15,
+                 max_profile_samples: int = 10,
+                 adaptation_seed: Optional[int] = None,
+                 metrics_path: Optional[str] = None,
+                 backend: Union[str, EmbeddingBackend] = 'speechbrain',
+                 backend_options: Optional[dict] = None,
+                 model_dir: Optional[str] = None,
+                 background_load: bool = False,
+                 warmup: bool = True,
+                 threads: Optional[int] = None,
+                 interop_threads: Optional[int] = None,
+                 embedding_dtype: Optional[str] = None,
+                 denoise: bool = True):
         """
         Initialize the Voice Authenticator
         
@@ -53,147 +302,338 @@ class VoiceAuthenticator:
             model_source: HuggingFace model path
             threshold: Similarity threshold (0.20-0.30 recommended, lower = stricter)
             sample_rate: Audio sample rate in Hz
+            stream_factory: Audio input stream factory (None = microphone,
+                            see audio_capture.file_stream_factory for a file-backed fake)
+            identification_margin: Minimum distance gap between the best and second-best
+                                   speaker for identification without a username
+            index: Speaker index used for identification: 'flat' (exact) or
+                   'ivf' (approximate, for very large populations)
+            index_options: Extra index arguments (e.g. {'nlist': 256, 'nprobe': 16})
+            scoring: How a probe is scored against the enrolled samples: 'centroid'
+                     (mean embedding, what the default threshold is tuned for),
+                     'mean' (mean of per-sample scores), 'max' (best sample) or
+                     'topm' (mean of the top_m best samples)
+            top_m: Number of best samples averaged by 'topm' scoring
+            adaptation: Fold confident probes into the profile after a successful
+                        authentication: None (off), 'ema' (moving average of the
+                        mean embedding, for 'centroid' scoring) or 'reservoir'
+                        (bounded reservoir of samples, for any scoring)
+            adaptation_margin: Only adapt when distance < threshold - margin
+            adaptation_interval: Minimum seconds between adaptations per user
+            adaptation_rate: EMA weight of a new probe
+            adaptation_max_drift: Largest allowed cosine distance between the
+                                  adapted and the originally enrolled embedding
+            max_profile_samples: Reservoir capacity for 'reservoir' adaptation
+            adaptation_seed: Seed of the reservoir's replacement choices (None = fresh entropy)
+            metrics_path: Also append every per-stage timing span to this JSONL
+                          file (timings are always kept in memory, see latency_summary)
+            backend: Speaker encoder: 'speechbrain' (model_source), 'torchscript',
+                     'onnx', 'fake' (deterministic, no model download) or an
+                     EmbeddingBackend instance
+            backend_options: Extra backend arguments (e.g. {'path': 'encoder.onnx'})
+            model_dir: Load the SpeechBrain model strictly offline from this pinned
+                       directory (see model_cache.py) instead of model_source
+            background_load: Load (and warm up) the model in a background thread and
+                             return immediately; see model_ready / wait_until_ready
+            warmup: Run one dummy inference after loading so the first real
+                    authentication does not pay one-off initialisation costs
+            threads: Pin the encoder's intra-op CPU thread pool to this many threads
+                     (None = all cores). Torch pools are process-wide, so this also
+                     applies to any other torch work in the process
+            interop_threads: Pin the encoder's inter-op thread pool (None = default)
+            embedding_dtype: Row format of stored profiles and the flat index:
+                             'float32', 'float16' (half the memory, distance error
+                             below 5e-4) or 'int8' (about a quarter). Loaded profiles
+                             stay in this format and are scored without decoding.
+                             An existing store in another format is converted on
+                             load (lossy). None keeps the store's current format
+                             (float32 for a new one)
+            denoise: Noise-gate recordings before embedding them (see
+                     update_noise_profile). Recorded on every profile; profiles
+                     built otherwise are flagged for reembed_profiles.py
         """
+        if embedding_dtype is not None and embedding_dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{embedding_dtype}' "
+                             f"(choose from {', '.join(EMBEDDING_DTYPES)})")
+        if adaptation not in ADAPTATION_MODES:
+            raise ValueError(f"Unknown adaptation mode '{adaptation}' (choose from None, 'ema', 'reservoir')")
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode '{scoring}' (choose from {', '.join(SCORING_MODES)})")
+        
         self.model_source = model_source
         self.threshold = threshold
         self.sample_rate = sample_rate
+        self.stream_factory = stream_factory
+        self.identification_margin = identification_margin
+        self.scoring = scoring
+        self.top_m = top_m
+        self.adaptation = adaptation
+        self.adaptation_margin = adaptation_margin
+        self.adaptation_interval = adaptation_interval
+        self.adaptation_rate = adaptation_rate
+        self.adaptation_max_drift = adaptation_max_drift
+        self.max_profile_samples = max_profile_samples
+        self._adaptation_rng = np.random.default_rng(adaptation_seed)
+        if isinstance(backend, EmbeddingBackend):
+            self.backend = backend
+        else:
+            backend_options = dict(backend_options or {})
+            if backend == 'speechbrain':
+                backend_options.setdefault('source', model_source)
+                if model_dir is not None:
+                    backend_options.setdefault('model_dir', model_dir)
+            if threads is not None:
+                backend_options.setdefault('threads', threads)
+            if interop_threads is not None:
+                backend_options.setdefault('interop_threads', interop_threads)
+            self.backend = create_backend(backend, sample_rate=sample_rate, **backend_options)
         self.model = None
+        self.warmup = warmup
+        self.model_ready = Future()
+        self.metrics = LatencyRecorder(metrics_path)
+        self.quality = QualityAnalyzer(sample_rate)
+        self.noise_profile = audio_processing.NoiseProfile()
+        self.last_quality = None
         self.enrolled_embeddings = {}
-        self.auth_history = {}
-        self.auth_history_file = 'voice_profiles/auth_history.json'
+        self.embedding_dtype = embedding_dtype
+        self.denoise = denoise
+        self.store = EnrollmentStore(DEFAULT_STORE_DIR, dim=self.backend.dim,
+                                     dtype=embedding_dtype or 'float32')
+        self.index_type = index
+        self.index_options = dict(index_options or {})
+        if embedding_dtype is not None:
+            self.index_options.setdefault('dtype', embedding_dtype)
+        self.index_file = 'voice_profiles/speaker_index.npz'
+        self._index = None
+        self._saved_centroids = None
+        self.auth_history = None
         
         # Security check: warn if threshold is too lenient
         if threshold > 0.32:
             logger.warning(f"Threshold {threshold} may be too lenient and accept impostors!")
         
         logger.info("Initializing Voice Authenticator...")
-        self._load_model()
+        if background_load:
+            threading.Thread(target=self._load_model_in_background, name="model-loader", daemon=True).start()
+        else:
+            self._load_model()
+            self.model_ready.set_result(self)
         self._load_auth_history()
         
-    def _load_model(self):
-        """Load the pre-trained ECAPA-TDNN model"""
+    def _load_model_in_background(self):
+        """Load and warm up the model, then resolve model_ready (with the error on failure)"""
+        if not self.model_ready.set_running_or_notify_cancel():
+            return
         try:
-            # Disable symlinks on Windows to avoid permission errors
-            os.environ.setdefault("HF_HUB_DISABLE_SYMLINKS", "1")
-
-            # Compatibility shim for torchaudio builds without backend helpers
-            try:
-                import torchaudio
-                if not hasattr(torchaudio, "list_audio_backends"):
-                    def _list_audio_backends():
-                        return ["soundfile"]
-                    torchaudio.list_audio_backends = _list_audio_backends  # type: ignore[attr-defined]
-                if hasattr(torchaudio, "set_audio_backend"):
-                    torchaudio.set_audio_backend("soundfile")
-            except Exception:
-                pass
-
-            from speechbrain.pretrained import EncoderClassifier
-            from speechbrain.utils.fetching import LocalStrategy
+            self._load_model()
+        except Exception as e:
+            self.model_ready.set_exception(e)
+        else:
+            self.model_ready.set_result(self)
+    
+    @property
+    def is_ready(self) -> bool:
+        """True once the model is loaded and warmed up"""
+        return self.model_ready.done() and self.model_ready.exception() is None
+    
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """
+        Block until the model is loaded
+        
+        Args:
+            timeout: Seconds to wait (None = no limit)
             
-            logger.info(f"Loading model from {self.model_source}...")
-            self.model = EncoderClassifier.from_hparams(
-                source=self.model_source,
-                savedir="pretrained_models/spkrec-ecapa-voxceleb",
-                local_strategy=LocalStrategy.COPY
-            )
+        Raises:
+            RuntimeError: The model failed to load
+            concurrent.futures.TimeoutError: Not ready within `timeout`
+        """
+        self.model_ready.result(timeout)
+    
+    def warm_up(self, duration: float = 2.0):
+        """Run one dummy inference so lazy initialisation happens now, not at the first login"""
+        noise = np.random.default_rng(0).standard_normal(int(duration * self.sample_rate)).astype(np.float32) * 0.01
+        with self.metrics.span('warmup'):
+            self.backend.embed(noise)
+    
+    def _load_model(self):
+        """Load the speaker encoder (pre-trained ECAPA-TDNN unless another backend is configured)"""
+        try:
+            with self.metrics.span('model_load'):
+                self.backend.load()
+            self.model = getattr(self.backend, 'model', None)
+            if self.warmup:
+                self.warm_up()
             logger.info("Model loaded successfully!")
             
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise RuntimeError(
-                "SpeechBrain model failed to load. Please install dependencies with: "
+                f"Embedding backend '{self.backend.kind}' failed to load. Please install dependencies with: "
                 "pip install -r requirements.txt"
             ) from e
-    
-    def record_audio(self, duration: int = 5, show_countdown: bool = True) -> np.ndarray:
+        
+    @timed('capture')
+    def record_audio(self,
+                     duration: int = 5,
+                     show_countdown: bool = True,
+                     early_stop: bool = True,
+                     progress_callback=None,
+                     countdown: int = 2,
+                     countdown_callback=None) -> np.ndarray:
         """
         Record audio from microphone
         
+        With early_stop the microphone opens at the start of the countdown
+        and the recording starts from wherever speech actually begins, so the
+        countdown is purely cosmetic.
+        
         Args:
-            duration: Recording duration in seconds
-            show_countdown: Show countdown before recording
+            duration: Recording duration in seconds (maximum duration when early_stop is set)
+            show_countdown: Print a countdown before recording
+            early_stop: Stop as soon as the speaker finishes (voice-activity detection)
+            progress_callback: Called as callback(elapsed_seconds, duration) while recording
+            countdown: Countdown length in seconds
+            countdown_callback: Called with the remaining seconds (…, 1, 0) instead of printing
             
         Returns:
             Audio data as numpy array
         """
-        if show_countdown:
-            print(f"\n🎤 Recording will start in...")
-            for i in range(3, 0, -1):
-                print(f"   {i}...")
-                import time
-                time.sleep(1)
-            print("   🔴 RECORDING NOW! Please speak...")
-        
         try:
-            # Record audio
-            audio_data = sd.rec(
-                int(duration * self.sample_rate),
-                samplerate=self.sample_rate,
-                channels=1,
-                dtype='float32'
-            )
-            sd.wait()  # Wait for recording to finish
+            if early_stop:
+                if show_countdown and countdown_callback is None:
+                    print(f"\n🎤 Recording will start in...")
+                    countdown_callback = self._print_countdown_tick
+                
+                audio_data = record_until_silence(
+                    sample_rate=self.sample_rate,
+                    max_duration=duration,
+                    progress_callback=progress_callback,
+                    countdown=countdown if countdown_callback is not None else 0,
+                    countdown_callback=countdown_callback,
+                    stream_factory=self.stream_factory,
+                    noise_callback=self.update_noise_profile
+                )
+            else:
+                if show_countdown:
+                    self._countdown(countdown)
+                
+                # Record audio
+                import sounddevice as sd
+                audio_data = sd.rec(
+                    int(duration * self.sample_rate),
+                    samplerate=self.sample_rate,
+                    channels=1,
+                    dtype='float32'
+                )
+                sd.wait()  # Wait for recording to finish
+                audio_data = audio_data.squeeze()
             
-            print("   ✅ Recording complete!")
-            return audio_data.squeeze()
+            print(f"   ✅ Recording complete! ({len(audio_data)/self.sample_rate:.1f}s)")
+            return audio_data
             
         except Exception as e:
             logger.error(f"Recording failed: {e}")
             raise
     
+    def _countdown(self, seconds: int = 3):
+        """Print a recording countdown"""
+        print(f"\n🎤 Recording will start in...")
+        for i in range(seconds, 0, -1):
+            self._print_countdown_tick(i)
+            time.sleep(1)
+        self._print_countdown_tick(0)
+    
+    @staticmethod
+    def _print_countdown_tick(remaining: int):
+        """Print one countdown step (0 means recording has started)"""
+        if remaining > 0:
+            print(f"   {remaining}...")
+        else:
+            print("   🔴 RECORDING NOW! Please speak...")
+    
     def save_audio(self, audio_data: np.ndarray, filepath: str):
         """Save audio data to file"""
+        import soundfile as sf
         sf.write(filepath, audio_data, self.sample_rate)
         logger.info(f"Audio saved to {filepath}")
     
     def load_audio(self, filepath: str) -> np.ndarray:
         """Load audio data from file"""
+        import soundfile as sf
         audio_data, sr = sf.read(filepath)
         
         # Resample if necessary
         if sr != self.sample_rate:
             logger.warning(f"Resampling from {sr}Hz to {self.sample_rate}Hz")
-            audio_data = librosa.resample(audio_data, orig_sr=sr, target_sr=self.sample_rate)
+            audio_data = audio_processing.resample(audio_data, sr, self.sample_rate)
         
         return audio_data
     
-    def preprocess_audio(self, audio_data: np.ndarray, reduce_noise: bool = True) -> np.ndarray:
+    @timed('quality')
+    def check_quality(self, audio_data: np.ndarray) -> QualityReport:
         """
-        Preprocess audio with librosa for better quality
+        Quality-gate a raw recording before spending an encoder pass on it
+        
+        The report is also kept in `last_quality` so callers of the
+        authenticate/identify methods can tell a bad recording from a mismatch.
         
         Args:
             audio_data: Raw audio waveform
-            reduce_noise: Whether to apply noise reduction
             
         Returns:
-            Preprocessed audio
+            QualityReport (see audio_quality.REASON_MESSAGES for reason codes)
         """
-        # 1. Trim silence from beginning and end
-        audio_trimmed, _ = librosa.effects.trim(
-            audio_data,
-            top_db=20,  # Silence threshold
-            frame_length=2048,
-            hop_length=512
-        )
+        report = self.quality.analyze(audio_data)
+        self.last_quality = report
+        if not report.ok:
+            logger.debug(f"Recording rejected by quality gate: {report}")
+        return report
+    
+    def update_noise_profile(self, noise: np.ndarray) -> bool:
+        """
+        Learn the background noise from audio recorded before the user spoke
         
-        # Ensure minimum length (1 second)
-        min_samples = self.sample_rate
-        if len(audio_trimmed) < min_samples:
-            logger.warning(f"Audio too short after trimming: {len(audio_trimmed)/self.sample_rate:.2f}s")
-            audio_trimmed = audio_data  # Use original
+        The profile is kept for the session and refined by every recording
+        that starts with a stretch of silence (typically the countdown).
         
-        # 2. Normalize audio amplitude
-        audio_normalized = librosa.util.normalize(audio_trimmed)
+        Args:
+            noise: Background-only audio
+            
+        Returns:
+            True if the audio was long enough to update the profile
+        """
+        return self.noise_profile.update(noise)
+    
+    @timed('preprocess')
+    def preprocess_audio(self, audio_data: np.ndarray, reduce_noise: Optional[bool] = None,
+                         noise_profile: Optional[audio_processing.NoiseProfile] = None) -> np.ndarray:
+        """
+        Preprocess audio for better quality: noise gate, trim silence, normalize, pre-emphasis
         
-        # 3. Apply pre-emphasis filter (boost high frequencies)
-        # This is common in speech processing
-        audio_emphasized = librosa.effects.preemphasis(audio_normalized, coef=0.97)
+        Args:
+            audio_data: Raw audio waveform
+            reduce_noise: Whether to apply noise reduction (needs a noise profile
+                          from an earlier countdown, see update_noise_profile;
+                          None = the authenticator's denoise setting)
+            noise_profile: Profile to gate with instead of the session's (e.g. a snapshot)
+            
+        Returns:
+            Preprocessed audio
+        """
+        if reduce_noise is None:
+            reduce_noise = self.denoise
+        if noise_profile is None:
+            noise_profile = self.noise_profile
+        audio_emphasized = audio_processing.preprocess(
+            audio_data, self.sample_rate,
+            noise_profile=noise_profile if reduce_noise else None
+        )
         
         logger.debug(f"Audio preprocessing: {len(audio_data)} -> {len(audio_emphasized)} samples")
         
         return audio_emphasized
     
+    @timed('embedding')
     def extract_embedding(self, audio_data: np.ndarray) -> np.ndarray:
         """
         Extract voice embedding from audio
@@ -204,28 +644,16 @@ class VoiceAuthenticator:
         Returns:
             Voice embedding (192-dimensional vector, L2-normalized)
         """
-        # Convert to tensor and ensure correct shape
-        audio_tensor = torch.tensor(audio_data).float()
-        if audio_tensor.dim() == 1:
-            audio_tensor = audio_tensor.unsqueeze(0)  # Add batch dimension
-        
-        # Extract embedding
-        with torch.no_grad():
-            embedding = self.model.encode_batch(audio_tensor)
-        
-        # Convert to numpy - handle both (batch, features) and (batch, 1, features)
-        embedding_np = embedding.cpu().numpy()
-        if embedding_np.ndim == 3:
-            embedding_np = embedding_np.squeeze(1)  # Remove middle dimension if present
-        embedding_np = embedding_np.squeeze(0)  # Remove batch dimension
+        self.wait_until_ready()
+        embedding_np = self.backend.embed(audio_data)
         
         # Validate shape
         if embedding_np.ndim != 1:
             logger.error(f"Embedding has wrong shape: {embedding_np.shape}, expected 1D")
             raise ValueError(f"Invalid embedding shape: {embedding_np.shape}")
         
-        if len(embedding_np) != 192:
-            logger.warning(f"Unexpected embedding size: {len(embedding_np)}, expected 192")
+        if len(embedding_np) != self.backend.dim:
+            logger.warning(f"Unexpected embedding size: {len(embedding_np)}, expected {self.backend.dim}")
         
         # L2 normalize for better comparison
         norm = np.linalg.norm(embedding_np)
@@ -242,6 +670,7 @@ class VoiceAuthenticator:
         
         return embedding_np
     
+    @timed('similarity')
     def compute_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
         """
         Compute cosine similarity between two embeddings
@@ -280,9 +709,88 @@ class VoiceAuthenticator:
         logger.debug(f"Similarity: {similarity:.4f}, Distance: {distance:.4f}")
         
         return distance
+    
+    @timed('scoring')
+    def score_profile(self, embedding: np.ndarray, profile: dict) -> float:
+        """
+        Distance between a probe embedding and an enrolled profile
+        
+        All per-sample scores come from one matrix-vector product with the
+        profile's (k, 192) sample matrix, in the format it is stored in
+        (float16/int8 rows are not decoded); profiles enrolled before samples
+        were kept are scored against their mean embedding.
+        
+        Args:
+            embedding: L2-normalized probe embedding
+            profile: Enrolled profile (see save_profile)
+            
+        Returns:
+            Cosine distance (0-2, lower is more similar)
+        """
+        values, scales = profile_rows(profile, samples=self.scoring != 'centroid')
+        if values.shape[-1] != len(embedding):
+            raise ValueError(f"Embedding dimension mismatch: {len(embedding)} vs {values.shape[-1]}")
+        scores = compact_scores(values, scales, embedding)
+        if self.scoring == 'max':
+            score = scores.max()
+        elif self.scoring == 'topm':
+            m = min(self.top_m, len(scores))
+            score = np.partition(scores, len(scores) - m)[-m:].mean()
+        else:
+            score = scores.mean()
         
+        distance = 1.0 - float(np.clip(score, -1.0, 1.0))
+        logger.debug(f"Profile distance ({self.scoring} over {len(scores)} samples): {distance:.4f}")
         return distance
     
+    @timed('scoring')
+    def score_profiles(self, probes: np.ndarray, profiles: Optional[dict] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Distances between many probes and many profiles under the configured scoring mode
+        
+        Gives the same values as score_profile for every pair, but all sample
+        scores come from a single matrix product over the stacked sample rows
+        (kept in their stored format when all profiles share it).
+        
+        Args:
+            probes: (n, dim) L2-normalized probe embeddings
+            profiles: Profiles by username (None = all enrolled profiles)
+            
+        Returns:
+            (usernames, (n, len(usernames)) distance matrix)
+        """
+        profiles = self.enrolled_embeddings if profiles is None else profiles
+        usernames = list(profiles)
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if not usernames:
+            return usernames, np.zeros((len(probes), 0), dtype=np.float32)
+        
+        rows = [profile_rows(profiles[username], samples=self.scoring != 'centroid') for username in usernames]
+        counts = np.array([len(values) for values, _ in rows])
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        if len({(values.dtype, scales is None) for values, scales in rows}) == 1:
+            values = np.concatenate([values for values, _ in rows])
+            scales = None if rows[0][1] is None else np.concatenate([scales for _, scales in rows])
+        else:
+            # Profiles in different formats (e.g. fresh and loaded ones): stack as float32
+            values, scales = np.concatenate([dequantize(values, scales) for values, scales in rows]), None
+        if values.shape[1] != probes.shape[1]:
+            raise ValueError(f"Embedding dimension mismatch: {probes.shape[1]} vs {values.shape[1]}")
+        scores = np.clip(compact_scores(values, scales, probes), -1.0, 1.0)
+        
+        if self.scoring == 'max':
+            reduced = np.maximum.reduceat(scores, offsets, axis=1)
+        elif self.scoring == 'topm':
+            reduced = np.empty((len(probes), len(usernames)), dtype=np.float32)
+            for column, (offset, count) in enumerate(zip(offsets, counts)):
+                block = scores[:, offset:offset + count]
+                m = min(self.top_m, count)
+                reduced[:, column] = np.partition(block, count - m, axis=1)[:, -m:].mean(axis=1)
+        else:
+            # 'mean' (and 'centroid', where every block is a single row)
+            reduced = np.add.reduceat(scores, offsets, axis=1) / counts
+        return usernames, 1.0 - reduced
+    
     def enroll_user(self, 
                     username: str, 
                     num_samples: int = 5,
@@ -305,64 +813,33 @@ class VoiceAuthenticator:
         print(f"Say a passphrase like: 'My voice is my password'")
         print(f"or 'Open sesame' or any phrase you'll remember.")
         
-        embeddings = []
-        
-        for i in range(num_samples):
-            print(f"\n📝 Sample {i+1}/{num_samples}")
-            
-            # Record audio
-            audio_data = self.record_audio(duration=duration)
-            
-            # Preprocess audio with librosa
-            audio_data = self.preprocess_audio(audio_data)
-            
-            # Extract embedding
-            embedding = self.extract_embedding(audio_data)
-            embeddings.append(embedding)
+        with self.start_enrollment(username) as pipeline:
+            for i in range(num_samples):
+                print(f"\n📝 Sample {i+1}/{num_samples}")
+                
+                # Record audio, repeating the sample until it passes the quality gate
+                audio_data = self.record_audio(duration=duration)
+                report = self.check_quality(audio_data)
+                while not report.ok:
+                    print(f"\n⚠️  {report.message}. Let's record that sample again.")
+                    audio_data = self.record_audio(duration=duration)
+                    report = self.check_quality(audio_data)
+                
+                # Preprocess, embed and save in the background while the next sample records
+                pipeline.submit(audio_data)
             
-            # Save sample
-            sample_dir = Path(f"voice_profiles/{username}")
-            sample_dir.mkdir(parents=True, exist_ok=True)
-            self.save_audio(audio_data, str(sample_dir / f"sample_{i+1}.wav"))
-        
-        # Average embeddings for robust representation
-        embeddings = np.array(embeddings)
-        
-        # Weighted average - use median + mean for robustness
-        # This helps handle outliers better than plain mean
-        avg_embedding = np.mean(embeddings, axis=0)
-        
-        # Normalize the averaged embedding
-        avg_norm = np.linalg.norm(avg_embedding)
-        if avg_norm > 0:
-            avg_embedding = avg_embedding / avg_norm
-        
-        # Store enrollment
-        self.enrolled_embeddings[username] = {
-            'embedding': avg_embedding,
-            'enrolled_at': datetime.now().isoformat(),
-            'num_samples': num_samples,
-            'embedding_std': float(np.std(embeddings, axis=0).mean()),  # Store variability
-        }
-        
-        # Save to disk
-        self._save_enrollments()
-        
-        # Calculate and display enrollment quality
-        embedding_distances = []
-        for emb in embeddings:
-            dist = 1.0 - np.dot(emb, avg_embedding)
-            embedding_distances.append(dist)
-        
-        mean_dist = np.mean(embedding_distances)
-        max_dist = np.max(embedding_distances)
+            # Build, store and persist the voice profile
+            profile = pipeline.finish()
+        
+        mean_dist = profile['mean_distance']
+        max_dist = profile['max_distance']
         
         print(f"\n✅ User '{username}' enrolled successfully!")
         print(f"   Voice profile saved with {num_samples} samples.")
         print(f"   Enrollment quality:")
         print(f"   - Mean distance to profile: {mean_dist:.4f}")
         print(f"   - Max distance: {max_dist:.4f}")
-        print(f"   - Threshold set to: 0.25")
+        print(f"   - Threshold set to: {self.threshold}")
         print(f"\n   💡 If authentication fails later:")
         print(f"      - Speak in similar environment (same room, noise level)")
         print(f"      - Use consistent volume and speed")
@@ -370,6 +847,137 @@ class VoiceAuthenticator:
         
         return True
     
+    def start_enrollment(self, username: str) -> EnrollmentPipeline:
+        """
+        Begin a pipelined enrollment (see EnrollmentPipeline)
+        
+        Args:
+            username: Username to enroll
+            
+        Returns:
+            Pipeline accepting quality-checked recordings via submit()
+        """
+        return EnrollmentPipeline(self, username)
+    
+    def save_profile(self, username: str, embeddings: List[np.ndarray]) -> dict:
+        """
+        Build a voice profile from sample embeddings, store it and save it to disk
+        
+        Args:
+            username: Username the profile belongs to
+            embeddings: Per-sample voice embeddings (L2-normalized)
+            
+        Returns:
+            The stored profile record
+        """
+        profile = build_profile(embeddings, self.backend.model_version, self.denoise)
+        profile = self.store.put(username, profile)
+        self.enrolled_embeddings[username] = profile
+        self.index.add(username, profile_embedding(profile))
+        self._save_index()
+        
+        logger.info(f"Profile for '{username}' saved to {self.store.directory}")
+        return profile
+    
+    @property
+    def index(self) -> SpeakerIndex:
+        """Speaker index over all profiles, built on first use"""
+        if self._index is None:
+            self._rebuild_index()
+        return self._index
+    
+    def _rebuild_index(self):
+        """Rebuild the speaker index from all enrolled profiles (reusing saved IVF centroids)"""
+        profiles = list(self.enrolled_embeddings.values())
+        dim = len(profiles[0]['embedding']) if profiles else self.backend.dim
+        configured = create_index(self.index_type, dim, **self.index_options)
+        self._index = self._load_quantizer(configured) or configured
+        for username, profile in self.enrolled_embeddings.items():
+            self._index.add(username, profile_embedding(profile))
+        if (self._index is configured and self.index_type == 'ivf' and not configured.is_trained
+                and len(configured) >= configured.nlist and os.path.exists(self.index_file)):
+            # The saved centroids no longer fit the configuration: retrain
+            # now rather than falling back to exact search until train_size
+            configured.train()
+        self._save_index()
+    
+    def _load_quantizer(self, configured: SpeakerIndex) -> Optional[SpeakerIndex]:
+        """Empty IVF index with the saved centroids, if they match the configuration"""
+        if configured.kind != 'ivf' or not os.path.exists(self.index_file):
+            return None
+        try:
+            index = load_index(self.index_file)
+        except Exception as e:
+            logger.warning(f"Failed to load speaker index: {e}")
+            return None
+        if (index.kind != configured.kind or not index.is_trained or index.dim != configured.dim
+                or index.dtype != configured.dtype):
+            return None
+        if index.nlist != configured.nlist:
+            logger.info(f"Speaker index has {index.nlist} lists, configured {configured.nlist}: retraining")
+            return None
+        # Files written before only the quantizer was saved also hold the vectors; drop them
+        index = index.quantizer()
+        # Search-time settings follow the configuration, not the file
+        index.nprobe = configured.nprobe
+        index.train_size = configured.train_size
+        self._saved_centroids = index.centroids
+        return index
+    
+    @timed('search')
+    def identify_embedding(self, embedding: np.ndarray, top_k: int = 3) -> List[dict]:
+        """
+        Rank enrolled users against a probe embedding
+        
+        Args:
+            embedding: L2-normalized probe embedding
+            top_k: Number of candidates to return
+            
+        Returns:
+            Best candidates first, as dicts with 'username', 'distance' and
+            'margin' (distance gap to the next candidate; inf for the last one)
+        """
+        # Shortlist by mean embedding, keeping one extra candidate so the last
+        # returned one still gets a margin
+        matches = self.index.search(embedding, top_k + 1)
+        if self.scoring == 'centroid':
+            ranked = [(1.0 - min(max(score, -1.0), 1.0), username) for username, score in matches]
+        else:
+            # Re-rank the shortlist with the same scoring used for verification
+            ranked = sorted(
+                (self.score_profile(embedding, self.enrolled_embeddings[username]), username)
+                for username, _ in matches
+            )
+        
+        candidates = []
+        for i, (distance, username) in enumerate(ranked[:top_k]):
+            margin = ranked[i + 1][0] - distance if i + 1 < len(ranked) else float('inf')
+            candidates.append({
+                'username': username,
+                'distance': distance,
+                'margin': margin,
+            })
+        return candidates
+    
+    def identify(self, audio_data: np.ndarray, top_k: int = 3) -> List[dict]:
+        """
+        Identify who is speaking without being told a username (1:N search)
+        
+        Args:
+            audio_data: Raw audio waveform
+            top_k: Number of candidates to return
+            
+        Returns:
+            Best candidates first (see identify_embedding); empty if the
+            recording failed the quality gate (see last_quality)
+        """
+        if not self.check_quality(audio_data).ok:
+            return []
+        audio_data = self.preprocess_audio(audio_data)
+        embedding = self.extract_embedding(audio_data)
+        return self.identify_embedding(embedding, top_k)
+    
+    @timed('authenticate')
     def authenticate(self, username: str, duration: int = 5) -> Tuple[bool, float]:
         """
         Authenticate user by voice
@@ -393,28 +1001,22 @@ class VoiceAuthenticator:
         # Record authentication sample
         audio_data = self.record_audio(duration=duration)
         
-        # Preprocess audio with librosa
-        audio_data = self.preprocess_audio(audio_data)
-        
-        # Validate audio has sufficient content
-        audio_rms = np.sqrt(np.mean(audio_data**2))
-        audio_max = np.max(np.abs(audio_data))
-        
-        if audio_max < 0.01:
+        # Reject unusable audio before paying for the encoder
+        report = self.check_quality(audio_data)
+        if not report.ok:
             print(f"\n❌ AUTHENTICATION FAILED!")
-            print(f"   No speech detected. Please speak louder.")
-            print(f"   Audio level: {audio_max:.4f} (min required: 0.01)")
+            print(f"   {report.message}")
             return False, 1.0
         
-        if audio_rms < 0.005:
-            print(f"\n⚠️  Audio quality warning: very quiet recording")
-            print(f"   RMS: {audio_rms:.4f} (recommended: >0.01)")
+        # Preprocess audio
+        audio_data = self.preprocess_audio(audio_data)
         
         # Extract embedding
         test_embedding = self.extract_embedding(audio_data)
         
-        # Compare with enrolled embedding
-        enrolled_embedding = self.enrolled_embeddings[username]['embedding']
+        # Compare with enrolled profile
+        profile = self.enrolled_embeddings[username]
+        enrolled_embedding = profile_embedding(profile)
         
         # Validate embeddings are properly normalized
         test_norm = np.linalg.norm(test_embedding)
@@ -423,16 +1025,18 @@ class VoiceAuthenticator:
         if abs(test_norm - 1.0) > 0.1 or abs(enrolled_norm - 1.0) > 0.1:
             logger.warning(f"Embedding normalization issue: test={test_norm:.3f}, enrolled={enrolled_norm:.3f}")
         
-        distance = self.compute_similarity(test_embedding, enrolled_embedding)
+        distance = self.score_profile(test_embedding, profile)
         
         # Log the attempt for debugging
-        logger.info(f"Authentication attempt for {username}: distance={distance:.4f}, threshold={self.threshold}")
+        logger.debug(f"Authentication attempt for {username}: distance={distance:.4f}, threshold={self.threshold}")
         
         # Authenticate with strict threshold
         authenticated = distance < self.threshold
         
         # Update authentication history
         self._update_auth_history(username, distance, authenticated)
+        if authenticated:
+            self.adapt_profile(username, test_embedding, distance)
         
         # Calculate percentage match for user feedback
         similarity_percent = max(0, min(100, (1 - distance) * 100))
@@ -455,102 +1059,316 @@ class VoiceAuthenticator:
         
         return authenticated, distance
     
-    def _save_enrollments(self):
-        """Save enrolled embeddings to disk"""
-        save_path = Path("voice_profiles/enrollments.pkl")
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+    @timed('authenticate')
+    def authenticate_streaming(self,
+                               username: str,
+                               max_duration: float = 5.0,
+                               show_countdown: bool = True,
+                               progress_callback=None,
+                               countdown: int = 2,
+                               countdown_callback=None,
+                               min_window: float = 1.5,
+                               max_window: float = 3.0,
+                               hop: float = 0.5,
+                               accept_margin: float = 0.05,
+                               reject_margin: float = 0.15,
+                               consecutive: int = 2) -> Tuple[bool, float, float]:
+        """
+        Authenticate user by voice, deciding while audio is still arriving
+        
+        Embeddings are computed on a rolling window of the speech captured so
+        far (every `hop` seconds once `min_window` seconds of speech are in).
+        A confident match or a clear mismatch ends the recording early; if no
+        early decision is reached the full utterance is scored as usual.
+        Windows that fail the quality gate are not scored and never decide
+        early, and only a full-utterance probe is used to adapt the profile.
+        
+        Args:
+            username: Username to authenticate
+            max_duration: Hard maximum recording duration in seconds
+            show_countdown: Print a countdown before recording
+            progress_callback: Called as callback(elapsed_seconds, max_duration) while recording
+            countdown: Cosmetic countdown length in seconds (audio is captured during it)
+            countdown_callback: Called with the remaining seconds (…, 1, 0) instead of printing
+            min_window: Seconds of speech needed before the first window is scored
+            max_window: Length of the rolling window in seconds
+            hop: Seconds of new audio between window evaluations
+            accept_margin: Distance margin below threshold needed to accept early
+            reject_margin: Distance margin above threshold needed to reject early
+            consecutive: Number of agreeing windows required for an early decision
+            
+        Returns:
+            Tuple of (authenticated: bool, distance: float, decision_time: float seconds
+            after the countdown ended)
+        """
+        if username not in self.enrolled_embeddings:
+            logger.error(f"User '{username}' not enrolled!")
+            return False, 1.0, 0.0
+        
+        profile = self.enrolled_embeddings[username]
+        self.last_quality = None
+        
+        print(f"\n🔐 AUTHENTICATING: {username}")
+        if show_countdown and countdown_callback is None:
+            print(f"\n🎤 Recording will start in...")
+            countdown_callback = self._print_countdown_tick
+        if countdown_callback is None:
+            countdown = 0
+        
+        policy = SequentialDecision(self.threshold, accept_margin, reject_margin, consecutive)
+        min_samples = int(min_window * self.sample_rate)
+        window_samples = int(max_window * self.sample_rate)
+        hop_samples = int(hop * self.sample_rate)
+        
+        next_eval = 0
+        decision = None
+        distance = 1.0
+        start_time = time.perf_counter()
+        
+        with AudioCapture(self.sample_rate, countdown + max_duration + 1.0,
+                          stream_factory=self.stream_factory) as mic:
+            capture = UtteranceCapture(self.sample_rate, max_duration, countdown=countdown,
+                                       progress_callback=progress_callback,
+                                       countdown_callback=countdown_callback,
+                                       ring=mic.ring)
+            for block in mic.blocks():
+                finished = capture.feed(block, mic.position)
+                
+                if capture.speech_samples >= min_samples and capture.captured >= next_eval:
+                    if next_eval == 0:
+                        self.update_noise_profile(capture.leading_audio)
+                    next_eval = capture.captured + hop_samples
+                    window = capture.audio[-window_samples:]
+                    # A clipped or noisy window must not reject (or accept) early
+                    if not self.check_quality(window).ok:
+                        policy.skip()
+                        if finished:
+                            break
+                        continue
+                    distance, probe = self._score_audio(window, profile)
+                    decision = policy.update(distance)
+                    logger.debug(f"Window {len(policy.distances)} at "
+                                 f"{capture.captured/self.sample_rate:.2f}s: distance={distance:.4f}")
+                    if decision is not None:
+                        break
+                
+                if finished:
+                    break
+        
+        early = decision is not None
+        if decision is None:
+            report = self.check_quality(capture.audio)
+            if not report.ok:
+                # Not an attempt by anyone's voice: prompt a retry, keep history clean
+                print(f"\n❌ AUTHENTICATION FAILED!")
+                print(f"   {report.message}")
+                return False, 1.0, max(0.0, time.perf_counter() - start_time - countdown)
+            
+            # No early decision: score everything that was captured
+            if next_eval == 0:
+                self.update_noise_profile(capture.leading_audio)
+            distance, probe = self._score_audio(capture.audio, profile)
+            decision = distance < self.threshold
+        
+        decision_time = max(0.0, time.perf_counter() - start_time - countdown)
+        authenticated = bool(decision)
+        
+        self.metrics.record('decision', decision_time)
+        logger.debug(f"Streaming authentication for {username}: distance={distance:.4f}, "
+                    f"windows={len(policy.distances)}, decided in {decision_time:.2f}s")
+        self._update_auth_history(username, distance, authenticated)
+        # An early accept comes from a 1.5-3 s window, too short to fold into the profile
+        if authenticated and not early:
+            self.adapt_profile(username, probe, distance)
+        
+        print(f"\n📊 Authentication Results:")
+        print(f"   Cosine Distance: {distance:.4f}")
+        print(f"   Threshold: {self.threshold} (distance must be below this)")
+        print(f"   Decision time: {decision_time:.2f}s")
+        print(f"\n{'✅ AUTHENTICATION SUCCESSFUL!' if authenticated else '❌ AUTHENTICATION FAILED!'}")
+        
+        return authenticated, distance, decision_time
+    
+    def _score_audio(self, audio_data: np.ndarray, profile: dict) -> Tuple[float, np.ndarray]:
+        """Preprocess audio, embed it and return (distance to an enrolled profile, embedding)"""
+        audio_data = self.preprocess_audio(audio_data)
+        embedding = self.extract_embedding(audio_data)
+        return self.score_profile(embedding, profile), embedding
+    
+    @timed('adaptation')
+    def adapt_profile(self, username: str, embedding: np.ndarray, distance: float) -> bool:
+        """
+        Fold a confidently accepted probe into the user's stored profile
         
-        with open(save_path, 'wb') as f:
-            pickle.dump(self.enrolled_embeddings, f)
+        Guarded so a borderline (or impostor) accept cannot drag the profile:
+        the probe must beat the threshold by adaptation_margin, a user's
+        profile changes at most once per adaptation_interval, and the mean
+        embedding may not drift more than adaptation_max_drift from the one
+        recorded at enrollment.
         
-        logger.info(f"Enrollments saved to {save_path}")
+        Args:
+            username: Authenticated user
+            embedding: L2-normalized probe embedding
+            distance: Distance the probe was accepted with
+            
+        Returns:
+            True if the profile was updated
+        """
+        if self.adaptation is None or username not in self.enrolled_embeddings:
+            return False
+        if distance >= self.threshold - self.adaptation_margin:
+            return False
+        
+        profile = self.enrolled_embeddings[username]
+        # A probe from another pipeline would mix two embedding spaces in the profile
+        if profile_is_stale(profile, self.backend.model_version, self.denoise):
+            return False
+        last_adapted = profile.get('adapted_at')
+        if last_adapted is not None:
+            elapsed = (datetime.now() - datetime.fromisoformat(last_adapted)).total_seconds()
+            if elapsed < self.adaptation_interval:
+                return False
+        
+        embedding = np.asarray(embedding, dtype=np.float32)
+        # Adaptation needs full precision, so compact rows are decoded here
+        current = np.asarray(profile_embedding(profile), dtype=np.float32)
+        samples = profile_samples(profile)
+        samples = current[np.newaxis] if samples is None else np.array(samples, dtype=np.float32)
+        updates = profile.get('adaptations', 0)
+        
+        if self.adaptation == 'ema':
+            updated = (1.0 - self.adaptation_rate) * current + self.adaptation_rate * embedding
+        else:
+            # Reservoir sampling over enrollment samples plus accepted probes
+            seen = profile.get('num_samples', len(samples)) + updates + 1
+            if len(samples) < self.max_profile_samples:
+                samples = np.vstack([samples, embedding])
+            else:
+                slot = int(self._adaptation_rng.integers(seen))
+                if slot < len(samples):
+                    samples[slot] = embedding
+            updated = samples.mean(axis=0)
+        updated = updated / np.linalg.norm(updated)
+        
+        # The enrollment-time embedding anchors the drift check
+        anchor = np.asarray(profile.get('enrolled_embedding', current), dtype=np.float32)
+        drift = 1.0 - float(np.dot(updated, anchor))
+        if drift > self.adaptation_max_drift:
+            logger.debug(f"Profile adaptation for '{username}' skipped: drift {drift:.4f} "
+                        f"exceeds {self.adaptation_max_drift}")
+            return False
+        
+        adapted = {key: value for key, value in profile.items() if key not in ROW_KEYS}
+        adapted.update({
+            'embedding': updated,
+            'samples': samples,
+            'enrolled_embedding': anchor.tolist(),
+            'adapted_at': datetime.now().isoformat(),
+            'adaptations': updates + 1,
+        })
+        adapted = self.store.put(username, adapted)
+        self.enrolled_embeddings[username] = adapted
+        self.index.add(username, profile_embedding(adapted))
+        self._save_index()
+        
+        step = 1.0 - float(np.dot(updated, current))
+        if self.auth_history is not None:
+            self.auth_history.record_adaptation(username, distance, self.adaptation, step)
+        logger.info(f"Adapted profile for '{username}' ({self.adaptation}, "
+                    f"change {step:.4f}, drift from enrollment {drift:.4f})")
+        return True
+    
+    def _save_index(self):
+        """Save the IVF centroids when (re)training changed them"""
+        # Only the trained quantizer is persisted: list membership is rebuilt
+        # from the store on start, like the flat index, so enrolling or
+        # removing a user costs no index I/O
+        index = self._index
+        if index is None or index.kind != 'ivf' or not index.is_trained:
+            return
+        if index.centroids is not self._saved_centroids:
+            index.quantizer().save(self.index_file)
+            self._saved_centroids = index.centroids
     
     def load_enrollments(self):
-        """Load enrolled embeddings from disk"""
-        load_path = Path("voice_profiles/enrollments.pkl")
+        """Load enrolled profiles from disk (migrating a legacy pickle file)"""
+        self.store.migrate_legacy()
         
-        if load_path.exists():
-            with open(load_path, 'rb') as f:
-                self.enrolled_embeddings = pickle.load(f)
+        # Embeddings stay memory-mapped; the index is built on first use
+        self.enrolled_embeddings = self.store.open()
+        self._index = None
+        if self.embedding_dtype is not None and self.store.exists and self.store.dtype != self.embedding_dtype:
+            logger.warning(f"Converting stored profiles from {self.store.dtype} to {self.embedding_dtype}")
+            self.enrolled_embeddings = self.store.convert(self.embedding_dtype)
+        
+        if self.enrolled_embeddings:
             logger.info(f"Loaded {len(self.enrolled_embeddings)} enrolled users")
+            self._warn_stale_profiles()
         else:
             logger.info("No existing enrollments found")
     
-    def _load_auth_history(self):
-        """Load authentication history from disk"""
-        if os.path.exists(self.auth_history_file):
-            try:
-                with open(self.auth_history_file, 'r') as f:
-                    self.auth_history = json.load(f)
-                logger.info(f"Loaded authentication history for {len(self.auth_history)} users")
-            except Exception as e:
-                logger.warning(f"Failed to load auth history: {e}")
-                self.auth_history = {}
-        else:
-            self.auth_history = {}
+    def _warn_stale_profiles(self):
+        """Point out profiles built with a different encoder or preprocessing than the current ones"""
+        stale = [username for username, profile in self.enrolled_embeddings.items()
+                 if profile_is_stale(profile, self.backend.model_version, self.denoise)]
+        if stale:
+            logger.warning(f"{len(stale)} profiles were built with a different encoder than "
+                           f"{self.backend.model_version} or with denoise != {self.denoise} and "
+                           f"will not match reliably; rebuild them with: python reembed_profiles.py --only-stale")
     
-    def _save_auth_history(self):
-        """Save authentication history to disk"""
-        os.makedirs(os.path.dirname(self.auth_history_file), exist_ok=True)
-        with open(self.auth_history_file, 'w') as f:
-            json.dump(self.auth_history, f, indent=2)
-        logger.debug("Authentication history saved")
+    def _load_auth_history(self):
+        """Open the authentication history (importing auth_history.json once)"""
+        try:
+            self.auth_history = open_auth_history('voice_profiles/auth_history.db',
+                                                  'voice_profiles/auth_history.json')
+        except Exception as e:
+            logger.warning(f"Failed to load auth history: {e}")
+            self.auth_history = None
     
+    @timed('history')
     def _update_auth_history(self, username: str, distance: float, success: bool):
-        """Update authentication history with new attempt"""
-        if username not in self.auth_history:
-            self.auth_history[username] = {
-                'total_attempts': 0,
-                'successful': 0,
-                'failed': 0,
-                'distances': [],
-                'success_distances': [],
-                'failed_distances': [],
-                'timestamps': []
-            }
-        
-        history = self.auth_history[username]
-        history['total_attempts'] += 1
-        history['successful' if success else 'failed'] += 1
-        history['distances'].append(float(distance))
-        history['timestamps'].append(datetime.now().isoformat())
-        
-        if success:
-            history['success_distances'].append(float(distance))
-        else:
-            history['failed_distances'].append(float(distance))
-        
-        # Keep only last 100 entries to limit file size
-        if len(history['distances']) > 100:
-            history['distances'] = history['distances'][-100:]
-            history['timestamps'] = history['timestamps'][-100:]
-            history['success_distances'] = history['success_distances'][-100:]
-            history['failed_distances'] = history['failed_distances'][-100:]
-        
-        # Calculate statistics
-        if history['successful'] > 0:
-            success_dists = history['success_distances']
-            history['avg_success_distance'] = float(np.mean(success_dists))
-            history['std_success_distance'] = float(np.std(success_dists))
-            
-            # Suggest optimal threshold (mean + 2*std for 95% confidence)
-            suggested = history['avg_success_distance'] + 2 * history['std_success_distance']
-            history['suggested_threshold'] = min(0.35, max(0.20, float(suggested)))
+        """Append an authentication attempt to the history"""
+        if self.auth_history is not None:
+            self.auth_history.record(username, distance, success)
+    
+    def record_attempt(self, username: str, distance: float, success: bool):
+        """
+        Log an authentication decision made outside authenticate()
         
-        history['success_rate'] = history['successful'] / history['total_attempts']
+        For callers that decide themselves, e.g. identification without a
+        username; the attempt counts towards the user's stats and suggested threshold.
         
-        self._save_auth_history()
+        Args:
+            username: User the attempt was scored against
+            distance: Cosine distance of the attempt
+            success: Whether it was accepted
+        """
+        self._update_auth_history(username, distance, success)
     
     def get_user_stats(self, username: str) -> dict:
         """Get authentication statistics for a user"""
-        if username not in self.auth_history:
+        if self.auth_history is None:
             return {
                 'total_attempts': 0,
                 'successful': 0,
                 'failed': 0,
                 'success_rate': 0.0
             }
-        return self.auth_history[username]
+        return self.auth_history.stats(username)
+    
+    def latency_summary(self) -> dict:
+        """
+        Per-stage latency since startup
+        
+        Stages: capture, quality, preprocess, embedding, scoring, similarity,
+        search, history, adaptation, authenticate (end to end), decision
+        (streaming: time from end of countdown to the decision), model_load
+        and warmup.
+        
+        Returns:
+            {stage: {'count', 'mean_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms'}}
+        """
+        return self.metrics.summary()
     
     def list_enrolled_users(self) -> List[str]:
         """Get list of enrolled users"""
@@ -560,7 +1378,9 @@ class VoiceAuthenticator:
         """Remove enrolled user"""
         if username in self.enrolled_embeddings:
             del self.enrolled_embeddings[username]
-            self._save_enrollments()
+            self.store.delete(username)
+            self.index.remove(username)
+            self._save_index()
             logger.info(f"User '{username}' removed")
         else:
             logger.warning(f"User '{username}' not found")